@@ -0,0 +1,54 @@
+"""Fixed FEN corpus for the engine benchmarks.
+
+The positions never change between commits so results stay comparable. Each
+phase has a mix of quiet and tactical positions. The openings include the
+start position and main book lines, and five endgames have 6 pieces or fewer,
+so with an opening book or Syzygy tables configured they would be answered
+without a search: engine_bench clears OPENING_BOOK_PATH and SYZYGY_PATH so
+every position reaches the engine. Do the same when timing other code on them.
+"""
+from typing import Dict, List
+
+OPENINGS = [
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2',
+    'r1bqkbnr/pppp1ppp/2n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3',
+    'rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5',
+    'rnbqkb1r/ppp1pppp/5n2/3p4/2PP4/8/PP2PPPP/RNBQKBNR w KQkq - 1 3',
+    'rnbqk2r/pppp1ppp/4pn2/8/1bPP4/2N5/PP2PPPP/R1BQKBNR w KQkq - 2 4',
+    'rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq c6 0 2',
+    'rnbqkb1r/pppppp1p/5np1/8/2PP4/8/PP2PPPP/RNBQKBNR w KQkq - 0 3',
+]
+
+MIDDLEGAMES = [
+    'r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8',
+    'r2q1rk1/pp1nbppp/2p1pn2/3p4/2PP4/1QN1PN2/PP1B1PPP/R3KB1R w KQ - 2 9',
+    'r1bqr1k1/ppp2ppp/2np1n2/2b1p3/2B1P3/2PP1N2/PP3PPP/RNBQR1K1 w - - 1 8',
+    'r3k2r/pp1n1ppp/2pbpn2/q7/3P4/2NBPN2/PP3PPP/R2Q1RK1 w kq - 2 11',
+    '2rq1rk1/pp1bppbp/2np1np1/8/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 5 12',
+    'r1b2rk1/2q1bppp/p2ppn2/1p6/3BPP2/2N2B2/PPPQ2PP/2KR3R w - - 0 13',
+    'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+    '4rrk1/pp1n3p/3q2pQ/2p1pb2/2PP4/2P3N1/P2B2PP/4RRK1 b - - 7 19',
+]
+
+ENDGAMES = [
+    '8/8/4k3/8/2p5/8/B2K4/8 w - - 0 1',
+    '8/5pk1/6p1/8/3R4/6P1/5PK1/r7 w - - 0 40',
+    '6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 30',
+    '8/8/1p1k4/1P6/2PK4/8/8/8 w - - 0 50',
+    '8/6pk/8/5P2/4P3/7K/8/8 w - - 0 45',
+    '2r3k1/5ppp/8/8/8/8/5PPP/1R4K1 b - - 0 35',
+    '8/2k5/8/1PK5/8/8/8/8 w - - 0 60',
+    '4k3/8/8/8/8/8/4P3/4K3 w - - 0 1',
+]
+
+CORPUS: Dict[str, List[str]] = {
+    'opening': OPENINGS,
+    'middlegame': MIDDLEGAMES,
+    'endgame': ENDGAMES,
+}
+
+
+def positions(phases=None) -> List[str]:
+    """All corpus FENs (or only the given phases), in a fixed order."""
+    return [fen for phase in (phases or CORPUS) for fen in CORPUS[phase]]
@@ -0,0 +1,286 @@
+"""Engine latency benchmark: spawn vs pooled vs cached.
+
+Runs the fixed corpus (corpus.py) through each engine path and reports
+p50/p95/p99 latency, throughput, nps and resident memory (this process plus
+its engine children), optionally writing JSON so runs from different commits
+can be compared.
+
+Scenarios:
+    spawn     _try_cli_stockfish: a fresh engine process per position
+    pooled    a warm engine checked out of the pool per position
+    parallel  the pooled path from --concurrency threads at once
+    cold      get_best_move_for_fen with an empty analysis cache
+    cached    get_best_move_for_fen again, every position already cached
+
+Usage:
+    python -m src.bench.engine_bench --depth 10 --json bench.json
+    python -m src.bench.engine_bench --fake --concurrency 4 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from src.bench.corpus import CORPUS, positions
+from src.engine.backends import BACKENDS
+
+FAKE_ENGINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'engine', 'fake_uci_engine.py')
+SCENARIOS = ('spawn', 'pooled', 'parallel', 'cold', 'cached')
+
+
+def tree_rss_mb() -> Optional[float]:
+    """Resident memory of this process and all its descendants in MB (None if unsupported)."""
+    try:
+        import psutil
+        me = psutil.Process()
+        procs = [me] + me.children(recursive=True)
+        total = 0
+        for p in procs:
+            try:
+                total += p.memory_info().rss
+            except psutil.Error:
+                pass
+        return round(total / 2**20, 1)
+    except ImportError:
+        pass
+    if not os.path.isdir('/proc'):
+        return None
+    # Linux without psutil: walk /proc for our descendants
+    parents: Dict[int, int] = {}
+    rss: Dict[int, int] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            pid = int(entry)
+            parents[pid] = int(fields[1])
+            rss[pid] = int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, IndexError, ValueError):
+            continue
+    tree, frontier = {os.getpid()}, [os.getpid()]
+    while frontier:
+        parent = frontier.pop()
+        for pid, ppid in parents.items():
+            if ppid == parent and pid not in tree:
+                tree.add(pid)
+                frontier.append(pid)
+    return round(sum(rss.get(pid, 0) for pid in tree) / 2**20, 1)
+
+
+def summarize(latencies_ms: List[float], errors: int, wall_s: float,
+              nps: List[int], rss_mb: Optional[float]) -> dict:
+    from src.engine.time_budget import percentile
+
+    def pct(q):
+        value = percentile(latencies_ms, q)
+        return round(value, 2) if value is not None else None
+
+    return {
+        'count': len(latencies_ms),
+        'errors': errors,
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+        'mean_ms': round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else None,
+        'max_ms': round(max(latencies_ms), 2) if latencies_ms else None,
+        'throughput_per_s': round(len(latencies_ms) / wall_s, 2) if wall_s > 0 else None,
+        'nps': int(sorted(nps)[len(nps) // 2]) if nps else None,
+        'rss_mb': rss_mb,
+    }
+
+
+def run_serial(fens: List[str], call: Callable[[str], Optional[str]], nps: Optional[List[int]] = None) -> dict:
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for fen in fens:
+        t = time.perf_counter()
+        move = call(fen)
+        latencies.append((time.perf_counter() - t) * 1000)
+        errors += move is None
+    wall = time.perf_counter() - started
+    return summarize(latencies, errors, wall, nps or [], tree_rss_mb())
+
+
+def run_parallel(fens: List[str], call: Callable[[str], Optional[str]], threads: int,
+                 nps: Optional[List[int]] = None) -> dict:
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    jobs = list(fens)
+
+    def work():
+        while True:
+            with lock:
+                if not jobs:
+                    return
+                fen = jobs.pop()
+            t = time.perf_counter()
+            move = call(fen)
+            elapsed = (time.perf_counter() - t) * 1000
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += move is None
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=work, daemon=True) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    wall = time.perf_counter() - started
+    return summarize(latencies, errors[0], wall, nps or [], tree_rss_mb())
+
+
+def run(args) -> dict:
+    # Configure the engine layer through its environment before importing it
+    if args.fake:
+        os.environ['STOCKFISH_PATH'] = FAKE_ENGINE
+    elif args.engine:
+        os.environ['STOCKFISH_PATH'] = args.engine
+    os.environ['ENGINE_POOL_SIZE'] = str(max(1, args.concurrency))
+    os.environ['ENGINE_BACKEND'] = args.backend
+    os.environ['ENGINE_PONDER'] = '0'
+    os.environ['ANALYSIS_LATENCY_TARGET_MS'] = '0'
+    os.environ['ANALYSIS_CACHE_DB'] = ''
+    for name in ('OPENING_BOOK_PATH', 'SYZYGY_PATH'):
+        # Book and tablebase hits would hide the engine latency being measured
+        os.environ[name] = ''
+    os.environ.setdefault('ENGINE_MANIFEST_PATH', os.path.join(tempfile.gettempdir(), 'chessai_bench_manifest.json'))
+
+    from src.engine import stockfish_engine as se
+    from src.engine.engine_locator import resolve_engine
+    from src.engine.uci_process import UciError
+
+    fens = positions(args.phase) * args.repeat
+    binary = resolve_engine()
+    if binary is None:
+        raise SystemExit('error: no engine binary found (use --engine PATH or --fake)')
+    depth, movetime = args.depth, args.movetime
+    report = {
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': {'platform': platform.platform(), 'python': platform.python_version(),
+                 'cpus': os.cpu_count()},
+        'engine': {'path': binary.path, 'version': binary.version, 'build': binary.build,
+                   'backend': args.backend, 'fake': bool(args.fake)},
+        'settings': {'depth': depth, 'movetime_ms': movetime, 'positions': len(fens),
+                     'phases': args.phase or list(CORPUS), 'concurrency': args.concurrency},
+        'scenarios': {},
+    }
+    scenarios = args.scenarios or list(SCENARIOS)
+
+    if 'spawn' in scenarios:
+        report['scenarios']['spawn'] = run_serial(fens, lambda fen: se._try_cli_stockfish(fen, depth))
+
+    pool = se.get_engine_pool()
+    if pool is not None:
+        warm_started = time.perf_counter()
+        pool.warm_up()
+        report['warm_up_ms'] = round((time.perf_counter() - warm_started) * 1000, 1)
+        nps: List[int] = []
+
+        def pooled(fen):
+            try:
+                with pool.engine() as engine:
+                    move = engine.search(fen, depth, movetime, timeout=movetime / 1000 + 3)
+                    if engine.last_info and engine.last_info.nps:
+                        nps.append(engine.last_info.nps)
+                    return move
+            except UciError:
+                # Counted as an error; the pool replaces the engine
+                return None
+
+        if 'pooled' in scenarios:
+            report['scenarios']['pooled'] = run_serial(fens, pooled, nps)
+        if 'parallel' in scenarios and args.concurrency > 1:
+            nps = []
+            report['scenarios']['parallel'] = run_parallel(fens, pooled, args.concurrency, nps)
+
+    if 'cold' in scenarios or 'cached' in scenarios:
+        cache = se.get_analysis_cache()
+        cache.clear()
+
+        def cold(fen):
+            cache.clear()
+            return se.get_best_move_for_fen(fen, depth)
+
+        if 'cold' in scenarios:
+            report['scenarios']['cold'] = run_serial(fens, cold)
+        if 'cached' in scenarios:
+            for fen in fens:
+                se.get_best_move_for_fen(fen, depth)
+            report['scenarios']['cached'] = run_serial(fens, lambda fen: se.get_best_move_for_fen(fen, depth))
+
+    se.shutdown_engine()
+    return report
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             timeout=5, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_report(report: dict, baseline: Optional[dict] = None, out=sys.stdout) -> None:
+    engine = report['engine']
+    settings = report['settings']
+    print(f"engine: {engine['version'] or engine['path']} ({engine['backend']})  "
+          f"depth {settings['depth']}, movetime {settings['movetime_ms']} ms, "
+          f"{settings['positions']} positions", file=out)
+    header = f"{'scenario':<10} {'p50':>9} {'p95':>9} {'p99':>9} {'pos/s':>8} {'Mnps':>6} {'RSS MB':>7} {'err':>4}"
+    print(header, file=out)
+    for name, s in report['scenarios'].items():
+        def ms(key):
+            return f"{s[key]:.1f}" if s[key] is not None else '-'
+        nps = f"{s['nps'] / 1e6:.2f}" if s['nps'] else '-'
+        rss = f"{s['rss_mb']:.0f}" if s['rss_mb'] is not None else '-'
+        line = (f"{name:<10} {ms('p50_ms'):>9} {ms('p95_ms'):>9} {ms('p99_ms'):>9} "
+                f"{s['throughput_per_s'] or 0:>8.1f} {nps:>6} {rss:>7} {s['errors']:>4}")
+        base = (baseline or {}).get('scenarios', {}).get(name)
+        if base and base.get('p50_ms') and s['p50_ms'] is not None:
+            line += f"  p50 {100 * (s['p50_ms'] / base['p50_ms'] - 1):+.0f}% vs {baseline.get('commit') or 'baseline'}"
+        print(line, file=out)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark engine latency: spawn vs pooled vs cached.')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--engine', help='engine binary (default: STOCKFISH_PATH / auto-detect)')
+    source.add_argument('--fake', action='store_true', help='use the scriptable fake engine')
+    parser.add_argument('--backend', choices=list(BACKENDS), default='uci', help='pool backend (default: uci)')
+    parser.add_argument('--depth', type=int, default=10)
+    parser.add_argument('--movetime', type=int, default=3000, help='per-position cap in ms')
+    parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 1,
+                        help='pool size and threads for the parallel scenario')
+    parser.add_argument('--phase', action='append', choices=list(CORPUS), help='limit to a corpus phase')
+    parser.add_argument('--repeat', type=int, default=1, help='run the corpus this many times')
+    parser.add_argument('--scenario', dest='scenarios', action='append', choices=SCENARIOS)
+    parser.add_argument('--json', help='write the report as JSON to this file')
+    parser.add_argument('--compare', help='earlier JSON report to compare p50 latency against')
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Structured engine output.
+
+``parse_info_line`` turns a UCI ``info ... pv ...`` line into an ``AnalysisResult``:
+the engine's evaluation of one line at one completed depth.
+"""
+from typing import List, Optional, Tuple
+
+# info tokens followed by a single integer, mapped to AnalysisResult attributes
+_INT_FIELDS = {
+    'depth': 'depth',
+    'seldepth': 'seldepth',
+    'multipv': 'multipv',
+    'nodes': 'nodes',
+    'nps': 'nps',
+    'time': 'time_ms',
+    'hashfull': 'hashfull',
+    'tbhits': 'tbhits',
+}
+
+
+class AnalysisResult:
+    """One PV line at one depth. Scores are from the side to move's point of view."""
+    __slots__ = ('depth', 'seldepth', 'multipv', 'score_cp', 'mate', 'bound', 'wdl',
+                 'nodes', 'nps', 'time_ms', 'hashfull', 'tbhits', 'pv')
+
+    def __init__(self, depth: int = 0, pv: Optional[List[str]] = None):
+        self.depth = depth
+        self.seldepth = 0
+        self.multipv = 1
+        self.score_cp: Optional[int] = None
+        self.mate: Optional[int] = None
+        self.bound: Optional[str] = None  # 'lowerbound' / 'upperbound' for fail-high/low lines
+        self.wdl: Optional[Tuple[int, int, int]] = None  # win/draw/loss per mille (UCI_ShowWDL)
+        self.nodes = 0
+        self.nps = 0
+        self.time_ms = 0
+        self.hashfull = 0
+        self.tbhits = 0
+        self.pv: List[str] = list(pv or [])
+
+    @property
+    def move(self) -> Optional[str]:
+        return self.pv[0] if self.pv else None
+
+    def score_text(self) -> str:
+        """Human readable score: '+0.35', '-1.20', '#3', '#-2' or '?'."""
+        if self.mate is not None:
+            return f'#{self.mate}'
+        if self.score_cp is not None:
+            return f'{self.score_cp / 100:+.2f}'
+        return '?'
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f'AnalysisResult(depth={self.depth}, move={self.move!r}, score={self.score_text()})'
+
+
+def parse_info_line(line: str) -> Optional[AnalysisResult]:
+    """Parse an ``info`` line carrying a PV; returns None for any other line."""
+    tokens = line.split()
+    if not tokens or tokens[0] != 'info' or 'pv' not in tokens:
+        return None
+    result = AnalysisResult()
+    i = 1
+    try:
+        while i < len(tokens):
+            token = tokens[i]
+            if token == 'pv':
+                result.pv = tokens[i + 1:]
+                break
+            if token == 'string':
+                break
+            if token == 'score':
+                kind, value = tokens[i + 1], int(tokens[i + 2])
+                if kind == 'cp':
+                    result.score_cp = value
+                elif kind == 'mate':
+                    result.mate = value
+                i += 3
+                if i < len(tokens) and tokens[i] in ('lowerbound', 'upperbound'):
+                    result.bound = tokens[i]
+                    i += 1
+                continue
+            if token == 'wdl':
+                result.wdl = (int(tokens[i + 1]), int(tokens[i + 2]), int(tokens[i + 3]))
+                i += 4
+                continue
+            if token in _INT_FIELDS:
+                setattr(result, _INT_FIELDS[token], int(tokens[i + 1]))
+                i += 2
+                continue
+            i += 1
+    except (IndexError, ValueError):
+        return None
+    return result if result.pv else None
@@ -0,0 +1,118 @@
+"""Two-tier cache of engine results: in-memory LRU plus an optional SQLite file.
+
+Entries are keyed by the polyglot Zobrist hash of the position, so the same
+position read with different move counters or FEN spacing still hits. A result
+searched to depth D answers any request for depth <= D.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import chess.polyglot
+
+from src.ocr.fen_generator import parse_fen
+
+
+def position_key(fen: str) -> int:
+    """Polyglot Zobrist hash of ``fen`` (piece placement, turn, castling, en passant)."""
+    return chess.polyglot.zobrist_hash(parse_fen(fen).to_board())
+
+
+class CacheEntry:
+    __slots__ = ('best_move', 'depth')
+
+    def __init__(self, best_move: str, depth: int):
+        self.best_move = best_move
+        self.depth = depth
+
+    def __repr__(self) -> str:
+        return f'CacheEntry({self.best_move!r}, depth={self.depth})'
+
+
+class AnalysisCache:
+    """Thread-safe LRU of ``CacheEntry`` objects with optional SQLite persistence."""
+
+    def __init__(self, max_entries: int = 4096, db_path: Optional[str] = None):
+        self.max_entries = max(1, int(max_entries))
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[int, CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS analysis ('
+                ' key INTEGER PRIMARY KEY, depth INTEGER NOT NULL,'
+                ' best_move TEXT NOT NULL, updated REAL NOT NULL)'
+            )
+            self._db.commit()
+
+    def get(self, fen: str, depth: int) -> Optional[CacheEntry]:
+        """Return a cached entry searched at least as deep as ``depth``, else None."""
+        key = position_key(fen)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    'SELECT best_move, depth FROM analysis WHERE key = ?', (_to_sql(key),)
+                ).fetchone()
+                if row:
+                    entry = CacheEntry(row[0], row[1])
+                    self._remember(key, entry)
+            if entry is not None and entry.depth >= depth:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def put(self, fen: str, depth: int, best_move: str) -> None:
+        """Store a result unless a deeper one is already cached for the position."""
+        if not best_move or depth <= 0:
+            return
+        key = position_key(fen)
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current.depth > depth:
+                return
+            self._remember(key, CacheEntry(best_move, depth))
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT INTO analysis (key, depth, best_move, updated) VALUES (?, ?, ?, ?)'
+                    ' ON CONFLICT(key) DO UPDATE SET depth = excluded.depth,'
+                    ' best_move = excluded.best_move, updated = excluded.updated'
+                    ' WHERE excluded.depth >= analysis.depth',
+                    (_to_sql(key), depth, best_move, time.time())
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Drop the in-memory tier (the SQLite file is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: int, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _to_sql(key: int) -> int:
+    """Map an unsigned 64-bit Zobrist key onto SQLite's signed INTEGER range."""
+    return key - (1 << 64) if key >= (1 << 63) else key
@@ -0,0 +1,201 @@
+"""Asyncio front-end for a long-lived UCI engine.
+
+Same protocol as ``UciProcess`` but on non-blocking subprocess pipes. A running
+search is cancelled with UCI ``stop`` (the engine answers with its partial
+``bestmove``) instead of killing the process, so a newer capture can supersede a
+stale search without a respawn.
+"""
+import asyncio
+import subprocess
+import sys
+import time
+from typing import AsyncIterator, Dict, Optional
+
+from src.engine.analysis import AnalysisResult, parse_info_line
+from src.engine.uci_process import UciError, UciTimeout
+from src.utils.helpers import short_log
+
+
+class AsyncUciEngine:
+    """One engine process driven from an asyncio event loop."""
+
+    def __init__(self, path: str, options: Optional[Dict[str, object]] = None):
+        self.path = path
+        self.options = dict(options or {})
+        self.name: Optional[str] = None
+        self.last_depth = 0
+        self.last_bestmove: Optional[str] = None
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._searching = False
+        self._search_done: Optional[asyncio.Event] = None
+
+    async def start(self, timeout: float = 5.0) -> None:
+        """Spawn the process, run the ``uci`` handshake and wait for ``readyok``."""
+        # Created here so they bind to the running loop (Python 3.8/3.9)
+        self._lock = asyncio.Lock()
+        self._search_done = asyncio.Event()
+        self._search_done.set()
+        kwargs = {}
+        if sys.platform == 'win32' and hasattr(subprocess, 'CREATE_NO_WINDOW'):
+            kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+        try:
+            self._proc = await asyncio.create_subprocess_exec(
+                self.path,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                **kwargs
+            )
+        except OSError as e:
+            raise UciError(f'could not start engine at {self.path}: {e}')
+
+        deadline = time.monotonic() + timeout
+        self._send('uci')
+        while True:
+            line = await self._wait_for(('id name', 'uciok'), deadline - time.monotonic())
+            if line.startswith('id name'):
+                self.name = line[len('id name'):].strip()
+            else:
+                break
+        for option, value in self.options.items():
+            self._send(f'setoption name {option} value {value}')
+        self._send('isready')
+        await self._wait_for('readyok', deadline - time.monotonic())
+
+    def is_alive(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None
+
+    @property
+    def searching(self) -> bool:
+        return self._searching
+
+    async def iter_search(self, fen: str, depth: int = 20, movetime: int = 3000,
+                          timeout: Optional[float] = None,
+                          supersede: bool = True) -> AsyncIterator[AnalysisResult]:
+        """Search ``fen`` and yield an update per completed depth.
+
+        With ``supersede`` a search still running on this engine is stopped first
+        (its caller gets the partial bestmove). The final bestmove is left in
+        ``last_bestmove``. If you break out early, close the iterator
+        (``contextlib.aclosing``) so the engine is released right away.
+        """
+        if supersede:
+            self.stop()
+        if timeout is None:
+            timeout = movetime / 1000 + 3
+        async with self._lock:
+            self._searching = True
+            self._search_done.clear()
+            self.last_depth = 0
+            self.last_bestmove = None
+            finished = False
+            try:
+                self._send(f'position fen {fen}')
+                self._send(f'go depth {depth} movetime {movetime}')
+                deadline = time.monotonic() + timeout
+                while True:
+                    try:
+                        line = await self._wait_for(('info', 'bestmove'), deadline - time.monotonic())
+                    except UciTimeout:
+                        short_log('⚠️ Stockfish search overran its timeout, sending stop')
+                        self._send('stop')
+                        line = await self._wait_for('bestmove', 1.0)
+                    if line.startswith('bestmove'):
+                        finished = True
+                        self._set_bestmove(line)
+                        return
+                    update = parse_info_line(line)
+                    if update is None or update.bound or update.multipv != 1:
+                        continue
+                    self.last_depth = max(self.last_depth, update.depth)
+                    yield update
+            finally:
+                if not finished and self.is_alive():
+                    # Consumer went away or the task was cancelled: stop, keep the process
+                    try:
+                        self._send('stop')
+                        self._set_bestmove(await self._wait_for('bestmove', 1.0))
+                    except (UciError, asyncio.CancelledError):
+                        pass
+                self._searching = False
+                self._search_done.set()
+
+    async def search(self, fen: str, depth: int = 20, movetime: int = 3000,
+                     timeout: Optional[float] = None, supersede: bool = True) -> Optional[str]:
+        """Return the bestmove for ``fen`` (None for '(none)'); partial if cancelled via ``stop``."""
+        async for _ in self.iter_search(fen, depth, movetime, timeout, supersede):
+            pass
+        return self.last_bestmove
+
+    def stop(self) -> bool:
+        """Send ``stop`` to a running search without waiting. Returns True if one was running."""
+        if not self._searching or not self.is_alive():
+            return False
+        try:
+            self._send('stop')
+        except UciError:
+            return False
+        return True
+
+    async def cancel(self) -> Optional[str]:
+        """Stop the running search and wait for its partial bestmove."""
+        if self.stop():
+            await self._search_done.wait()
+        return self.last_bestmove
+
+    async def close(self, timeout: float = 1.0) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None or proc.returncode is not None:
+            return
+        try:
+            proc.stdin.write(b'quit\n')
+            await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+        try:
+            await asyncio.wait_for(proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+
+    def kill(self) -> None:
+        """Kill the process without awaiting it, for callers outside its event loop (e.g. at exit)."""
+        proc, self._proc = self._proc, None
+        if proc is None or proc.returncode is not None:
+            return
+        try:
+            proc.kill()
+        except (ProcessLookupError, OSError):
+            pass
+
+    def _send(self, command: str) -> None:
+        # StreamWriter.write() only buffers: never blocks the loop, which is what
+        # keeps stop() well under a millisecond
+        if not self.is_alive():
+            raise UciError('engine is not running')
+        try:
+            self._proc.stdin.write((command + '\n').encode())
+        except (BrokenPipeError, ConnectionResetError, OSError) as e:
+            raise UciError(f"error sending '{command}': {e}")
+
+    async def _wait_for(self, prefix, timeout: float) -> str:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise UciTimeout(f"timed out waiting for '{prefix}'")
+            try:
+                raw = await asyncio.wait_for(self._proc.stdout.readline(), remaining)
+            except asyncio.TimeoutError:
+                raise UciTimeout(f"timed out waiting for '{prefix}'")
+            if not raw:
+                raise UciError('engine exited')
+            line = raw.decode(errors='replace').strip()
+            if line.startswith(prefix):
+                return line
+
+    def _set_bestmove(self, line: str) -> None:
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] != '(none)':
+            self.last_bestmove = parts[1]
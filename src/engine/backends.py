@@ -0,0 +1,372 @@
+"""Interchangeable engine backends.
+
+Every backend implements ``EngineBackend``: the lifecycle and search methods
+``EnginePool`` and the callers in stockfish_engine.py rely on, raising
+``UciError``/``UciTimeout`` and yielding ``AnalysisResult`` updates. That lets
+the pool, search limits, caching and the benchmarks run unchanged on top of:
+
+- ``uci``: our own ``UciProcess`` (persistent process, hand-written UCI I/O)
+- ``chess``: python-chess ``chess.engine.SimpleEngine.popen_uci``
+- ``python-stockfish``: the ``stockfish`` package, one persistent instance
+- ``fake``: an in-process stand-in with deterministic moves and no binary
+"""
+import abc
+import concurrent.futures
+import hashlib
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Protocol
+
+import chess
+import chess.engine
+
+from src.engine.analysis import AnalysisResult
+from src.engine.uci_process import UciError, UciProcess
+
+
+class EngineBackend(Protocol):
+    """What a pooled engine must provide."""
+    path: str
+    name: Optional[str]
+    last_used: float
+    last_depth: int
+    last_bestmove: Optional[str]
+    last_ponder: Optional[str]
+    last_info: Optional[AnalysisResult]
+
+    def start(self, timeout: float = 5.0) -> None: ...
+    def is_alive(self) -> bool: ...
+    def is_ready(self, timeout: float = 2.0) -> bool: ...
+    def sync(self, timeout: float = 1.0) -> bool: ...
+    def stop(self) -> None: ...
+    def close(self, timeout: float = 1.0) -> None: ...
+
+    def iter_search(self, fen: str, depth: int, movetime: int = 3000, timeout: float = 6.0,
+                    multipv: int = 1, nodes: Optional[int] = None) -> Iterator[AnalysisResult]: ...
+
+    def search(self, fen: str, depth: int, movetime: int = 3000, timeout: float = 6.0,
+               nodes: Optional[int] = None) -> Optional[str]: ...
+
+    def analyse(self, fen: str, depth: int, multipv: int = 1, movetime: int = 3000,
+                timeout: float = 6.0, nodes: Optional[int] = None) -> List[AnalysisResult]: ...
+
+
+class _BackendBase(abc.ABC):
+    """Shared bookkeeping; subclasses implement ``_run_search``."""
+
+    def __init__(self, path: str, options: Optional[Dict[str, object]] = None):
+        self.path = path
+        self.options = dict(options or {})
+        self.name: Optional[str] = None
+        self.last_used = 0.0
+        self.last_depth = 0
+        self.last_bestmove: Optional[str] = None
+        self.last_ponder: Optional[str] = None
+        self.last_info: Optional[AnalysisResult] = None
+
+    def sync(self, timeout: float = 1.0) -> bool:
+        return self.is_alive() and self.is_ready(timeout)
+
+    def iter_search(self, fen: str, depth: int, movetime: int = 3000, timeout: float = 6.0,
+                    multipv: int = 1, nodes: Optional[int] = None) -> Iterator[AnalysisResult]:
+        """Same contract as ``UciProcess.iter_search``."""
+        if not self.is_alive():
+            raise UciError('engine is not running')
+        self.last_depth = 0
+        self.last_bestmove = None
+        self.last_ponder = None
+        self.last_info = None
+        try:
+            for update in self._run_search(fen, depth, movetime, timeout, max(1, multipv), nodes):
+                if update.multipv == 1:
+                    self.last_depth = max(self.last_depth, update.depth)
+                    self.last_info = update
+                yield update
+        finally:
+            self.last_used = time.monotonic()
+
+    def search(self, fen: str, depth: int, movetime: int = 3000, timeout: float = 6.0,
+               nodes: Optional[int] = None) -> Optional[str]:
+        for _ in self.iter_search(fen, depth, movetime, timeout, nodes=nodes):
+            pass
+        return self.last_bestmove
+
+    def analyse(self, fen: str, depth: int, multipv: int = 1, movetime: int = 3000,
+                timeout: float = 6.0, nodes: Optional[int] = None) -> List[AnalysisResult]:
+        lines: Dict[int, AnalysisResult] = {}
+        for update in self.iter_search(fen, depth, movetime, timeout, multipv=multipv, nodes=nodes):
+            lines[update.multipv] = update
+        return [lines[k] for k in sorted(lines)]
+
+    @abc.abstractmethod
+    def _run_search(self, fen: str, depth: int, movetime: int, timeout: float, multipv: int,
+                    nodes: Optional[int]) -> Iterator[AnalysisResult]: ...
+
+
+class ChessEngineBackend(_BackendBase):
+    """Persistent UCI engine driven by python-chess ``SimpleEngine``."""
+
+    def __init__(self, path: str, options: Optional[Dict[str, object]] = None):
+        super().__init__(path, options)
+        self._engine = None
+        self._analysis = None
+
+    def start(self, timeout: float = 5.0) -> None:
+        try:
+            self._engine = chess.engine.SimpleEngine.popen_uci(self.path, timeout=timeout)
+            # MultiPV/Ponder are managed by python-chess per search, not configured
+            options = {k: v for k, v in self.options.items()
+                       if k.lower() not in chess.engine.MANAGED_OPTIONS and k in self._engine.options}
+            if 'UCI_ShowWDL' in self._engine.options:
+                options['UCI_ShowWDL'] = True
+            self._engine.configure(options)
+        except (chess.engine.EngineError, OSError, TimeoutError) as e:
+            self.close()
+            raise UciError(f'could not start engine at {self.path}: {e}')
+        self.name = self._engine.id.get('name')
+        self.last_used = time.monotonic()
+
+    def is_alive(self) -> bool:
+        return self._engine is not None and not self._engine.protocol.returncode.done()
+
+    def is_ready(self, timeout: float = 2.0) -> bool:
+        try:
+            self._engine.ping()
+            return True
+        except Exception:
+            return False
+
+    def stop(self) -> None:
+        analysis = self._analysis
+        if analysis is not None:
+            _stop_quietly(analysis)
+
+    def close(self, timeout: float = 1.0) -> None:
+        engine, self._engine = self._engine, None
+        if engine is not None:
+            try:
+                engine.quit()
+            except Exception:
+                engine.close()
+
+    def _run_search(self, fen, depth, movetime, timeout, multipv, nodes):
+        board = chess.Board(fen)
+        limit = chess.engine.Limit(depth=depth, time=movetime / 1000 if movetime else None, nodes=nodes)
+        try:
+            self._analysis = analysis = self._engine.analysis(board, limit, multipv=multipv)
+        except chess.engine.EngineError as e:
+            raise UciError(str(e))
+        # Same overrun policy as UciProcess: stop and keep the partial result
+        watchdog = threading.Timer(timeout, self._overrun, args=(analysis,))
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            for info in analysis:
+                update = _from_info(info, board.turn)
+                if update is not None:
+                    yield update
+            best = analysis.wait()
+        except chess.engine.EngineTerminatedError as e:
+            raise UciError(f'engine exited ({e})')
+        except chess.engine.EngineError as e:
+            # e.g. an illegal bestmove, which python-chess refuses to parse
+            raise UciError(str(e))
+        except concurrent.futures.CancelledError:
+            raise UciError('engine did not answer stop and was killed')
+        finally:
+            watchdog.cancel()
+            _stop_quietly(analysis)
+            self._analysis = None
+        self.last_bestmove = best.move.uci() if best.move else None
+        self.last_ponder = best.ponder.uci() if best.ponder else None
+
+    def _overrun(self, analysis) -> None:
+        _stop_quietly(analysis)
+        # Still no bestmove a second later: the engine is hung, kill it so the search ends
+        watchdog = threading.Timer(1.0, self._kill_if_searching, args=(analysis,))
+        watchdog.daemon = True
+        watchdog.start()
+
+    def _kill_if_searching(self, analysis) -> None:
+        engine = self._engine
+        if self._analysis is analysis and engine is not None:
+            engine.close()
+
+
+def _stop_quietly(analysis) -> None:
+    try:
+        analysis.stop()
+    except chess.engine.EngineError:
+        # Engine already gone: nothing left to stop
+        pass
+
+
+def _from_info(info: dict, turn: chess.Color) -> Optional[AnalysisResult]:
+    """python-chess ``InfoDict`` -> AnalysisResult (None for fail-high/low or PV-less lines)."""
+    if 'pv' not in info or info.get('lowerbound') or info.get('upperbound'):
+        return None
+    update = AnalysisResult(info.get('depth', 0), [m.uci() for m in info['pv']])
+    update.seldepth = info.get('seldepth', 0)
+    update.multipv = info.get('multipv', 1)
+    update.nodes = info.get('nodes', 0)
+    update.nps = info.get('nps', 0)
+    update.time_ms = int(info.get('time', 0) * 1000)
+    update.hashfull = info.get('hashfull', 0)
+    update.tbhits = info.get('tbhits', 0)
+    score = info.get('score')
+    if score is not None:
+        pov = score.pov(turn)
+        if pov.is_mate():
+            update.mate = pov.mate()
+        else:
+            update.score_cp = pov.score()
+    wdl = info.get('wdl')
+    if wdl is not None:
+        w = wdl.pov(turn)
+        update.wdl = (w.wins, w.draws, w.losses)
+    return update
+
+
+# Parameters python-stockfish accepts, for package versions that don't expose their defaults
+PYTHON_STOCKFISH_OPTIONS = frozenset({
+    'Debug Log File', 'Contempt', 'Min Split Depth', 'Threads', 'Ponder', 'Hash', 'MultiPV',
+    'Skill Level', 'Move Overhead', 'Minimum Thinking Time', 'Slow Mover', 'UCI_Chess960',
+    'UCI_LimitStrength', 'UCI_Elo',
+})
+
+
+class PythonStockfishBackend(_BackendBase):
+    """The ``stockfish`` package, kept as one persistent instance (blocking, no streaming)."""
+
+    def __init__(self, path: str, options: Optional[Dict[str, object]] = None):
+        super().__init__(path, options)
+        self._sf = None
+
+    def start(self, timeout: float = 5.0) -> None:
+        try:
+            from stockfish import Stockfish
+        except ImportError:
+            raise UciError('python-stockfish is not installed')
+        # The package raises ValueError for options it doesn't know (e.g. EvalFile)
+        supported = getattr(Stockfish, '_DEFAULT_STOCKFISH_PARAMS', None) or PYTHON_STOCKFISH_OPTIONS
+        parameters = {k: v for k, v in self.options.items() if k in supported}
+        try:
+            self._sf = Stockfish(path=self.path, parameters=parameters) if self.path else Stockfish()
+        except Exception as e:
+            raise UciError(f'could not initialize python-stockfish: {str(e)[:100]}')
+        self.name = 'python-stockfish'
+        self.last_used = time.monotonic()
+
+    def is_alive(self) -> bool:
+        # The package keeps its subprocess.Popen in a private attribute
+        proc = getattr(self._sf, '_stockfish', None)
+        return proc is not None and proc.poll() is None
+
+    def is_ready(self, timeout: float = 2.0) -> bool:
+        return self.is_alive()
+
+    def stop(self) -> None:
+        # python-stockfish searches are blocking calls; nothing to interrupt
+        pass
+
+    def close(self, timeout: float = 1.0) -> None:
+        sf, self._sf = self._sf, None
+        if sf is not None:
+            try:
+                sf.send_quit_command()
+            except Exception:
+                pass
+
+    def _run_search(self, fen, depth, movetime, timeout, multipv, nodes):
+        if multipv > 1 or nodes:
+            raise UciError('python-stockfish backend supports neither MultiPV nor node limits')
+        try:
+            self._sf.set_fen_position(fen)
+            self._sf.set_depth(depth)
+            best = self._sf.get_best_move_time(movetime) if movetime else self._sf.get_best_move()
+        except Exception as e:
+            raise UciError(f'python-stockfish failed: {str(e)[:100]}')
+        self.last_bestmove = best
+        if best:
+            yield AnalysisResult(depth, [best])
+
+
+class FakeBackend(_BackendBase):
+    """In-process engine stand-in: legal, deterministic moves at a simulated speed.
+
+    Each depth takes ``depth_ms`` and reports ``nps``; the best move is picked
+    from the legal moves by a hash of the position, so results are repeatable.
+    """
+
+    def __init__(self, path: str = '', options: Optional[Dict[str, object]] = None,
+                 depth_ms: float = 2.0, nps: int = 1_000_000):
+        super().__init__(path, options)
+        self.depth_ms = depth_ms
+        self.nps = nps
+        self._running = False
+        self._stop = threading.Event()
+
+    def start(self, timeout: float = 5.0) -> None:
+        self.name = 'Fake'
+        self._running = True
+        self.last_used = time.monotonic()
+
+    def is_alive(self) -> bool:
+        return self._running
+
+    def is_ready(self, timeout: float = 2.0) -> bool:
+        return self._running
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def close(self, timeout: float = 1.0) -> None:
+        self._running = False
+        self._stop.set()
+
+    def _run_search(self, fen, depth, movetime, timeout, multipv, nodes):
+        board = chess.Board(fen)
+        moves = sorted(m.uci() for m in board.legal_moves)
+        self._stop.clear()
+        if not moves:
+            return
+        seed = int(hashlib.sha1(board.board_fen().encode()).hexdigest(), 16)
+        start = time.monotonic()
+        deadline = start + min(movetime / 1000 if movetime else timeout, timeout)
+        for d in range(1, depth + 1):
+            if self._stop.wait(self.depth_ms / 1000) or time.monotonic() > deadline:
+                break
+            elapsed_ms = max(1, int((time.monotonic() - start) * 1000))
+            for k in range(min(multipv, len(moves))):
+                update = AnalysisResult(d, [moves[(seed + k) % len(moves)]])
+                update.multipv = k + 1
+                update.score_cp = (seed % 61) - 30 - 10 * k
+                update.nps = self.nps
+                update.nodes = self.nps * elapsed_ms // 1000
+                update.time_ms = elapsed_ms
+                yield update
+            if nodes and self.nps * elapsed_ms // 1000 >= nodes:
+                break
+        self.last_bestmove = moves[seed % len(moves)]
+
+
+BACKENDS = {
+    'uci': UciProcess,
+    'chess': ChessEngineBackend,
+    'python-stockfish': PythonStockfishBackend,
+    'fake': FakeBackend,
+}
+
+
+def create_backend(kind: str, path: str, options: Optional[Dict[str, object]] = None) -> EngineBackend:
+    """Instantiate the backend registered as ``kind`` (not started yet)."""
+    try:
+        cls = BACKENDS[kind]
+    except KeyError:
+        # UciError, so callers fall back exactly as they do for a missing binary
+        raise UciError(f"unknown engine backend '{kind}' (choose from {', '.join(BACKENDS)})")
+    return cls(path, options)
+
+
+def needs_binary(kind: str) -> bool:
+    return kind != 'fake'
@@ -0,0 +1,206 @@
+"""Bulk position analysis across a pool of engines.
+
+Positions (FEN strings or an EPD/FEN file) are fanned out to one Stockfish
+worker per core and results stream back in completion order. Queues are
+bounded, so a slow consumer throttles the workers and a huge input file is
+never read into memory.
+
+Usage:
+    python -m src.engine.batch positions.epd --depth 14 --output results.jsonl
+    cat fens.txt | python -m src.engine.batch - --workers 8
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+import chess
+
+from src.engine.backends import BACKENDS, needs_binary
+from src.engine.engine_options import auto_profile
+from src.engine.engine_pool import EnginePool
+from src.engine.stockfish_engine import _validate_fen_strict, find_engine_path
+from src.engine.uci_process import UciError
+
+Position = Union[str, Tuple[str, Optional[str]]]
+
+_DONE = object()
+
+
+def read_positions(path: str) -> Iterator[Tuple[str, Optional[str]]]:
+    """Yield ``(fen, id)`` from a file of FEN or EPD lines ('-' reads stdin).
+
+    EPD lines keep their ``id`` opcode, with or without move counters before
+    the opcodes; blank lines and '#' comments are skipped. The file is opened
+    straight away, so a missing one raises OSError here, not in a reader thread.
+    """
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    return _iter_positions(stream)
+
+
+def _iter_positions(stream) -> Iterator[Tuple[str, Optional[str]]]:
+    try:
+        for line in stream:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            yield _parse_position(line)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _parse_position(line: str) -> Tuple[str, Optional[str]]:
+    fields = line.split(None, 6)
+    fen = None
+    if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit():
+        # Six-field FEN, possibly with EPD opcodes after the move counters
+        fen = ' '.join(fields[:6])
+        line = ' '.join(fields[:4] + fields[6:])
+    try:
+        board, ops = chess.Board.from_epd(line)
+    except ValueError:
+        # Let the worker report it as an invalid position
+        return fen or line, None
+    position_id = ops.get('id')
+    return fen or board.fen(), str(position_id) if position_id is not None else None
+
+
+def analyse_batch(positions: Iterable[Position], depth: int = 12, multipv: int = 1,
+                  movetime: int = 3000, workers: Optional[int] = None,
+                  engine_path: Optional[str] = None, backend: str = 'uci') -> Iterator[dict]:
+    """Analyse every position and yield one result record per position, as each finishes.
+
+    ``positions`` holds FEN strings or ``(fen, id)`` pairs. Records carry the
+    input ``index`` so callers can restore input order if they need it.
+    ``backend`` picks the engine driver (see backends.py) so drivers can be
+    compared on the same input.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    path = engine_path or find_engine_path() or ''
+    if not path and needs_binary(backend):
+        raise UciError('Stockfish binary not found (set STOCKFISH_PATH)')
+
+    # One core per worker by default: throughput beats per-position speed here
+    pool = EnginePool(path, size=workers, options=auto_profile(workers).uci_options(), backend=backend)
+    jobs: queue.Queue = queue.Queue(maxsize=workers * 2)
+    results: queue.Queue = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+    failures = []  # raised while reading ``positions``, re-raised to the caller
+
+    def put(q: queue.Queue, item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for index, item in enumerate(positions):
+                fen, position_id = (item, None) if isinstance(item, str) else item
+                if not put(jobs, (index, fen, position_id)):
+                    return
+        except Exception as e:
+            failures.append(e)
+        finally:
+            for _ in range(workers):
+                put(jobs, None)
+
+    def work() -> None:
+        try:
+            while not stop.is_set():
+                try:
+                    job = jobs.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if job is None or not put(results, _analyse_one(pool, job, depth, multipv, movetime)):
+                    return
+        finally:
+            put(results, _DONE)
+
+    threads = [threading.Thread(target=produce, daemon=True)]
+    threads += [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    try:
+        running = workers
+        while running:
+            record = results.get()
+            if record is _DONE:
+                running -= 1
+                continue
+            yield record
+        if failures:
+            raise failures[0]
+    finally:
+        stop.set()
+        pool.close()
+
+
+def _analyse_one(pool: EnginePool, job, depth: int, multipv: int, movetime: int) -> dict:
+    index, fen, position_id = job
+    record = {'index': index, 'id': position_id, 'fen': fen}
+    is_valid, error_msg = _validate_fen_strict(fen)
+    if not is_valid:
+        record['error'] = error_msg
+        return record
+    start = time.perf_counter()
+    try:
+        with pool.engine() as engine:
+            lines = engine.analyse(fen, depth, multipv, movetime, timeout=movetime / 1000 + 3)
+            record['bestmove'] = engine.last_bestmove
+    except UciError as e:
+        record['error'] = str(e)
+        return record
+    record['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    record['lines'] = [line.to_dict() for line in lines]
+    return record
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Analyse many positions in parallel and write JSONL.')
+    parser.add_argument('input', help="file with one FEN or EPD per line ('-' for stdin)")
+    parser.add_argument('--output', '-o', default='-', help="JSONL output file ('-' for stdout)")
+    parser.add_argument('--depth', type=int, default=12)
+    parser.add_argument('--multipv', type=int, default=1)
+    parser.add_argument('--movetime', type=int, default=3000, help='per-position cap in ms')
+    parser.add_argument('--workers', type=int, default=None, help='engines to run (default: CPU count)')
+    parser.add_argument('--backend', choices=list(BACKENDS), default='uci', help='engine driver (default: uci)')
+    args = parser.parse_args(argv)
+
+    try:
+        positions = read_positions(args.input)
+    except OSError as e:
+        print(f'error: cannot read {args.input}: {e}', file=sys.stderr)
+        return 1
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    count = errors = 0
+    start = time.perf_counter()
+    try:
+        for record in analyse_batch(positions, args.depth, args.multipv,
+                                    args.movetime, args.workers, backend=args.backend):
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            count += 1
+            errors += 'error' in record
+    except (UciError, OSError, ValueError) as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f'{count} positions ({errors} errors) in {elapsed:.1f}s, '
+          f'{count / elapsed if elapsed else 0:.1f} positions/s', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,434 @@
+"""Analysis spread over several machines: TCP workers and a coordinator.
+
+A worker wraps an ``EnginePool`` and serves newline-delimited JSON over TCP.
+The coordinator keeps a connection to every worker, sends each position to
+the least loaded one (jobs in flight / engines) and hands results back through
+futures as they arrive. If a worker's connection drops, its in-flight jobs are
+re-queued on the remaining workers; lost workers are reconnected in the
+background.
+
+Protocol (one JSON object per line):
+    worker -> client  {"type": "hello", "capacity": 4, "engine": "Stockfish 17"}
+    client -> worker  {"type": "analyse", "id": 7, "fen": "...", "depth": 12, "movetime": 3000, "multipv": 1}
+    worker -> client  {"type": "result", "id": 7, "bestmove": "e2e4", "depth": 12, "lines": [...], "elapsed_ms": 812.5}
+    worker -> client  {"type": "result", "id": 7, "error": "..."}
+
+There is no authentication: workers listen on 127.0.0.1 unless given
+``--host`` (e.g. 0.0.0.0 on a trusted network).
+
+Usage (several workers on one box):
+    python -m src.engine.distributed worker --port 7601 --engines 2
+    python -m src.engine.distributed worker --port 7602 --engines 2
+    python -m src.engine.distributed analyse positions.epd --worker localhost:7601 --worker localhost:7602
+"""
+import argparse
+import itertools
+import json
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.engine.engine_options import auto_profile
+from src.engine.engine_pool import EnginePool
+from src.engine.uci_process import UciError
+from src.utils.helpers import short_log
+
+DEFAULT_PORT = 7601
+
+
+def parse_address(text: str) -> Tuple[str, int]:
+    """'host:port' (or just 'host') -> (host, port)."""
+    host, _, port = text.strip().rpartition(':')
+    if not host:
+        return port or 'localhost', DEFAULT_PORT
+    return host, int(port)
+
+
+def _send(sock_file, lock: threading.Lock, message: dict) -> None:
+    data = (json.dumps(message) + '\n').encode('utf-8')
+    with lock:
+        sock_file.write(data)
+        sock_file.flush()
+
+
+def _settle(future: Future, result: Optional[dict] = None, error: Optional[Exception] = None) -> bool:
+    """Set ``future``'s outcome unless another thread already did (a late answer racing ``forget``)."""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        return False
+    return True
+
+
+# -- worker ------------------------------------------------------------------
+
+
+class AnalysisWorker:
+    """Serves analysis requests from a pool of ``engines`` local engines."""
+
+    def __init__(self, engine_path: str, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 engines: int = 1):
+        self.pool = EnginePool(engine_path, size=engines, options=auto_profile(engines).uci_options())
+        self.executor = ThreadPoolExecutor(max_workers=self.pool.size)
+        self.engine_name: Optional[str] = None
+        worker = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                worker._serve(self.rfile, self.wfile)
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self.server = Server((host, port), Handler)
+        self.address = self.server.server_address
+
+    def serve_forever(self) -> None:
+        self.pool.warm_up()
+        with self.pool.engine() as engine:
+            self.engine_name = engine.name
+        self.server.serve_forever()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.executor.shutdown(wait=False)
+        self.pool.close()
+
+    def _serve(self, rfile, wfile) -> None:
+        lock = threading.Lock()
+        try:
+            _send(wfile, lock, {'type': 'hello', 'capacity': self.pool.size, 'engine': self.engine_name})
+            for raw in rfile:
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    continue
+                if message.get('type') == 'analyse':
+                    self.executor.submit(self._analyse, message, wfile, lock)
+        except (OSError, ValueError):
+            # Client went away; jobs still running just fail to write
+            pass
+
+    def _analyse(self, message: dict, wfile, lock: threading.Lock) -> None:
+        from src.engine.stockfish_engine import _validate_fen_strict
+
+        reply = {'type': 'result', 'id': message.get('id')}
+        started = time.perf_counter()
+        fen = message.get('fen')
+        # Never hand a malformed FEN from the network to the engine: it can crash on one
+        is_valid, error_msg = _validate_fen_strict(fen)
+        if not is_valid:
+            reply['error'] = f'invalid FEN: {error_msg}'
+        else:
+            try:
+                depth = int(message.get('depth', 12))
+                movetime = int(message.get('movetime', 3000))
+                with self.pool.engine() as engine:
+                    lines = engine.analyse(fen.strip(), depth, int(message.get('multipv', 1)), movetime,
+                                           timeout=movetime / 1000 + 3)
+                    reply['bestmove'] = engine.last_bestmove
+                    reply['ponder'] = engine.last_ponder
+                    reply['depth'] = engine.last_depth
+                reply['lines'] = [line.to_dict() for line in lines]
+                reply['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            except (UciError, TypeError, ValueError) as e:
+                reply['error'] = str(e) or type(e).__name__
+        try:
+            _send(wfile, lock, reply)
+        except (OSError, ValueError):
+            pass
+
+
+# -- coordinator ---------------------------------------------------------------
+
+
+class _Job:
+    __slots__ = ('id', 'request', 'future', 'attempts')
+
+    def __init__(self, job_id: int, request: dict):
+        self.id = job_id
+        self.request = request
+        self.future: Future = Future()
+        self.attempts = 0
+
+
+class _WorkerLink:
+    """Connection to one worker and the jobs it is running."""
+
+    def __init__(self, address: Tuple[str, int]):
+        self.address = address
+        self.capacity = 1
+        self.engine: Optional[str] = None
+        self.alive = False
+        self.inflight: Dict[int, _Job] = {}
+        self.sock: Optional[socket.socket] = None
+        self.file = None
+        self.write_lock = threading.Lock()
+
+    @property
+    def load(self) -> float:
+        return len(self.inflight) / self.capacity
+
+    def __repr__(self) -> str:
+        return f'{self.address[0]}:{self.address[1]}'
+
+
+class Coordinator:
+    """Sends positions to the least loaded worker and re-queues jobs of workers that die."""
+
+    def __init__(self, addresses: Iterable, connect_timeout: float = 3.0, max_attempts: int = 3,
+                 reconnect_interval: float = 5.0):
+        self.links = [_WorkerLink(parse_address(a) if isinstance(a, str) else tuple(a)) for a in addresses]
+        self.connect_timeout = connect_timeout
+        self.max_attempts = max_attempts
+        self.reconnect_interval = reconnect_interval
+        self.requeued = 0
+        self._ids = itertools.count(1)
+        self._pending: List[_Job] = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._reconnector: Optional[threading.Thread] = None
+
+    def start(self) -> int:
+        """Connect to every worker now; returns how many answered. Others are retried in the background."""
+        for link in self.links:
+            self._connect(link)
+        self._reconnector = threading.Thread(target=self._reconnect_loop, daemon=True)
+        self._reconnector.start()
+        return sum(link.alive for link in self.links)
+
+    @property
+    def capacity(self) -> int:
+        return sum(link.capacity for link in self.links if link.alive)
+
+    def submit(self, fen: str, depth: int = 12, movetime: int = 3000, multipv: int = 1) -> Future:
+        """Queue one position; the future resolves to the worker's result dict (or raises UciError)."""
+        job = _Job(next(self._ids), {'type': 'analyse', 'fen': fen, 'depth': depth,
+                                     'movetime': movetime, 'multipv': multipv})
+        job.request['id'] = job.id
+        # Running from the start: a sent job can't be taken back, only its answer ignored
+        job.future.set_running_or_notify_cancel()
+        self._dispatch(job)
+        return job.future
+
+    def analyse_many(self, fens: Iterable[str], depth: int = 12, movetime: int = 3000,
+                     multipv: int = 1) -> Iterator[dict]:
+        """Submit every position and yield results (with their ``fen``) as they complete."""
+        futures = {self.submit(fen, depth, movetime, multipv): fen for fen in fens}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except UciError as e:
+                result = {'error': str(e)}
+            result['fen'] = futures[future]
+            yield result
+
+    def forget(self, future: Future) -> None:
+        """Give up on a submitted job (e.g. the caller timed out): it no longer counts as load."""
+        with self._lock:
+            for link in self.links:
+                for job_id, job in list(link.inflight.items()):
+                    if job.future is future:
+                        del link.inflight[job_id]
+            self._pending = [job for job in self._pending if job.future is not future]
+        _settle(future, error=UciError('abandoned by the caller'))
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            links = list(self.links)
+            pending, self._pending = self._pending, []
+        for link in links:
+            self._disconnect(link)
+        for job in pending:
+            _settle(job.future, error=UciError('coordinator closed'))
+
+    # -- internals -------------------------------------------------------------
+
+    def _connect(self, link: _WorkerLink) -> bool:
+        try:
+            sock = socket.create_connection(link.address, timeout=self.connect_timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            f = sock.makefile('rwb')
+            hello = json.loads(f.readline() or b'{}')
+            sock.settimeout(None)
+        except (OSError, ValueError):
+            return False
+        if hello.get('type') != 'hello':
+            sock.close()
+            return False
+        with self._lock:
+            link.sock, link.file = sock, f
+            link.capacity = max(1, int(hello.get('capacity', 1)))
+            link.engine = hello.get('engine')
+            link.alive = True
+        short_log(f'🌐 Connected to worker {link} ({link.capacity} engine(s), {link.engine})')
+        threading.Thread(target=self._read_loop, args=(link, f), daemon=True).start()
+        self._drain_pending()
+        return True
+
+    def _reconnect_loop(self) -> None:
+        while not self._closed.wait(self.reconnect_interval):
+            for link in self.links:
+                if not link.alive and not self._closed.is_set():
+                    self._connect(link)
+
+    def _pick(self) -> Optional[_WorkerLink]:
+        alive = [link for link in self.links if link.alive]
+        return min(alive, key=lambda link: link.load) if alive else None
+
+    def _dispatch(self, job: _Job) -> None:
+        while True:
+            with self._lock:
+                if self._closed.is_set():
+                    _settle(job.future, error=UciError('coordinator closed'))
+                    return
+                link = self._pick()
+                if link is None:
+                    # No worker right now: wait for one to (re)connect
+                    self._pending.append(job)
+                    return
+                link.inflight[job.id] = job
+            job.attempts += 1
+            try:
+                _send(link.file, link.write_lock, job.request)
+                return
+            except (OSError, ValueError, AttributeError):
+                # Read loop will notice the broken link; try another worker now
+                with self._lock:
+                    link.inflight.pop(job.id, None)
+                self._lost(link)
+
+    def _drain_pending(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for job in pending:
+            self._dispatch(job)
+
+    def _read_loop(self, link: _WorkerLink, f) -> None:
+        try:
+            for raw in f:
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    continue
+                if message.get('type') != 'result':
+                    continue
+                with self._lock:
+                    job = link.inflight.pop(message.get('id'), None)
+                if job is None:
+                    continue
+                if 'error' in message:
+                    _settle(job.future, error=UciError(f"worker {link}: {message['error']}"))
+                else:
+                    _settle(job.future, message)
+        except (OSError, ValueError):
+            pass
+        self._lost(link)
+
+    def _lost(self, link: _WorkerLink) -> None:
+        with self._lock:
+            if not link.alive:
+                return
+            link.alive = False
+            jobs = list(link.inflight.values())
+            link.inflight.clear()
+        self._disconnect(link)
+        if self._closed.is_set():
+            return
+        short_log(f'⚠️ Worker {link} disconnected, re-queuing {len(jobs)} job(s)')
+        for job in jobs:
+            if job.attempts >= self.max_attempts:
+                _settle(job.future, error=UciError(f'job failed on {job.attempts} workers'))
+                continue
+            self.requeued += 1
+            self._dispatch(job)
+
+    def _disconnect(self, link: _WorkerLink) -> None:
+        link.alive = False
+        if link.sock is not None:
+            try:
+                # Wake the read loop first; closing its file under it would block
+                link.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for closeable in (link.file, link.sock):
+            try:
+                if closeable is not None:
+                    closeable.close()
+            except OSError:
+                pass
+        link.file = link.sock = None
+
+
+# -- CLI -----------------------------------------------------------------------
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Distributed analysis workers and coordinator.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    w = sub.add_parser('worker', help='serve analysis from a local engine pool')
+    w.add_argument('--host', default='127.0.0.1', help='address to listen on (no authentication: keep it local or trusted)')
+    w.add_argument('--port', type=int, default=DEFAULT_PORT)
+    w.add_argument('--engines', type=int, default=1, help='engines in this worker')
+    a = sub.add_parser('analyse', help='analyse a FEN/EPD file across workers, JSONL to stdout')
+    a.add_argument('input', help="file with one FEN or EPD per line ('-' for stdin)")
+    a.add_argument('--output', '-o', default='-', help="JSONL output file ('-' for stdout)")
+    a.add_argument('--worker', action='append', required=True, help='host:port of a worker (repeatable)')
+    a.add_argument('--depth', type=int, default=12)
+    a.add_argument('--movetime', type=int, default=3000)
+    a.add_argument('--multipv', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.command == 'worker':
+        from src.engine.stockfish_engine import find_engine_path
+        path = find_engine_path()
+        if not path:
+            print('error: Stockfish binary not found (set STOCKFISH_PATH)', file=sys.stderr)
+            return 1
+        worker = AnalysisWorker(path, args.host, args.port, args.engines)
+        short_log(f'🌐 Worker listening on {args.host}:{worker.address[1]} with {args.engines} engine(s)')
+        try:
+            worker.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
+        return 0
+
+    from src.engine.batch import read_positions
+    coordinator = Coordinator(args.worker)
+    if not coordinator.start():
+        print('error: no worker reachable', file=sys.stderr)
+        return 1
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    count = errors = 0
+    started = time.perf_counter()
+    try:
+        fens = (fen for fen, _ in read_positions(args.input))
+        for result in coordinator.analyse_many(fens, args.depth, args.movetime, args.multipv):
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+            count += 1
+            errors += 'error' in result
+    finally:
+        coordinator.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+    print(f'{count} positions ({errors} errors) in {elapsed:.1f}s, {coordinator.requeued} re-queued',
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
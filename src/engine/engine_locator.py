@@ -0,0 +1,241 @@
+"""Locate the Stockfish binary once per process and remember it across runs.
+
+The first resolution searches the configured path, PATH, the usual Linux and
+Windows install locations, ``external/`` and ~/Downloads (auto-downloading on
+Windows as a last resort), probes the engine's version, and writes a manifest
+(path, version, CPU-feature build, mtime, size). Later runs trust the manifest
+as long as the file is unchanged, so resolving costs a ``stat`` at most.
+"""
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from typing import Iterator, List, Optional
+
+from src.utils.config import ROOT, STOCKFISH_PATH, STOCKFISH_DOWNLOAD_URL, ENGINE_MANIFEST_PATH
+from src.utils.helpers import short_log
+
+# CPU-feature builds named in official release file names, most specific first
+_BUILD_PATTERN = re.compile(r'(avx512icl|vnni512|vnni256|avx512|bmi2|avx2|sse41-popcnt|modern|ssse3|x86-64|armv8-dotprod|armv8|apple-silicon)')
+# Host CPU flag each build needs
+_BUILD_REQUIRES = {
+    'avx512icl': 'avx512f', 'vnni512': 'avx512_vnni', 'vnni256': 'avx512_vnni',
+    'avx512': 'avx512f', 'bmi2': 'bmi2', 'avx2': 'avx2', 'sse41-popcnt': 'sse4_1',
+    'modern': 'sse4_1', 'ssse3': 'ssse3',
+}
+
+_lock = threading.Lock()
+_resolved = False
+_binary: Optional['EngineBinary'] = None
+
+
+class EngineBinary:
+    """What the manifest records about the engine binary."""
+    __slots__ = ('path', 'version', 'build', 'mtime', 'size')
+
+    def __init__(self, path: str, version: Optional[str] = None, build: Optional[str] = None,
+                 mtime: float = 0.0, size: int = 0):
+        self.path = path
+        self.version = version
+        self.build = build
+        self.mtime = mtime
+        self.size = size
+
+    def is_current(self) -> bool:
+        """True if the file on disk is still the one the manifest describes."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        return st.st_mtime == self.mtime and st.st_size == self.size
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f'EngineBinary({self.path!r}, version={self.version!r}, build={self.build!r})'
+
+
+def resolve_engine(refresh: bool = False) -> Optional[EngineBinary]:
+    """The engine binary to use, resolved once per process (``refresh`` forces a new search)."""
+    global _resolved, _binary
+    with _lock:
+        if _resolved and not refresh:
+            return _binary
+        binary = None if refresh else _load_manifest()
+        if binary is None:
+            path = _search()
+            if path:
+                binary = _describe(path)
+                _save_manifest(binary)
+        if binary is not None:
+            _warn_unsupported_build(binary)
+        _binary, _resolved = binary, True
+        return binary
+
+
+def cpu_flags() -> List[str]:
+    """CPU feature flags of this host (Linux /proc/cpuinfo; empty elsewhere)."""
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    return line.split(':', 1)[1].split()
+    except OSError:
+        pass
+    return []
+
+
+def _load_manifest() -> Optional[EngineBinary]:
+    try:
+        with open(ENGINE_MANIFEST_PATH, 'r') as f:
+            data = json.load(f)
+        binary = EngineBinary(**{k: data.get(k) for k in EngineBinary.__slots__})
+    except (OSError, ValueError, TypeError):
+        return None
+    # A configured path always wins over whatever was found last time
+    if STOCKFISH_PATH and os.path.abspath(STOCKFISH_PATH) != os.path.abspath(binary.path or ''):
+        return None
+    return binary if binary.is_current() else None
+
+
+def _save_manifest(binary: EngineBinary) -> None:
+    try:
+        os.makedirs(os.path.dirname(ENGINE_MANIFEST_PATH), exist_ok=True)
+        with open(ENGINE_MANIFEST_PATH, 'w') as f:
+            json.dump(dict(binary.to_dict(), resolved_at=time.time()), f, indent=2)
+    except OSError as e:
+        short_log(f'⚠️ Could not write engine manifest: {e}')
+
+
+def _describe(path: str) -> EngineBinary:
+    st = os.stat(path)
+    match = _BUILD_PATTERN.search(os.path.basename(path).lower())
+    binary = EngineBinary(os.path.abspath(path), build=match.group(1) if match else None,
+                          mtime=st.st_mtime, size=st.st_size)
+    try:
+        # Imported here: uci_process pulls in the whole engine layer
+        from src.engine.uci_process import UciError, UciProcess
+        engine = UciProcess(path)
+        try:
+            engine.start(timeout=5.0)
+            binary.version = engine.name
+        finally:
+            engine.close()
+    except UciError as e:
+        short_log(f'⚠️ Could not probe engine version: {str(e)[:120]}')
+    return binary
+
+
+def _warn_unsupported_build(binary: EngineBinary) -> None:
+    flags = cpu_flags()
+    needed = _BUILD_REQUIRES.get(binary.build or '')
+    if flags and needed and needed not in flags:
+        short_log(f'⚠️ {os.path.basename(binary.path)} is a {binary.build} build but this CPU lacks {needed}')
+
+
+def _candidates() -> Iterator[str]:
+    """Likely engine locations, cheapest checks first."""
+    if STOCKFISH_PATH:
+        yield STOCKFISH_PATH
+    for name in ('stockfish', 'stockfish.exe'):
+        found = shutil.which(name)
+        if found:
+            yield found
+    if sys.platform == 'win32':
+        yield r"C:\Program Files\Stockfish\stockfish.exe"
+        yield r"C:\Program Files (x86)\Stockfish\stockfish.exe"
+        yield os.path.expanduser(r"~\Downloads\stockfish-windows-x86-64-avx2\stockfish\stockfish-windows-x86-64-avx2.exe")
+        yield os.path.expanduser(r"~\Downloads\stockfish\stockfish.exe")
+        yield os.path.expanduser(r"~\Desktop\stockfish.exe")
+        yield r"C:\stockfish\stockfish.exe"
+    else:
+        yield '/usr/games/stockfish'
+        yield '/usr/local/bin/stockfish'
+        yield '/usr/bin/stockfish'
+        yield '/opt/homebrew/bin/stockfish'
+    yield from _walk_for_engine(os.path.join(ROOT, 'external'), max_depth=3)
+    yield from _walk_for_engine(os.path.expanduser('~/Downloads'), max_depth=2)
+
+
+def _walk_for_engine(folder: str, max_depth: int) -> Iterator[str]:
+    if not os.path.isdir(folder):
+        return
+    for root, dirs, files in os.walk(folder):
+        # Limit search depth to avoid long searches
+        if root[len(folder):].count(os.sep) >= max_depth:
+            dirs[:] = []
+        for file in sorted(files):
+            name = file.lower()
+            if name.startswith('stockfish') and (name.endswith('.exe') or '.' not in name):
+                yield os.path.join(root, file)
+
+
+def _search() -> Optional[str]:
+    for path in _candidates():
+        if os.path.isfile(path) and (sys.platform == 'win32' or os.access(path, os.X_OK)):
+            return path
+
+    # As a last resort on Windows, attempt to download automatically
+    if sys.platform == 'win32':
+        try:
+            dl = download_and_extract_stockfish()
+            if dl and os.path.exists(dl):
+                return dl
+        except Exception as e:
+            short_log(f"⚠️ Auto-download failed: {str(e)[:120]}")
+    return None
+
+
+def download_and_extract_stockfish(url: str = STOCKFISH_DOWNLOAD_URL) -> Optional[str]:
+    """Download and extract Stockfish for Windows into external/ and return the exe path.
+
+    Uses only stdlib (urllib, zipfile). Safe to call multiple times; skips download if already present.
+    """
+    import urllib.request
+    import zipfile
+
+    external_dir = os.path.join(ROOT, 'external')
+    os.makedirs(external_dir, exist_ok=True)
+
+    zip_path = os.path.join(external_dir, 'stockfish-win-avx2.zip')
+    extract_dir = os.path.join(external_dir, 'stockfish_win')
+    os.makedirs(extract_dir, exist_ok=True)
+
+    # If an exe already exists in extract_dir, return it
+    for dirpath, _, files in os.walk(extract_dir):
+        for fn in files:
+            if fn.lower().startswith('stockfish') and fn.lower().endswith('.exe'):
+                return os.path.join(dirpath, fn)
+
+    short_log('⬇️ Downloading Stockfish (Windows AVX2)...')
+    short_log(f'   {url}')
+    try:
+        urllib.request.urlretrieve(url, zip_path)
+    except Exception as e:
+        raise RuntimeError(f'Failed to download Stockfish: {e}')
+
+    short_log('📦 Extracting Stockfish...')
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as zf:
+            zf.extractall(extract_dir)
+    except Exception as e:
+        raise RuntimeError(f'Failed to extract Stockfish zip: {e}')
+    finally:
+        try:
+            os.remove(zip_path)
+        except Exception:
+            pass
+
+    # Find exe after extraction
+    for dirpath, _, files in os.walk(extract_dir):
+        for fn in files:
+            if fn.lower().startswith('stockfish') and fn.lower().endswith('.exe'):
+                exe_path = os.path.join(dirpath, fn)
+                short_log(f'✅ Stockfish ready: {exe_path}')
+                return exe_path
+
+    raise RuntimeError('Stockfish executable not found after extraction.')
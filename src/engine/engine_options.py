@@ -0,0 +1,213 @@
+"""Engine option profiles (Threads, Hash, Move Overhead, EvalFile, SyzygyPath).
+
+``auto_profile`` sizes Threads and Hash from the host's cores and available
+RAM, split across the engines of a pool, and applies any overrides from
+config.py. The profile is validated before it is sent to an engine.
+SYZYGY_PATH is passed on as SyzygyPath, so the engine itself searches only
+the root moves that keep the tablebase result.
+MultiPV is not a process option: ``multipv`` is only the default line count
+for ``analyse_fen`` and is sent with the search that asks for it.
+
+Compare profiles on this host:
+    python -m src.engine.engine_options --threads 1,4,8 --hash 64,256
+"""
+import argparse
+import ctypes
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+from src.utils.config import (
+    ENGINE_THREADS, ENGINE_HASH_MB, ENGINE_MULTIPV, ENGINE_MOVE_OVERHEAD_MS, ENGINE_EVAL_FILE,
+    SYZYGY_PATH, SYZYGY_MAX_PIECES
+)
+
+try:
+    import psutil
+except Exception:
+    psutil = None
+
+# Stockfish's accepted ranges
+MAX_THREADS = 1024
+MAX_HASH_MB = 33554432
+MAX_MULTIPV = 500
+MAX_MOVE_OVERHEAD_MS = 5000
+MAX_SYZYGY_PROBE_LIMIT = 7
+# Never give a single engine more hash than this when sizing automatically
+AUTO_HASH_CAP_MB = 2048
+# Share of available RAM the whole pool may use for hash
+AUTO_HASH_RAM_SHARE = 0.25
+
+
+def cpu_count() -> int:
+    """Cores usable by this process (honours CPU affinity where supported)."""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def available_memory_mb() -> Optional[int]:
+    """Free physical memory in MB, or None if it cannot be determined."""
+    if psutil is not None:
+        return int(psutil.virtual_memory().available // (1024 * 1024))
+    if sys.platform == 'win32':
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                ('ullAvailExtendedVirtual', ctypes.c_ulonglong),
+            ]
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return int(status.ullAvailPhys // (1024 * 1024))
+        return None
+    try:
+        return int(os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024))
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class EngineProfile:
+    """A validated set of UCI options applied once per engine process (plus the default MultiPV)."""
+    __slots__ = ('threads', 'hash_mb', 'multipv', 'move_overhead_ms', 'eval_file',
+                 'syzygy_path', 'syzygy_probe_limit')
+
+    def __init__(self, threads: int = 1, hash_mb: int = 16, multipv: int = 1,
+                 move_overhead_ms: int = 10, eval_file: str = '', syzygy_path: str = '',
+                 syzygy_probe_limit: int = MAX_SYZYGY_PROBE_LIMIT):
+        self.threads = threads
+        self.hash_mb = hash_mb
+        self.multipv = multipv
+        self.move_overhead_ms = move_overhead_ms
+        self.eval_file = eval_file
+        self.syzygy_path = syzygy_path
+        self.syzygy_probe_limit = syzygy_probe_limit
+
+    def validate(self) -> None:
+        """Raise ValueError describing the first out-of-range option."""
+        if not 1 <= self.threads <= MAX_THREADS:
+            raise ValueError(f'Threads must be 1..{MAX_THREADS}, got {self.threads}')
+        if not 1 <= self.hash_mb <= MAX_HASH_MB:
+            raise ValueError(f'Hash must be 1..{MAX_HASH_MB} MB, got {self.hash_mb}')
+        if not 1 <= self.multipv <= MAX_MULTIPV:
+            raise ValueError(f'MultiPV must be 1..{MAX_MULTIPV}, got {self.multipv}')
+        if not 0 <= self.move_overhead_ms <= MAX_MOVE_OVERHEAD_MS:
+            raise ValueError(f'Move Overhead must be 0..{MAX_MOVE_OVERHEAD_MS} ms, got {self.move_overhead_ms}')
+        if self.eval_file and not os.path.isfile(self.eval_file):
+            raise ValueError(f'EvalFile not found: {self.eval_file}')
+        if not 0 <= self.syzygy_probe_limit <= MAX_SYZYGY_PROBE_LIMIT:
+            raise ValueError(f'SyzygyProbeLimit must be 0..{MAX_SYZYGY_PROBE_LIMIT}, got {self.syzygy_probe_limit}')
+
+    def uci_options(self) -> Dict[str, object]:
+        options = {
+            'Threads': self.threads,
+            'Hash': self.hash_mb,
+            'Move Overhead': self.move_overhead_ms,
+        }
+        if self.eval_file:
+            options['EvalFile'] = self.eval_file
+        if self.syzygy_path:
+            options['SyzygyPath'] = self.syzygy_path
+            options['SyzygyProbeLimit'] = self.syzygy_probe_limit
+        return options
+
+    def describe(self) -> str:
+        text = f'Threads={self.threads} Hash={self.hash_mb}MB Overhead={self.move_overhead_ms}ms'
+        text += f' EvalFile={os.path.basename(self.eval_file)}' if self.eval_file else ''
+        return text + (f' Syzygy<={self.syzygy_probe_limit}' if self.syzygy_path else '')
+
+    def __repr__(self) -> str:
+        return f'EngineProfile({self.describe()})'
+
+
+def auto_profile(pool_size: int = 1) -> EngineProfile:
+    """Profile for one of ``pool_size`` engines sharing this host, with config overrides applied.
+
+    Raises ValueError if an override is invalid.
+    """
+    pool_size = max(1, pool_size)
+    threads = max(1, cpu_count() // pool_size)
+    free_mb = available_memory_mb()
+    if free_mb:
+        hash_mb = int(free_mb * AUTO_HASH_RAM_SHARE / pool_size)
+        # Round down to a power of two, as Stockfish users conventionally size it
+        hash_mb = max(16, min(AUTO_HASH_CAP_MB, 1 << max(4, hash_mb.bit_length() - 1)))
+    else:
+        hash_mb = 16
+
+    profile = EngineProfile(
+        threads=_override(ENGINE_THREADS, threads, 'ENGINE_THREADS'),
+        hash_mb=_override(ENGINE_HASH_MB, hash_mb, 'ENGINE_HASH_MB'),
+        multipv=ENGINE_MULTIPV,
+        move_overhead_ms=ENGINE_MOVE_OVERHEAD_MS,
+        eval_file=ENGINE_EVAL_FILE,
+        syzygy_path=SYZYGY_PATH,
+        syzygy_probe_limit=max(0, min(MAX_SYZYGY_PROBE_LIMIT, SYZYGY_MAX_PIECES)),
+    )
+    profile.validate()
+    return profile
+
+
+def _override(value: str, auto: int, name: str) -> int:
+    if not value or value.lower() == 'auto':
+        return auto
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer or 'auto', got {value!r}")
+
+
+def measure_nps(path: str, profile: EngineProfile, fen: Optional[str] = None, movetime: int = 1000) -> int:
+    """Start an engine with ``profile``, search ``fen`` for ``movetime`` ms and return its nps."""
+    from src.engine.time_budget import CALIBRATION_FEN
+    from src.engine.uci_process import UciProcess
+
+    engine = UciProcess(path, profile.uci_options())
+    try:
+        # Large hash tables take a while to allocate during the handshake
+        engine.start(timeout=5.0 + profile.hash_mb / 1024)
+        engine.search(fen or CALIBRATION_FEN, depth=99, movetime=movetime, timeout=movetime / 1000 + 3)
+        return engine.last_info.nps if engine.last_info else 0
+    finally:
+        engine.close()
+
+
+def main(argv=None) -> int:
+    from src.engine.stockfish_engine import find_engine_path
+
+    parser = argparse.ArgumentParser(description='Measure nps for several engine option profiles.')
+    parser.add_argument('--threads', default='', help="comma separated Threads values (default: auto)")
+    parser.add_argument('--hash', default='', help='comma separated Hash values in MB (default: auto)')
+    parser.add_argument('--movetime', type=int, default=1000, help='search time per profile in ms')
+    args = parser.parse_args(argv)
+
+    path = find_engine_path()
+    if not path:
+        print('error: Stockfish binary not found (set STOCKFISH_PATH)', file=sys.stderr)
+        return 1
+    base = auto_profile()
+    threads: List[int] = [int(t) for t in args.threads.split(',') if t] or [base.threads]
+    hashes: List[int] = [int(h) for h in args.hash.split(',') if h] or [base.hash_mb]
+    print(f'{cpu_count()} cores, {available_memory_mb() or "?"} MB available')
+    for t in threads:
+        for h in hashes:
+            profile = EngineProfile(t, h, base.multipv, base.move_overhead_ms, base.eval_file,
+                                    base.syzygy_path, base.syzygy_probe_limit)
+            try:
+                profile.validate()
+            except ValueError as e:
+                print(f'{profile.describe():<60} invalid: {e}')
+                continue
+            started = time.perf_counter()
+            nps = measure_nps(path, profile, movetime=args.movetime)
+            print(f'{profile.describe():<60} {nps / 1e6:8.2f} Mnps  ({time.perf_counter() - started:.1f}s)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Pool of warm Stockfish processes.
+
+Engines are started once (handshake, NNUE load, options) and then checked out
+per search. A crashed or unresponsive engine is replaced transparently on the
+next checkout. Any backend from backends.py can be pooled (default: ``uci``).
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from src.engine.backends import EngineBackend, create_backend
+from src.engine.uci_process import UciError
+from src.utils.helpers import short_log
+
+
+class EnginePool:
+    """Thread-safe pool of engine backends (``UciProcess`` by default) for one engine binary."""
+
+    def __init__(self, path: str, size: int = 1, options: Optional[Dict[str, object]] = None,
+                 health_check_interval: float = 30.0, backend: str = 'uci'):
+        self.path = path
+        self.backend = backend
+        self.size = max(1, int(size))
+        self.options = dict(options or {})
+        self.health_check_interval = health_check_interval
+        self.respawns = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._all: List[EngineBackend] = []
+        # Each slot holds a started engine or None (spawned lazily on checkout)
+        self._slots: queue.Queue = queue.Queue()
+        for _ in range(self.size):
+            self._slots.put(None)
+
+    def warm_up(self) -> None:
+        """Start every engine in the pool now instead of on first use."""
+        for _ in range(self.size):
+            with self.engine():
+                pass
+
+    @contextmanager
+    def engine(self, timeout: float = 10.0) -> Iterator[EngineBackend]:
+        """Check out a healthy, idle engine for the duration of the ``with`` block."""
+        if self._closed:
+            raise UciError('engine pool is closed')
+        try:
+            proc = self._slots.get(timeout=timeout)
+        except queue.Empty:
+            raise UciError('no engine available in pool')
+
+        clean = False
+        try:
+            proc = self._healthy(proc)
+            yield proc
+            clean = True
+        finally:
+            if proc is not None and not clean and not proc.sync():
+                # Interrupted mid-search and it would not resync: replace it next time
+                self._discard(proc)
+                proc = None
+            if self._closed and proc is not None:
+                self._discard(proc)
+                proc = None
+            self._slots.put(proc)
+
+    def close(self) -> None:
+        """Quit every engine. Engines checked out right now are closed on return."""
+        self._closed = True
+        with self._lock:
+            procs, self._all = self._all, []
+        for proc in procs:
+            proc.close()
+
+    def _healthy(self, proc: Optional[EngineBackend]) -> EngineBackend:
+        if proc is not None:
+            if not proc.is_alive():
+                short_log('♻️ Pooled Stockfish process died, respawning')
+                self.respawns += 1
+                self._discard(proc)
+                proc = None
+            elif time.monotonic() - proc.last_used > self.health_check_interval and not proc.is_ready():
+                short_log('♻️ Pooled Stockfish process stopped responding, respawning')
+                self.respawns += 1
+                self._discard(proc)
+                proc = None
+        if proc is None:
+            proc = self._spawn()
+        return proc
+
+    def _spawn(self) -> EngineBackend:
+        proc = create_backend(self.backend, self.path, self.options)
+        try:
+            proc.start()
+        except UciError:
+            proc.close()
+            raise
+        with self._lock:
+            self._all.append(proc)
+        return proc
+
+    def _discard(self, proc: EngineBackend) -> None:
+        with self._lock:
+            if proc in self._all:
+                self._all.remove(proc)
+        proc.close()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""Scriptable stand-in for Stockfish, for load and failure testing without a real engine.
+
+Point STOCKFISH_PATH at this file (it is executable and has no imports from
+this repo) and configure it through environment variables:
+
+    FAKE_UCI_NAME          engine name reported by 'id name' (FakeFish)
+    FAKE_UCI_HANDSHAKE_MS  delay before 'uciok' (0)
+    FAKE_UCI_NPS           nodes per second reported and used for 'go nodes' (1000000)
+    FAKE_UCI_DEPTH_MS      time to finish depth 1 (5)
+    FAKE_UCI_DEPTH_GROWTH  each depth takes this many times longer than the last (1.3)
+    FAKE_UCI_MAX_DEPTH     deepest depth reached before answering (40)
+    FAKE_UCI_FAIL          comma separated failures, each 'event' or 'event@N' (Nth time only):
+                             crash-handshake, hang-handshake, hang-isready,
+                             crash-search (dies mid-search), hang-search (wedges mid-search:
+                             stops answering anything, even isready), crash-quit (exit code 1)
+    FAKE_UCI_CRASH_RATE    probability that any search crashes (0)
+    FAKE_UCI_CRASH_DEPTH   depth at which a failing search crashes or hangs (2)
+    FAKE_UCI_SEED          seed for FAKE_UCI_CRASH_RATE (random)
+    FAKE_UCI_COUNTER_FILE  share the 'event@N' counters between processes through this
+                           JSON file, so a respawned engine does not repeat the failure
+
+The best move is a legal move chosen by a hash of the position (python-chess
+if installed, otherwise a fixed list), so the same FEN always gets the same answer.
+"""
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+try:
+    import chess
+except ImportError:
+    chess = None
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+# Used when python-chess is missing: not necessarily legal, but deterministic
+FALLBACK_MOVES = ['e2e4', 'd2d4', 'g1f3', 'c2c4', 'e7e5', 'd7d5', 'g8f6', 'c7c5']
+OPTIONS = [
+    'option name Threads type spin default 1 min 1 max 1024',
+    'option name Hash type spin default 16 min 1 max 33554432',
+    'option name MultiPV type spin default 1 min 1 max 500',
+    'option name Move Overhead type spin default 10 min 0 max 5000',
+    'option name Ponder type check default false',
+    'option name UCI_ShowWDL type check default false',
+    'option name EvalFile type string default <empty>',
+    'option name SyzygyPath type string default <empty>',
+    'option name SyzygyProbeLimit type spin default 7 min 0 max 7',
+]
+
+
+def env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return float(default)
+
+
+class FakeEngine:
+    def __init__(self):
+        self.name = os.environ.get('FAKE_UCI_NAME', 'FakeFish')
+        self.handshake_ms = env_float('FAKE_UCI_HANDSHAKE_MS', 0)
+        self.nps = max(1, int(env_float('FAKE_UCI_NPS', 1000000)))
+        self.depth_ms = max(0.0, env_float('FAKE_UCI_DEPTH_MS', 5))
+        self.growth = max(1.0, env_float('FAKE_UCI_DEPTH_GROWTH', 1.3))
+        self.max_depth = max(1, int(env_float('FAKE_UCI_MAX_DEPTH', 40)))
+        self.crash_rate = env_float('FAKE_UCI_CRASH_RATE', 0)
+        self.crash_depth = max(1, int(env_float('FAKE_UCI_CRASH_DEPTH', 2)))
+        seed = os.environ.get('FAKE_UCI_SEED')
+        self.random = random.Random(int(seed) if seed else None)
+        self.failures = {}
+        for item in filter(None, (s.strip() for s in os.environ.get('FAKE_UCI_FAIL', '').split(','))):
+            event, _, nth = item.partition('@')
+            self.failures[event] = int(nth) if nth.isdigit() else 0
+        self.counts = {}
+        self.counter_file = os.environ.get('FAKE_UCI_COUNTER_FILE', '')
+        self.multipv = 1
+        self.show_wdl = False
+        self.fen = START_FEN
+        self.moves = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.search_thread = None
+        self.wedged = threading.Event()
+
+    # -- failure injection -------------------------------------------------
+
+    def should_fail(self, event):
+        """Count an occurrence of ``event`` and say whether it is configured to fail now."""
+        if event not in self.failures:
+            return False
+        count = self.count(event)
+        nth = self.failures[event]
+        return nth == 0 or nth == count
+
+    def count(self, event):
+        if not self.counter_file:
+            self.counts[event] = self.counts.get(event, 0) + 1
+            return self.counts[event]
+        with open(self.counter_file, 'a+') as f:
+            try:
+                import fcntl
+                fcntl.flock(f, fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            f.seek(0)
+            try:
+                counts = json.loads(f.read() or '{}')
+            except ValueError:
+                counts = {}
+            counts[event] = counts.get(event, 0) + 1
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(counts))
+        return counts[event]
+
+    def crash(self, reason):
+        sys.stderr.write(f'fake engine crash: {reason}\n')
+        sys.stderr.flush()
+        os._exit(3)
+
+    def hang(self):
+        # Stop reading and answering, like a wedged engine; only a kill ends it
+        while True:
+            time.sleep(3600)
+
+    # -- output --------------------------------------------------------------
+
+    def out(self, line):
+        with self.lock:
+            sys.stdout.write(line + '\n')
+            sys.stdout.flush()
+
+    # -- commands ------------------------------------------------------------
+
+    def run(self):
+        for raw in sys.stdin:
+            parts = raw.split()
+            if not parts:
+                continue
+            cmd = parts[0]
+            if self.wedged.is_set():
+                self.hang()
+            if cmd == 'uci':
+                if self.should_fail('crash-handshake'):
+                    self.crash('during handshake')
+                if self.should_fail('hang-handshake'):
+                    self.hang()
+                time.sleep(self.handshake_ms / 1000)
+                self.out(f'id name {self.name}')
+                self.out('id author ChessVision tests')
+                for option in OPTIONS:
+                    self.out(option)
+                self.out('uciok')
+            elif cmd == 'isready':
+                if self.should_fail('hang-isready'):
+                    self.hang()
+                self.out('readyok')
+            elif cmd == 'setoption':
+                self.setoption(raw)
+            elif cmd == 'ucinewgame':
+                pass
+            elif cmd == 'position':
+                self.position(parts[1:])
+            elif cmd == 'go':
+                self.go(parts[1:])
+            elif cmd == 'stop':
+                self.stop_event.set()
+            elif cmd == 'quit':
+                self.stop_event.set()
+                if self.should_fail('crash-quit'):
+                    sys.exit(1)
+                return
+
+    def setoption(self, raw):
+        text = raw.strip()[len('setoption'):].strip()
+        if not text.startswith('name '):
+            return
+        name, _, value = text[len('name '):].partition(' value ')
+        name = name.strip().lower()
+        if name == 'multipv':
+            try:
+                self.multipv = max(1, int(value))
+            except ValueError:
+                pass
+        elif name == 'uci_showwdl':
+            self.show_wdl = value.strip().lower() == 'true'
+
+    def position(self, args):
+        if not args:
+            return
+        if args[0] == 'startpos':
+            fen, rest = START_FEN, args[1:]
+        elif args[0] == 'fen':
+            end = args.index('moves') if 'moves' in args else len(args)
+            fen, rest = ' '.join(args[1:end]), args[end:]
+        else:
+            return
+        self.fen = fen
+        self.moves = rest[1:] if rest and rest[0] == 'moves' else []
+
+    def go(self, args):
+        limits = {}
+        for key in ('depth', 'movetime', 'nodes'):
+            if key in args:
+                try:
+                    limits[key] = int(args[args.index(key) + 1])
+                except (IndexError, ValueError):
+                    pass
+        infinite = 'infinite' in args or 'ponder' in args
+        crash = self.should_fail('crash-search') or self.random.random() < self.crash_rate
+        hang = self.should_fail('hang-search')
+        if self.search_thread is not None:
+            self.search_thread.join()
+        self.stop_event.clear()
+        self.search_thread = threading.Thread(target=self.search, args=(limits, infinite, crash, hang),
+                                              daemon=True)
+        self.search_thread.start()
+
+    # -- search ----------------------------------------------------------------
+
+    def candidate_moves(self):
+        """Legal moves (best first) for the current position, deterministic per FEN."""
+        key = self.fen + ' ' + ' '.join(self.moves)
+        seed = int(hashlib.sha1(key.encode()).hexdigest(), 16)
+        if chess is not None:
+            try:
+                board = chess.Board(self.fen)
+                for move in self.moves:
+                    board.push_uci(move)
+                legal = sorted(m.uci() for m in board.legal_moves)
+            except ValueError:
+                legal = []
+            if not legal:
+                return [], seed
+            replies = {}
+            start = seed % len(legal)
+            ordered = legal[start:] + legal[:start]
+            for move in ordered[:self.multipv]:
+                board.push_uci(move)
+                reply = sorted(m.uci() for m in board.legal_moves)
+                replies[move] = reply[seed % len(reply)] if reply else None
+                board.pop()
+            return [(m, replies.get(m)) for m in ordered], seed
+        start = seed % len(FALLBACK_MOVES)
+        ordered = FALLBACK_MOVES[start:] + FALLBACK_MOVES[:start]
+        return [(m, None) for m in ordered], seed
+
+    def search(self, limits, infinite, crash, hang):
+        started = time.monotonic()
+        moves, seed = self.candidate_moves()
+        max_depth = min(limits.get('depth', self.max_depth), self.max_depth)
+        movetime = limits.get('movetime')
+        nodes_limit = limits.get('nodes')
+        step = self.depth_ms / 1000
+        depth = 0
+        if not moves:
+            self.out('info depth 0 score mate 0' if chess is not None else 'info depth 0 score cp 0')
+            self.out('bestmove (none)')
+            return
+        while True:
+            if self.stop_event.wait(step):
+                break
+            depth += 1
+            elapsed = time.monotonic() - started
+            nodes = int(self.nps * elapsed)
+            if crash and depth >= self.crash_depth:
+                self.crash(f'during search at depth {depth}')
+            if hang and depth >= self.crash_depth:
+                # Wedged: no more output, and the command loop stops answering too
+                self.wedged.set()
+                self.hang()
+            for k, (move, reply) in enumerate(moves[:self.multipv]):
+                score = (seed % 81) - 40 - 15 * k + depth % 3
+                pv = move + (f' {reply}' if reply else '')
+                wdl = f' wdl {500 + score} {400 - score} 100' if self.show_wdl else ''
+                self.out(f'info depth {depth} seldepth {depth + 3} multipv {k + 1} score cp {score}{wdl} '
+                         f'nodes {nodes} nps {self.nps} hashfull {min(1000, depth * 10)} tbhits 0 '
+                         f'time {int(elapsed * 1000)} pv {pv}')
+            step *= self.growth
+            if infinite:
+                if depth >= self.max_depth:
+                    self.stop_event.wait()
+                    break
+                continue
+            if depth >= max_depth:
+                break
+            if movetime is not None and (time.monotonic() - started) * 1000 + step * 1000 >= movetime:
+                # The next depth would overrun: sleep out the rest and answer on time
+                remaining = movetime / 1000 - (time.monotonic() - started)
+                if remaining > 0:
+                    self.stop_event.wait(remaining)
+                break
+            if nodes_limit is not None and nodes >= nodes_limit:
+                break
+        best, ponder = moves[0]
+        self.out(f'bestmove {best}' + (f' ponder {ponder}' if ponder else ''))
+
+
+if __name__ == '__main__':
+    try:
+        FakeEngine().run()
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
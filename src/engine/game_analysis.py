@@ -0,0 +1,226 @@
+"""Whole-game analysis from PGN.
+
+Every position of a game is evaluated across a pool of engines. The plies are
+split into contiguous runs, one per engine, and each engine walks its run in
+order, so consecutive positions reuse the engine's hash table. From the
+evaluations before and after each move we build an evaluation curve and
+classify moves by the drop in winning chances (the same idea Lichess uses):
+inaccuracy >= 0.1, mistake >= 0.2, blunder >= 0.3 on a -1..1 scale.
+
+Usage:
+    python -m src.engine.game_analysis games.pgn --depth 14 --output report.json
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, TextIO
+
+import chess
+import chess.pgn
+
+from src.engine.analysis import AnalysisResult
+from src.engine.engine_options import auto_profile
+from src.engine.engine_pool import EnginePool
+from src.engine.stockfish_engine import find_engine_path
+from src.engine.uci_process import UciError
+
+MATE_CP = 10000  # centipawn stand-in for a forced mate
+THRESHOLDS = (('blunder', 0.3), ('mistake', 0.2), ('inaccuracy', 0.1))
+
+
+def white_cp(result: Optional[AnalysisResult], board: chess.Board) -> Optional[int]:
+    """Engine score of ``board`` in centipawns from White's point of view (mates clamped)."""
+    if board.is_checkmate():
+        return -MATE_CP if board.turn == chess.WHITE else MATE_CP
+    if board.is_game_over():
+        return 0
+    if result is None:
+        return None
+    if result.mate is not None:
+        # Shorter mates score higher so the curve still shows progress
+        cp = MATE_CP - abs(result.mate) if result.mate > 0 else -MATE_CP + abs(result.mate)
+    elif result.score_cp is not None:
+        cp = result.score_cp
+    else:
+        return None
+    return cp if board.turn == chess.WHITE else -cp
+
+
+def winning_chances(cp: int) -> float:
+    """Map centipawns to -1..1 winning chances."""
+    return 2 / (1 + math.exp(-0.00368208 * cp)) - 1
+
+
+def classify(chance_loss: float) -> Optional[str]:
+    for label, threshold in THRESHOLDS:
+        if chance_loss >= threshold:
+            return label
+    return None
+
+
+def evaluate_positions(pool: EnginePool, boards: List[chess.Board], depth: int,
+                       movetime: int) -> List[Optional[AnalysisResult]]:
+    """Evaluate every board, each engine of ``pool`` taking one contiguous run of plies."""
+    results: List[Optional[AnalysisResult]] = [None] * len(boards)
+    todo = [i for i, b in enumerate(boards) if not b.is_game_over()]
+    runs = max(1, min(pool.size, len(todo)))
+    chunk = math.ceil(len(todo) / runs) if todo else 0
+
+    def work(indices: List[int]) -> None:
+        k = 0
+        failed = set()
+        while k < len(indices):
+            try:
+                with pool.engine() as engine:
+                    while k < len(indices):
+                        i = indices[k]
+                        engine.search(boards[i].fen(), depth, movetime, timeout=movetime / 1000 + 3)
+                        results[i] = engine.last_info
+                        k += 1
+            except UciError:
+                # The pool respawns the engine on the next checkout: retry the
+                # position once, then leave it unevaluated (the report shows the gap)
+                if indices[k] in failed:
+                    k += 1
+                else:
+                    failed.add(indices[k])
+
+    threads = [threading.Thread(target=work, args=(todo[k:k + chunk],), daemon=True)
+               for k in range(0, len(todo), chunk or 1)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def analyse_game(game: chess.pgn.Game, pool: EnginePool, depth: int = 12,
+                 movetime: int = 1000) -> dict:
+    """Evaluation curve and move classification for one game."""
+    board = game.board()
+    boards = [board.copy(stack=False)]
+    moves = []
+    for move in game.mainline_moves():
+        moves.append((board.san(move), move.uci()))
+        board.push(move)
+        boards.append(board.copy(stack=False))
+
+    started = time.perf_counter()
+    evals = evaluate_positions(pool, boards, depth, movetime)
+    curve = [white_cp(result, b) for result, b in zip(evals, boards)]
+
+    plies = []
+    summary: Dict[str, Dict[str, float]] = {
+        side: {'moves': 0, 'cp_loss': 0, 'inaccuracy': 0, 'mistake': 0, 'blunder': 0}
+        for side in ('white', 'black')
+    }
+    for i, (san, uci) in enumerate(moves):
+        before, after = curve[i], curve[i + 1]
+        mover = boards[i].turn
+        side = 'white' if mover == chess.WHITE else 'black'
+        record = {
+            'ply': i + 1,
+            'move_number': boards[i].fullmove_number,
+            'side': side,
+            'san': san,
+            'uci': uci,
+            'eval_before': before,
+            'eval_after': after,
+            'best_move': None,
+            'cp_loss': None,
+            'classification': None,
+        }
+        best = evals[i].move if evals[i] is not None else None
+        if best:
+            try:
+                best_move = chess.Move.from_uci(best)
+            except ValueError:
+                best_move = None
+            if best_move in boards[i].legal_moves:
+                record['best_move'] = boards[i].san(best_move)
+            else:
+                # Garbage from the engine: report the ply without a best move
+                best = None
+        if before is not None and after is not None:
+            sign = 1 if mover == chess.WHITE else -1
+            # Clamp so a missed mate does not dwarf the average centipawn loss
+            loss = max(0, sign * (max(-1000, min(1000, before)) - max(-1000, min(1000, after))))
+            chance_loss = sign * (winning_chances(before) - winning_chances(after))
+            record['cp_loss'] = loss
+            record['classification'] = classify(chance_loss) if uci != best else None
+            summary[side]['moves'] += 1
+            summary[side]['cp_loss'] += loss
+            if record['classification']:
+                summary[side][record['classification']] += 1
+        plies.append(record)
+
+    for stats in summary.values():
+        stats['acpl'] = round(stats.pop('cp_loss') / stats['moves']) if stats['moves'] else None
+
+    return {
+        'headers': dict(game.headers),
+        'plies': plies,
+        'curve': curve,
+        'summary': summary,
+        'elapsed_s': round(time.perf_counter() - started, 2),
+    }
+
+
+def read_games(stream: TextIO) -> Iterator[chess.pgn.Game]:
+    while True:
+        game = chess.pgn.read_game(stream)
+        if game is None:
+            return
+        yield game
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Evaluate every ply of PGN games and flag mistakes.')
+    parser.add_argument('pgn', help="PGN file with one or more games ('-' for stdin)")
+    parser.add_argument('--output', '-o', default='-', help="JSON lines output, one game per line ('-' for stdout)")
+    parser.add_argument('--depth', type=int, default=12)
+    parser.add_argument('--movetime', type=int, default=1000, help='per-position cap in ms')
+    parser.add_argument('--workers', type=int, default=None, help='engines to run (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    path = find_engine_path()
+    if not path:
+        print('error: Stockfish binary not found (set STOCKFISH_PATH)', file=sys.stderr)
+        return 1
+    workers = max(1, args.workers or os.cpu_count() or 1)
+    pool = EnginePool(path, size=workers, options=auto_profile(workers).uci_options())
+    source = sys.stdin if args.pgn == '-' else open(args.pgn, 'r', encoding='utf-8', errors='replace')
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    count = 0
+    try:
+        pool.warm_up()
+        for game in read_games(source):
+            report = analyse_game(game, pool, args.depth, args.movetime)
+            out.write(json.dumps(report) + '\n')
+            out.flush()
+            count += 1
+            white, black = report['summary']['white'], report['summary']['black']
+            print(f"{game.headers.get('White', '?')} - {game.headers.get('Black', '?')}: "
+                  f"{len(report['plies'])} plies in {report['elapsed_s']}s, "
+                  f"blunders {white['blunder']}/{black['blunder']}, "
+                  f"mistakes {white['mistake']}/{black['mistake']}, "
+                  f"ACPL {white['acpl']}/{black['acpl']}", file=sys.stderr)
+    except UciError as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+    finally:
+        pool.close()
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    print(f'{count} game(s) analysed', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
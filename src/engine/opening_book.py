@@ -0,0 +1,67 @@
+"""Polyglot opening book lookups.
+
+A Polyglot ``.bin`` book is a file of 16-byte entries (Zobrist key, move,
+weight, learn) sorted by key. The file is memory-mapped and binary-searched by
+the position's Zobrist key, so a probe touches a handful of pages and costs
+microseconds instead of a Stockfish search. Among the book moves one is picked
+at random in proportion to its weight, the way Polyglot-aware GUIs play.
+"""
+import random
+from typing import List, Optional, Tuple
+
+import chess
+import chess.polyglot
+
+from src.ocr.fen_generator import parse_fen
+
+
+class OpeningBook:
+    """Read-only Polyglot book backed by ``chess.polyglot.MemoryMappedReader``."""
+
+    def __init__(self, path: str, min_weight: int = 1, seed: Optional[int] = None):
+        self.path = path
+        self.min_weight = max(0, int(min_weight))
+        self.hits = 0
+        self.misses = 0
+        self._random = random.Random(seed)
+        # Raises OSError / ValueError for missing or empty files
+        self._reader = chess.polyglot.open_reader(path)
+
+    def __len__(self) -> int:
+        return len(self._reader)
+
+    def moves(self, fen: str) -> List[Tuple[str, int]]:
+        """Book moves for ``fen`` as ``(uci, weight)``, heaviest first."""
+        board = parse_fen(fen).to_board()
+        entries = [(entry.move.uci(), entry.weight) for entry in self._reader.find_all(board)
+                   if entry.weight >= self.min_weight]
+        return sorted(entries, key=lambda e: -e[1])
+
+    def probe(self, fen: str, weighted: bool = True) -> Optional[str]:
+        """A book move for ``fen`` in UCI notation, or None if the position is not in the book.
+
+        With ``weighted`` the move is drawn in proportion to its weight from
+        the entries of at least ``min_weight``, otherwise the heaviest move is returned.
+        """
+        try:
+            board = parse_fen(fen).to_board()
+            if weighted:
+                entries = list(self._reader.find_all(board, minimum_weight=self.min_weight))
+                if not entries:
+                    raise IndexError(fen)
+                weights = [entry.weight for entry in entries]
+                entry = (self._random.choices(entries, weights)[0] if sum(weights)
+                         else self._random.choice(entries))
+            else:
+                entry = self._reader.find(board, minimum_weight=self.min_weight)
+        except IndexError:
+            # python-chess signals "no entry for this key" with IndexError
+            self.misses += 1
+            return None
+        except ValueError:
+            return None
+        self.hits += 1
+        return entry.move.uci()
+
+    def close(self) -> None:
+        self._reader.close()
@@ -0,0 +1,122 @@
+"""Background pondering on the position we expect to see next.
+
+After a best move is suggested, the suggested move and the engine's expected
+reply are played with python-chess and a pooled engine keeps searching that
+position while the user is idle. When the next request arrives the ponder
+search is stopped; its result goes into the analysis cache (an instant answer
+if the prediction was right) and the engine's hash table is warm either way.
+"""
+import threading
+import time
+from typing import Optional
+
+import chess
+
+from src.engine.analysis_cache import AnalysisCache, position_key
+from src.engine.engine_pool import EnginePool
+from src.engine.uci_process import UciError
+from src.utils.helpers import short_log
+
+
+def predicted_fen(fen: str, best_move: str, reply: Optional[str]) -> Optional[str]:
+    """FEN after ``best_move`` and ``reply`` (UCI), or None if either is illegal."""
+    try:
+        board = chess.Board(fen)
+        for uci in (best_move, reply):
+            if not uci:
+                return None
+            move = chess.Move.from_uci(uci)
+            if move not in board.legal_moves:
+                return None
+            board.push(move)
+    except ValueError:
+        return None
+    if board.is_game_over():
+        return None
+    return board.fen()
+
+
+class Ponderer:
+    """Runs at most one ponder search at a time on an engine from ``pool``."""
+
+    def __init__(self, pool: EnginePool, cache: AnalysisCache, max_depth: int = 30,
+                 max_time_ms: int = 60000):
+        self.pool = pool
+        self.cache = cache
+        self.max_depth = max_depth
+        self.max_time_ms = max_time_ms
+        self.fen: Optional[str] = None
+        self._key: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._engine = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, fen: str, best_move: str, reply: Optional[str]) -> bool:
+        """Start pondering the position after ``best_move`` + ``reply``. Returns True if started."""
+        target = predicted_fen(fen, best_move, reply)
+        if target is None:
+            return False
+        self.stop()
+        with self._lock:
+            self.fen, self._key = target, position_key(target)
+            self._cancel.clear()
+            self._thread = threading.Thread(target=self._run, args=(target,), daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self, fen: Optional[str] = None) -> bool:
+        """Stop pondering and wait for the engine to be returned to the pool.
+
+        Returns True if ``fen`` is the position that was being pondered (a hit).
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return False
+            self._cancel.set()
+        deadline = time.monotonic() + 2.0
+        while thread.is_alive() and time.monotonic() < deadline:
+            # Repeat: a stop that lands before the 'go' is ignored by the engine.
+            # Under the lock, so the engine can't be back in the pool (another caller's search)
+            with self._lock:
+                engine = self._engine
+                if engine is not None:
+                    try:
+                        engine.stop()
+                    except UciError:
+                        pass
+            thread.join(timeout=0.05)
+        if fen is None or self._key is None:
+            return False
+        try:
+            return position_key(fen) == self._key
+        except ValueError:
+            return False
+
+    def _run(self, fen: str) -> None:
+        started = time.monotonic()
+        try:
+            # Don't queue behind real requests: ponder only on an idle engine
+            with self.pool.engine(timeout=0.05) as engine:
+                with self._lock:
+                    if self._cancel.is_set():
+                        return
+                    self._engine = engine
+                try:
+                    engine.search(fen, self.max_depth, self.max_time_ms,
+                                  timeout=self.max_time_ms / 1000 + 3)
+                finally:
+                    with self._lock:
+                        self._engine = None
+                if engine.last_bestmove:
+                    self.cache.put(fen, engine.last_depth, engine.last_bestmove)
+                    short_log(f'🔮 Pondered next position to depth {engine.last_depth} '
+                              f'in {time.monotonic() - started:.1f}s')
+        except UciError:
+            # No idle engine or it failed: pondering is best-effort
+            pass
@@ -0,0 +1,88 @@
+"""Both-sides analysis for positions whose side to move is uncertain.
+
+The side to move is the one FEN field a screenshot cannot show, so OCR has to
+guess it. ``side_variants`` builds the white-to-move and black-to-move versions
+of a position and ``plausibility`` scores each one: a variant where the side
+*not* to move is in check is illegal, and one where the side to move is in
+check is the likelier reading (the last move gave check).
+"""
+from typing import List, Optional, Tuple
+
+import chess
+
+from src.engine.analysis import AnalysisResult
+from src.ocr.fen_generator import parse_fen
+
+
+class SideAnswer:
+    """Best move for one side-to-move reading of a position."""
+    __slots__ = ('turn', 'fen', 'plausibility', 'reason', 'analysis')
+
+    def __init__(self, turn: str, fen: str, plausibility: float, reason: str,
+                 analysis: Optional[AnalysisResult] = None):
+        self.turn = turn  # 'w' or 'b'
+        self.fen = fen
+        self.plausibility = plausibility  # 0.0 = illegal ... 1.0 = almost certainly right
+        self.reason = reason
+        self.analysis = analysis
+
+    @property
+    def move(self) -> Optional[str]:
+        return self.analysis.move if self.analysis else None
+
+    def to_dict(self) -> dict:
+        return {
+            'turn': self.turn,
+            'fen': self.fen,
+            'plausibility': self.plausibility,
+            'reason': self.reason,
+            'move': self.move,
+            'analysis': self.analysis.to_dict() if self.analysis else None,
+        }
+
+    def __repr__(self) -> str:
+        return f'SideAnswer({self.turn!r}, move={self.move!r}, plausibility={self.plausibility:.2f})'
+
+
+def side_variants(fen: str) -> List[Tuple[str, str, bool]]:
+    """``(turn, fen, guessed)`` for white and black to move; ``guessed`` marks the input's own turn.
+
+    The en passant square only makes sense for the guessed side and is dropped
+    from the other variant. Raises ValueError for an unparsable FEN.
+    """
+    board = parse_fen(fen).to_board()
+    variants = []
+    for color in (chess.WHITE, chess.BLACK):
+        variant = board.copy(stack=False)
+        guessed = variant.turn == color
+        if not guessed:
+            variant.turn = color
+            variant.ep_square = None
+        variants.append(('w' if color == chess.WHITE else 'b', variant.fen(), guessed))
+    return variants
+
+
+def plausibility(fen: str, guessed: bool = False) -> Tuple[float, str]:
+    """Score how likely ``fen`` is the real position, with a short reason."""
+    try:
+        board = parse_fen(fen).to_board()
+    except ValueError as e:
+        return 0.0, str(e)
+    status = board.status()
+    if status & chess.STATUS_OPPOSITE_CHECK:
+        return 0.0, 'side not to move is in check'
+    if status & chess.STATUS_TOO_MANY_CHECKERS or status & chess.STATUS_IMPOSSIBLE_CHECK:
+        return 0.0, 'impossible check'
+    if status != chess.STATUS_VALID:
+        return 0.0, 'illegal position'
+    score, reasons = 0.5, []
+    if board.is_check():
+        score += 0.4
+        reasons.append('side to move is in check')
+    if guessed:
+        # Small prior for the reading OCR picked
+        score += 0.1
+        reasons.append('OCR guess')
+    if not any(board.legal_moves):
+        reasons.append('checkmate' if board.is_check() else 'stalemate')
+    return round(min(score, 1.0), 2), ', '.join(reasons) or 'legal'
@@ -3,187 +3,126 @@ Keep this module as the single contract point.
 
 Contract (small):
 - get_best_move_for_fen(fen: str, depth: int=15) -> str | None
+- iter_analysis(fen: str, depth: int=20) -> Iterator[AnalysisResult]  (one update per depth)
+- analyse_fen(fen: str, depth: int=12, multipv: int=ENGINE_MULTIPV) -> list[AnalysisResult]  (best line first)
+- analyse_both_sides(fen: str, depth: int=12) -> list[SideAnswer]  (w and b to move, most plausible first)
+- async get_best_move_for_fen_async(fen: str, depth: int=10) -> str | None  (supersedes a running search)
+
+Searches run on a pool of warm engine processes (see engine_pool.py); the
+one-process-per-call CLI path is kept as a fallback. Results are cached by
+Zobrist hash (see analysis_cache.py); positions in the optional Polyglot
+opening book or the local Syzygy tables are answered without searching
+(see opening_book.py, tablebase.py). With ANALYSIS_WORKERS set, searches
+go to remote workers first (see distributed.py).
 """
+import asyncio
+import atexit
+import concurrent.futures
 import os
-import shutil
-import subprocess
+import threading
 import time
-import sys
-from typing import Optional
+from typing import Iterator, List, Optional
 
-from src.utils.config import STOCKFISH_PATH, STOCKFISH_DOWNLOAD_URL
+from src.engine.analysis import AnalysisResult
+from src.engine.analysis_cache import AnalysisCache
+from src.engine.async_engine import AsyncUciEngine
+from src.engine.backends import PythonStockfishBackend, needs_binary
+from src.engine.distributed import Coordinator
+from src.engine.engine_options import EngineProfile, auto_profile
+from src.engine.engine_locator import resolve_engine
+from src.engine.engine_pool import EnginePool
+from src.engine.opening_book import OpeningBook
+from src.engine.ponder import Ponderer
+from src.engine.side_to_move import SideAnswer, plausibility, side_variants
+from src.engine.tablebase import EndgameTablebase, TablebaseResult
+from src.engine.time_budget import CALIBRATION_FEN, DEFAULT_MOVETIME_MS, SearchScheduler
+from src.engine.uci_process import UciError, UciProcess
+from src.ocr.fen_generator import parse_fen, validate_fen_with_error
+from src.utils.config import (
+    STOCKFISH_PATH, ENGINE_POOL_SIZE, ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_DB,
+    ANALYSIS_LATENCY_TARGET_MS, ANALYSIS_MAX_DEPTH, ENGINE_PONDER, ENGINE_BACKEND, OPENING_BOOK_PATH, OPENING_BOOK_MIN_WEIGHT,
+    SYZYGY_PATH, SYZYGY_MAX_PIECES, SYZYGY_MAX_OPEN, ANALYSIS_WORKERS, ANALYSIS_WORKER_TIMEOUT
+)
 from src.utils.helpers import short_log
 
 
-def _find_stockfish() -> Optional[str]:
-    """
-    Tries to find Stockfish executable in common locations.
-    Returns path if found, None otherwise.
-    """
-    # First check the configured path
-    if os.path.exists(STOCKFISH_PATH):
-        return STOCKFISH_PATH
-    
-    # Common Windows locations
-    common_paths = [
-        r"C:\Program Files\Stockfish\stockfish.exe",
-        r"C:\Program Files (x86)\Stockfish\stockfish.exe",
-        os.path.expanduser(r"~\Downloads\stockfish-windows-x86-64-avx2\stockfish\stockfish-windows-x86-64-avx2.exe"),
-        os.path.expanduser(r"~\Downloads\stockfish\stockfish.exe"),
-        os.path.expanduser(r"~\Desktop\stockfish.exe"),
-        r"C:\stockfish\stockfish.exe",
-    ]
-    
-    # Also check in Downloads folder for common variations
-    downloads = os.path.expanduser("~/Downloads")
-    if os.path.exists(downloads):
-        for root, dirs, files in os.walk(downloads):
-            # Limit search depth to avoid long searches
-            depth = root[len(downloads):].count(os.sep)
-            if depth > 2:
-                continue
-            
-            for file in files:
-                if file.lower() in ['stockfish.exe', 'stockfish-windows-x86-64-avx2.exe']:
-                    path = os.path.join(root, file)
-                    if os.path.isfile(path):
-                        return path
-    
-    # Check common paths
-    for path in common_paths:
-        if os.path.exists(path):
-            return path
-    
-    # As a last resort on Windows, attempt to download automatically
-    if sys.platform == 'win32':
-        try:
-            dl = _download_and_extract_stockfish()
-            if dl and os.path.exists(dl):
-                return dl
-        except Exception as e:
-            short_log(f"⚠️ Auto-download failed: {str(e)[:120]}")
-
-    return None
-
+_pool: Optional[EnginePool] = None
+_pool_lock = threading.Lock()
+_cache: Optional[AnalysisCache] = None
+_async_engine: Optional[AsyncUciEngine] = None
+_profile: Optional[EngineProfile] = None
+_ponderer: Optional[Ponderer] = None
+_scheduler = SearchScheduler(ANALYSIS_LATENCY_TARGET_MS or None, max_depth=ANALYSIS_MAX_DEPTH)
+_async_loop = None
+_async_start_lock = None  # (loop, asyncio.Lock): locks bind to one event loop
+_python_stockfish: Optional[PythonStockfishBackend] = None
+_python_stockfish_lock = threading.Lock()  # one search at a time on the shared instance
+_book: Optional[OpeningBook] = None
+_book_loaded = False
+_tablebase: Optional[EndgameTablebase] = None
+_tablebase_loaded = False
+_coordinator: Optional[Coordinator] = None
+_coordinator_lock = threading.Lock()
 
-def _download_and_extract_stockfish(url: str = STOCKFISH_DOWNLOAD_URL) -> Optional[str]:
-    """Download and extract Stockfish for Windows into external/ and return the exe path.
 
-    Uses only stdlib (urllib, zipfile). Safe to call multiple times; skips download if already present.
+def _find_stockfish() -> Optional[str]:
     """
-    import urllib.request
-    import zipfile
-
-    root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    external_dir = os.path.join(root, 'external')
-    os.makedirs(external_dir, exist_ok=True)
-
-    zip_path = os.path.join(external_dir, 'stockfish-win-avx2.zip')
-    extract_dir = os.path.join(external_dir, 'stockfish_win')
-    os.makedirs(extract_dir, exist_ok=True)
-
-    # If an exe already exists in extract_dir, return it
-    for dirpath, _, files in os.walk(extract_dir):
-        for fn in files:
-            if fn.lower().startswith('stockfish') and fn.lower().endswith('.exe'):
-                return os.path.join(dirpath, fn)
-
-    short_log('⬇️ Downloading Stockfish (Windows AVX2)...')
-    short_log(f'   {url}')
-    try:
-        urllib.request.urlretrieve(url, zip_path)
-    except Exception as e:
-        raise RuntimeError(f'Failed to download Stockfish: {e}')
-
-    short_log('📦 Extracting Stockfish...')
-    try:
-        with zipfile.ZipFile(zip_path, 'r') as zf:
-            zf.extractall(extract_dir)
-    except Exception as e:
-        raise RuntimeError(f'Failed to extract Stockfish zip: {e}')
-    finally:
-        try:
-            os.remove(zip_path)
-        except Exception:
-            pass
+    Path of the Stockfish executable, or None if none was found.
+    Resolved once per process and remembered in a manifest (see engine_locator.py).
+    """
+    binary = resolve_engine()
+    return binary.path if binary else None
 
-    # Find exe after extraction
-    for dirpath, _, files in os.walk(extract_dir):
-        for fn in files:
-            if fn.lower().startswith('stockfish') and fn.lower().endswith('.exe'):
-                exe_path = os.path.join(dirpath, fn)
-                short_log(f'✅ Stockfish ready: {exe_path}')
-                return exe_path
 
-    raise RuntimeError('Stockfish executable not found after extraction.')
+def find_engine_path() -> Optional[str]:
+    """Path of the Stockfish binary to use (configured or auto-detected), or None."""
+    return _find_stockfish()
 
 
 def _try_python_stockfish(fen: str, depth: int = 15) -> Optional[str]:
     """
-    Tries to use python-stockfish library.
+    Tries to use python-stockfish library (one instance kept for the whole process).
     Returns best move or None on error.
     """
-    sf = None
-    try:
-        from stockfish import Stockfish
-        
-        # Try to find Stockfish path
-        stockfish_path = STOCKFISH_PATH if os.path.exists(STOCKFISH_PATH) else None
-        if not stockfish_path:
-            stockfish_path = _find_stockfish()
-        
-        # Initialize Stockfish
+    global _python_stockfish
+    with _pool_lock:
+        sf = _python_stockfish
+        if sf is not None and not sf.is_alive():
+            _python_stockfish = None
+            stale, sf = sf, None
+        else:
+            stale = None
+    if stale is not None:
+        stale.close()
+    if sf is None:
+        # Started outside the module-wide lock: a slow start mustn't block the other engine paths
+        sf = PythonStockfishBackend(_find_stockfish() or '')
         try:
-            if stockfish_path:
-                sf = Stockfish(path=stockfish_path)
-            else:
-                # Let python-stockfish try to find it automatically
-                sf = Stockfish()
-        except Exception as init_error:
-            short_log(f"⚠️ Could not initialize python-stockfish: {str(init_error)[:100]}")
-            return None
-        
-        # Check if Stockfish object was created successfully
-        if sf is None:
+            sf.start()
+        except UciError as e:
+            # python-stockfish not installed or no binary: stay quiet unless it's something else
+            if 'not installed' not in str(e):
+                short_log(f"⚠️ {e}")
             return None
-        
-        # Set position and get move
+        with _pool_lock:
+            if _python_stockfish is None or not _python_stockfish.is_alive():
+                _python_stockfish, extra = sf, None
+            else:
+                # Another caller started one meanwhile: use theirs
+                extra, sf = sf, _python_stockfish
+        if extra is not None:
+            extra.close()
+    # The search holds only this instance's lock, not the module-wide one
+    with _python_stockfish_lock:
         try:
-            sf.set_fen_position(fen)
-            sf.set_depth(depth)
-            best = sf.get_best_move()
-            return best
-        except Exception as move_error:
-            short_log(f"⚠️ Error getting move from python-stockfish: {str(move_error)[:100]}")
+            return sf.search(fen, depth, movetime=0)
+        except UciError as e:
+            short_log(f"⚠️ Error getting move from python-stockfish: {str(e)[:100]}")
+            with _pool_lock:
+                if _python_stockfish is sf:
+                    _python_stockfish = None
+            sf.close()
             return None
-            
-    except ImportError:
-        # python-stockfish not installed
-        return None
-    except Exception as e:
-        error_msg = str(e)
-        # Suppress AttributeError during cleanup (known issue with python-stockfish)
-        if 'AttributeError' not in str(type(e).__name__) and '_stockfish' not in error_msg:
-            short_log(f"⚠️ Error in python-stockfish: {error_msg[:100]}")
-        return None
-    finally:
-        # Clean up stockfish instance carefully
-        if sf is not None:
-            try:
-                # Try to properly close if method exists
-                if hasattr(sf, 'quit'):
-                    try:
-                        sf.quit()
-                    except:
-                        pass
-            except:
-                pass
-            try:
-                # Delete the object, but ignore AttributeError during cleanup
-                del sf
-            except (AttributeError, TypeError):
-                # Known issue: python-stockfish sometimes has cleanup issues
-                pass
 
 
 def _validate_fen_strict(fen: str):
@@ -191,81 +130,24 @@ def _validate_fen_strict(fen: str):
     Validates FEN string strictly before sending to Stockfish.
     Returns (is_valid, error_message)
     """
-    if not fen or not isinstance(fen, str):
-        return False, "FEN is empty or not a string"
-    
-    # Check basic structure
-    parts = fen.strip().split()
-    if len(parts) < 4:
-        return False, f"FEN must have at least 4 parts, got {len(parts)}"
-    
-    # Validate position part (first part)
-    position = parts[0]
-    rows = position.split('/')
-    if len(rows) != 8:
-        return False, f"FEN must have 8 rows, got {len(rows)}"
-    
-    # Validate each row has exactly 8 squares
-    for i, row in enumerate(rows):
-        square_count = 0
-        for char in row:
-            if char.isdigit():
-                square_count += int(char)
-            elif char in 'rnbqkpRNBQKP':
-                square_count += 1
-            else:
-                return False, f"Row {8-i} contains invalid character: '{char}'"
-        
-        if square_count != 8:
-            return False, f"Row {8-i} has {square_count} squares, must be 8"
-    
-    # Check for exactly one king of each color
-    white_kings = position.count('K')
-    black_kings = position.count('k')
-    if white_kings != 1:
-        return False, f"Must have exactly 1 white king, found {white_kings}"
-    if black_kings != 1:
-        return False, f"Must have exactly 1 black king, found {black_kings}"
-    
-    # Use python-chess for final validation if available
-    try:
-        import chess
-        try:
-            board = chess.Board(fen)
-            # Additional check: ensure the position is legal
-            if board.is_checkmate() or board.is_stalemate():
-                # These are valid positions, just terminal
-                pass
-        except ValueError as e:
-            return False, f"python-chess validation failed: {str(e)}"
-    except ImportError:
-        # python-chess not available, basic validation passed
-        pass
-    
-    return True, None
+    is_valid, error_msg = validate_fen_with_error(fen)
+    if is_valid and parse_fen(fen.strip()).opponent_in_check:
+        # The engine would be asked to move with the enemy king capturable
+        return False, "Side not to move is in check"
+    return is_valid, error_msg
 
 
-def _try_cli_stockfish(fen: str, depth: int = 10) -> Optional[str]:
+def _try_cli_stockfish(fen: str, depth: int = 10, movetime: int = DEFAULT_MOVETIME_MS) -> Optional[str]:
     """
     Improved Stockfish CLI communication with better error handling.
     """
     # Try to find Stockfish if configured path doesn't exist
-    stockfish_path = STOCKFISH_PATH if os.path.exists(STOCKFISH_PATH) else _find_stockfish()
-    
-    if not stockfish_path or not os.path.exists(stockfish_path):
-        if not os.path.exists(STOCKFISH_PATH):
-            short_log(f"❌ Stockfish not found at: {STOCKFISH_PATH}")
-            found_path = _find_stockfish()
-            if found_path:
-                short_log(f"💡 Found Stockfish at: {found_path}")
-                short_log(f"   Update STOCKFISH_PATH in src/utils/config.py to use this path")
-                stockfish_path = found_path
-            else:
-                short_log(f"💡 Tip: Download Stockfish from https://github.com/official-stockfish/Stockfish/releases/latest/download/stockfish-windows-x86-64-avx2.zip")
-                short_log(f"   Then update STOCKFISH_PATH in src/utils/config.py")
-                return None
-        else:
-            return None
+    stockfish_path = _find_stockfish()
+    if not stockfish_path:
+        short_log(f"❌ Stockfish not found (STOCKFISH_PATH={STOCKFISH_PATH or 'unset'})")
+        short_log("💡 Tip: Download Stockfish from https://github.com/official-stockfish/Stockfish/releases/latest")
+        short_log("   Then set STOCKFISH_PATH in .env")
+        return None
     
     # Strict FEN validation before attempting to use Stockfish
     is_valid, error_msg = _validate_fen_strict(fen)
@@ -273,169 +155,22 @@ def _try_cli_stockfish(fen: str, depth: int = 10) -> Optional[str]:
         short_log(f"❌ Invalid FEN rejected before Stockfish: {error_msg}")
         return None
     
-    p = None
-    stdin_handle = None
-    stdout_handle = None
-    stderr_handle = None
-    
+    # One-off engine: same UCI session code as the pool, closed straight after
+    engine = UciProcess(stockfish_path)
     try:
-        # Use simple UCI commands
-        # On Windows, we need to handle stdin/stdout more carefully
-        if sys.platform == 'win32':
-            # Windows-specific: use creationflags to avoid console window
-            p = subprocess.Popen(
-                [stockfish_path], 
-                stdin=subprocess.PIPE, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE, 
-                text=True,
-                bufsize=1,  # Line buffered
-                creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
-            )
-        else:
-            p = subprocess.Popen(
-                [stockfish_path], 
-                stdin=subprocess.PIPE, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE, 
-                text=True,
-                bufsize=1  # Line buffered
-            )
-        
-        stdin_handle = p.stdin
-        stdout_handle = p.stdout
-        stderr_handle = p.stderr
-        
-        # Check if process started correctly
-        time.sleep(0.1)  # Give process a moment to start
-        if p.poll() is not None:
-            # Process already terminated
-            try:
-                error_output = stderr_handle.read(1000) if stderr_handle else "Unknown error"
-            except:
-                error_output = "Could not read error"
-            short_log(f"❌ Stockfish process terminated immediately. Error: {error_output[:200]}")
-            return None
-        
-        # Send UCI commands
-        try:
-            stdin_handle.write('uci\n')
-            stdin_handle.flush()
-        except (BrokenPipeError, OSError, ValueError) as e:
-            short_log(f"❌ Error sending UCI command: {str(e)}")
-            return None
-        
-        # Wait for uciok with timeout
-        start = time.time()
-        uci_ok = False
-        while time.time() - start < 3:  # Increased timeout
-            if p.poll() is not None:
-                # Process died
-                try:
-                    error_output = stderr_handle.read(1000) if stderr_handle else "Process terminated"
-                except:
-                    error_output = "Process terminated (could not read stderr)"
-                short_log(f"❌ Stockfish process died during UCI handshake. Error: {error_output[:200]}")
-                return None
-            
-            try:
-                line = stdout_handle.readline()
-                if not line:
-                    time.sleep(0.1)  # Small delay if no output
-                    continue
-                if 'uciok' in line.lower():
-                    uci_ok = True
-                    break
-            except (BrokenPipeError, OSError) as e:
-                short_log(f"❌ Error reading UCI response: {str(e)}")
-                return None
-        
-        if not uci_ok:
-            short_log(f"⚠️ Stockfish did not respond with 'uciok' within timeout")
-            return None
-        
-        # Set position and calculate with movetime limit
         try:
-            stdin_handle.write(f'position fen {fen}\n')
-            stdin_handle.flush()
-        except (BrokenPipeError, OSError, ValueError) as e:
-            short_log(f"❌ Error writing position to Stockfish: {str(e)}")
+            engine.start(timeout=3)
+        except UciError as e:
+            short_log(f"❌ Stockfish did not complete the UCI handshake: {str(e)[:200]}")
             return None
         
-        try:
-            # Use both depth and movetime for safety
-            stdin_handle.write(f'go depth {depth} movetime 3000\n')  # Max 3 seconds
-            stdin_handle.flush()
-        except (BrokenPipeError, OSError, ValueError) as e:
-            short_log(f"❌ Error sending go command to Stockfish: {str(e)}")
-            return None
-        
-        best_move = None
-        start = time.time()
-        output_lines = []
-        max_wait_time = 6  # Increased total timeout
-        
-        while time.time() - start < max_wait_time:
-            if p.poll() is not None:
-                # Process died during calculation
-                try:
-                    if stderr_handle:
-                        error_output = stderr_handle.read(1000)
-                    else:
-                        error_output = "Process terminated"
-                except:
-                    error_output = "Process terminated (could not read stderr)"
-                
-                short_log(f"❌ Stockfish process died during calculation.")
-                if error_output and error_output.strip():
-                    short_log(f"   Error: {error_output[:200]}")
-                if output_lines:
-                    short_log(f"   Last output: {output_lines[-3:]}")
-                return None
-            
-            try:
-                line = stdout_handle.readline()
-                if not line:
-                    time.sleep(0.05)  # Small delay if no output
-                    continue
-                
-                line = line.strip()
-                output_lines.append(line)
-                
-                if line.startswith('bestmove'):
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        best_move = parts[1]
-                        if best_move == '(none)':
-                            short_log("⚠️ Stockfish returned 'none' as best move (checkmate/stalemate?)")
-                            return None
-                    break
-                elif line.startswith('error'):
-                    # Stockfish reported an error
-                    short_log(f"❌ Stockfish error: {line}")
-                    return None
-            except (BrokenPipeError, OSError) as e:
-                short_log(f"❌ Error reading from Stockfish: {str(e)}")
-                return None
-        
-        if not best_move:
-            short_log("⚠️ Stockfish did not return a best move within timeout")
-            # Try to read any remaining output
-            try:
-                if stdout_handle and not stdout_handle.closed:
-                    remaining = stdout_handle.read(500)
-                    if remaining:
-                        short_log(f"   Last output: {remaining[:200]}")
-            except:
-                pass
-        
+        best_move = engine.search(fen, depth, movetime=movetime, timeout=movetime / 1000 + 3)
+        if best_move is None:
+            short_log("⚠️ Stockfish returned 'none' as best move (checkmate/stalemate?)")
         return best_move
-        
-    except FileNotFoundError:
-        short_log(f"❌ Stockfish executable not found at: {stockfish_path}")
-        return None
-    except PermissionError:
-        short_log(f"❌ Permission denied executing Stockfish at: {stockfish_path}")
+    
+    except UciError as e:
+        short_log(f"❌ Stockfish process died during calculation: {str(e)[:200]}")
         return None
     except Exception as e:
         short_log(f"❌ Error in Stockfish CLI: {type(e).__name__}: {str(e)}")
@@ -444,71 +179,496 @@ def _try_cli_stockfish(fen: str, depth: int = 10) -> Optional[str]:
         return None
     
     finally:
-        # Properly close handles and terminate process (Windows-safe)
-        # Close in reverse order: stdin first, then stdout, then stderr
-        cleanup_success = False
-        max_cleanup_time = 2.0
-        cleanup_start = time.time()
-        
+        # quit, then terminate/kill only if it doesn't exit on its own
+        engine.close()
+
+
+def get_engine_profile() -> EngineProfile:
+    """Return the option profile applied to pooled engines (auto-sized on first use)."""
+    global _profile
+    if _profile is None:
         try:
-            if stdin_handle and not stdin_handle.closed:
+            _profile = auto_profile(max(1, ENGINE_POOL_SIZE))
+        except ValueError as e:
+            short_log(f'⚠️ Invalid engine options ({e}), using Stockfish defaults')
+            _profile = EngineProfile()
+    return _profile
+
+
+def get_engine_pool() -> Optional[EnginePool]:
+    """Return the process-wide engine pool, creating it on first use.
+
+    Returns None when pooling is disabled (ENGINE_POOL_SIZE=0) or no binary is found.
+    """
+    global _pool
+    if ENGINE_POOL_SIZE <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            stockfish_path = _find_stockfish()
+            if not stockfish_path and needs_binary(ENGINE_BACKEND):
+                return None
+            _pool = EnginePool(stockfish_path or '', size=ENGINE_POOL_SIZE,
+                               options=get_engine_profile().uci_options(), backend=ENGINE_BACKEND)
+        return _pool
+
+
+def warm_up_engine() -> None:
+    """Start the pooled engines ahead of the first request (safe to run in a thread)."""
+    pool = get_engine_pool()
+    if pool is None:
+        return
+    try:
+        pool.warm_up()
+        # Short search to measure this host's nps for the latency scheduler
+        with pool.engine() as engine:
+            started = time.monotonic()
+            engine.search(CALIBRATION_FEN, depth=ANALYSIS_MAX_DEPTH, movetime=200)
+            _record_search(engine, started, ANALYSIS_MAX_DEPTH, 200)
+        nps = _scheduler.nps
+        short_log(f'✅ Stockfish pool ready ({pool.size} engine(s), {get_engine_profile().describe()})')
+        if nps:
+            short_log(f'   Measured {nps / 1e6:.2f} Mnps per engine')
+    except UciError as e:
+        short_log(f'⚠️ Could not warm up Stockfish pool: {e}')
+
+
+def get_search_scheduler() -> SearchScheduler:
+    """Return the scheduler that turns the latency target into search limits."""
+    return _scheduler
+
+
+def _record_search(engine, started: float, depth: int, movetime: Optional[int]) -> None:
+    """Feed a finished search's nps and wall time to the scheduler.
+
+    Overhead is only measured on searches that movetime ended: one that reached
+    ``depth`` (or its node limit) first says nothing about the time beyond movetime.
+    """
+    info = engine.last_info
+    elapsed_ms = (time.monotonic() - started) * 1000
+    ended_by_movetime = bool(movetime) and engine.last_depth < depth and elapsed_ms >= movetime
+    _scheduler.record(info.nps if info else 0, elapsed_ms, movetime if ended_by_movetime else None)
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Return the process-wide analysis cache, creating it on first use."""
+    with _pool_lock:
+        return _analysis_cache_unlocked()
+
+
+def _analysis_cache_unlocked() -> AnalysisCache:
+    global _cache
+    if _cache is None:
+        _cache = AnalysisCache(ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_DB or None)
+    return _cache
+
+
+def get_coordinator() -> Optional[Coordinator]:
+    """Return the coordinator for ANALYSIS_WORKERS, or None if no workers are configured."""
+    global _coordinator
+    if not ANALYSIS_WORKERS:
+        return None
+    # Not _pool_lock: connecting can block for seconds per worker
+    with _coordinator_lock:
+        if _coordinator is None:
+            coordinator = Coordinator(ANALYSIS_WORKERS)
+            connected = coordinator.start()
+            short_log(f'🌐 {connected}/{len(ANALYSIS_WORKERS)} analysis worker(s) reachable')
+            _coordinator = coordinator
+        return _coordinator
+
+
+def _try_remote_stockfish(fen: str, depth: int = 10, movetime: int = DEFAULT_MOVETIME_MS) -> Optional[str]:
+    """
+    Runs the search on the least loaded remote worker.
+    Returns best move or None if no worker answered in time.
+    """
+    coordinator = get_coordinator()
+    if coordinator is None or not coordinator.capacity:
+        return None
+    future = coordinator.submit(fen, depth, movetime)
+    try:
+        result = future.result(timeout=ANALYSIS_WORKER_TIMEOUT)
+    except (UciError, concurrent.futures.TimeoutError) as e:
+        # Stop counting the job against its worker; a late answer is dropped
+        coordinator.forget(future)
+        short_log(f"⚠️ Remote analysis failed: {str(e)[:200] or 'timed out'}")
+        return None
+    best_move = result.get('bestmove')
+    if best_move:
+        get_analysis_cache().put(fen, min(depth, result.get('depth') or depth), best_move)
+    return best_move
+
+
+def get_opening_book() -> Optional[OpeningBook]:
+    """Return the opening book (OPENING_BOOK_PATH), or None if none is configured or it can't be read."""
+    global _book, _book_loaded
+    with _pool_lock:
+        if not _book_loaded:
+            _book_loaded = True
+            if OPENING_BOOK_PATH:
                 try:
-                    # Try to send quit command
-                    stdin_handle.write('quit\n')
-                    stdin_handle.flush()
-                except (BrokenPipeError, OSError, ValueError):
-                    pass
-                finally:
-                    try:
-                        stdin_handle.close()
-                    except:
-                        pass
-        except:
-            pass
-        
-        # Give process a moment to process quit command
-        time.sleep(0.15)
-        
+                    _book = OpeningBook(OPENING_BOOK_PATH, OPENING_BOOK_MIN_WEIGHT)
+                    short_log(f'📖 Opening book loaded: {len(_book)} entries')
+                except (OSError, ValueError) as e:
+                    short_log(f'⚠️ Could not open opening book {OPENING_BOOK_PATH}: {e}')
+        return _book
+
+
+def _book_move(fen: str) -> Optional[str]:
+    book = get_opening_book()
+    if book is None:
+        return None
+    move = book.probe(fen)
+    if move:
+        short_log(f'📖 Book move: {move}')
+    return move
+
+
+def get_tablebase() -> Optional[EndgameTablebase]:
+    """Return the Syzygy tablebase (SYZYGY_PATH), or None if none is configured or no tables were found."""
+    global _tablebase, _tablebase_loaded
+    with _pool_lock:
+        if not _tablebase_loaded:
+            _tablebase_loaded = True
+            directories = [d for d in SYZYGY_PATH.split(os.pathsep) if d]
+            if directories:
+                try:
+                    tb = EndgameTablebase(directories, SYZYGY_MAX_PIECES, SYZYGY_MAX_OPEN)
+                except OSError as e:
+                    short_log(f'⚠️ Could not read Syzygy tables: {e}')
+                else:
+                    if tb.largest:
+                        short_log(f'🏁 Syzygy tables loaded (up to {tb.largest} pieces)')
+                        _tablebase = tb
+                    else:
+                        short_log(f'⚠️ No Syzygy tables found in {SYZYGY_PATH}')
+        return _tablebase
+
+
+def _tablebase_move(fen: str) -> Optional[TablebaseResult]:
+    tb = get_tablebase()
+    if tb is None:
+        return None
+    result = tb.probe(fen)
+    if result is None:
+        return None
+    if not result.move:
+        # WDL tables only: the engine searches, restricted by SyzygyPath to moves keeping this result
+        short_log(f'🏁 Tablebase: {result.result_text()}, no DTZ table to pick the move')
+        return None
+    dtz = f', DTZ {abs(result.dtz)}' if result.dtz is not None else ''
+    short_log(f'🏁 Tablebase: {result.move} ({result.result_text()}{dtz})')
+    return result
+
+
+def _tablebase_update(result: TablebaseResult) -> AnalysisResult:
+    """Present a tablebase answer like an engine update (WDL certain, no search)."""
+    update = AnalysisResult(0, [result.move])
+    update.wdl = (1000, 0, 0) if result.wdl > 0 else (0, 0, 1000) if result.wdl < 0 else (0, 1000, 0)
+    update.tbhits = 1
+    return update
+
+
+def _expected_reply(engine) -> Optional[str]:
+    """The reply ``engine`` expects to its bestmove. Read it before the engine goes back to the pool."""
+    reply = engine.last_ponder
+    if not reply and engine.last_info and len(engine.last_info.pv) > 1:
+        reply = engine.last_info.pv[1]
+    return reply
+
+
+def _start_pondering(fen: str, best_move: Optional[str], reply: Optional[str]) -> None:
+    """After a suggestion, search the expected next position in the background (ENGINE_PONDER)."""
+    global _ponderer
+    pool = get_engine_pool()
+    if not ENGINE_PONDER or pool is None or not best_move:
+        return
+    with _pool_lock:
+        if _ponderer is None:
+            _ponderer = Ponderer(pool, _analysis_cache_unlocked(), max_depth=ANALYSIS_MAX_DEPTH)
+        ponderer = _ponderer
+    ponderer.start(fen, best_move, reply)
+
+
+def _stop_pondering(fen: str) -> None:
+    """Hand the pondering engine back before a new search; its result lands in the cache."""
+    ponderer = _ponderer
+    if ponderer is not None and ponderer.stop(fen):
+        short_log('🎯 Ponder hit: this is the position we were already searching')
+
+
+@atexit.register
+def shutdown_engine() -> None:
+    """Stop pondering, quit all pooled engine processes, disconnect from workers and close the cache, book and tablebase files."""
+    global _pool, _cache, _ponderer, _book, _tablebase, _coordinator, _async_engine
+    with _coordinator_lock:
+        coordinator, _coordinator = _coordinator, None
+    async_engine, _async_engine = _async_engine, None
+    if async_engine is not None:
+        _close_async_engine(async_engine, _async_loop)
+    with _pool_lock:
+        pool, _pool = _pool, None
+        cache, _cache = _cache, None
+        ponderer, _ponderer = _ponderer, None
+        book, _book = _book, None
+        tb, _tablebase = _tablebase, None
+    if coordinator is not None:
+        coordinator.close()
+    if tb is not None:
+        tb.close()
+    if book is not None:
+        book.close()
+    if ponderer is not None:
+        ponderer.stop()
+    if pool is not None:
+        pool.close()
+    if cache is not None:
+        cache.close()
+
+
+def _try_pooled_stockfish(fen: str, depth: int = 10, movetime: int = DEFAULT_MOVETIME_MS) -> Optional[str]:
+    """
+    Runs the search on a warm engine checked out of the pool.
+    Returns best move or None on error.
+    """
+    pool = get_engine_pool()
+    if pool is None:
+        return None
+    try:
+        with pool.engine() as engine:
+            started = time.monotonic()
+            best_move = engine.search(fen, depth, movetime=movetime, timeout=movetime / 1000 + 3)
+            reached, reply = engine.last_depth, _expected_reply(engine)
+            _record_search(engine, started, depth, movetime)
+        if best_move:
+            # Record the depth actually completed: movetime may cut the search short
+            get_analysis_cache().put(fen, min(depth, reached), best_move)
+            _start_pondering(fen, best_move, reply)
+        else:
+            short_log("⚠️ Stockfish returned 'none' as best move (checkmate/stalemate?)")
+        return best_move
+    except UciError as e:
+        short_log(f"⚠️ Pooled Stockfish failed: {str(e)[:200]}")
+        return None
+
+
+def iter_analysis(fen: str, depth: int = 20, movetime: int = 3000, nodes: Optional[int] = None,
+                  min_depth: Optional[int] = None) -> Iterator[AnalysisResult]:
+    """
+    Stream the search on ``fen``: yields an AnalysisResult each time a depth completes,
+    so a shallow suggestion is available long before the final one.
+    A cached answer searched to at least ``min_depth`` (default: ``depth``) is
+    yielded once, without a score.
+    Yields nothing if the position is invalid or no pooled engine is available.
+    """
+    is_valid, error_msg = _validate_fen_strict(fen)
+    if not is_valid:
+        short_log(f"❌ FEN validation failed: {error_msg}")
+        return
+    
+    _stop_pondering(fen)
+    book_move = _book_move(fen)
+    if book_move:
+        yield AnalysisResult(0, [book_move])
+        return
+    tb_result = _tablebase_move(fen)
+    if tb_result:
+        yield _tablebase_update(tb_result)
+        return
+    
+    cached = get_analysis_cache().get(fen, min_depth or depth)
+    if cached:
+        yield AnalysisResult(cached.depth, [cached.best_move])
+        return
+    
+    pool = get_engine_pool()
+    if pool is None:
+        return
+    try:
+        with pool.engine() as engine:
+            started = time.monotonic()
+            yield from engine.iter_search(fen, depth, movetime, timeout=movetime / 1000 + 3, nodes=nodes)
+            best_move, reached, reply = engine.last_bestmove, engine.last_depth, _expected_reply(engine)
+            _record_search(engine, started, depth, movetime)
+        if best_move:
+            get_analysis_cache().put(fen, min(depth, reached), best_move)
+            _start_pondering(fen, best_move, reply)
+    except UciError as e:
+        short_log(f"⚠️ Pooled Stockfish failed: {str(e)[:200]}")
+
+
+def analyse_fen(fen: str, depth: int = 12, multipv: Optional[int] = None,
+                movetime: int = 3000) -> List[AnalysisResult]:
+    """
+    Analyse the top ``multipv`` candidate moves (default: ENGINE_MULTIPV) in a single search.
+    Returns one AnalysisResult per line (score, WDL, PV, depth, nodes, nps), best first;
+    an empty list if the position is invalid or the engine fails.
+    """
+    is_valid, error_msg = _validate_fen_strict(fen)
+    if not is_valid:
+        short_log(f"❌ FEN validation failed: {error_msg}")
+        return []
+    
+    _stop_pondering(fen)
+    multipv = multipv or get_engine_profile().multipv
+    timeout = movetime / 1000 + 3
+    try:
+        pool = get_engine_pool()
+        if pool is not None:
+            with pool.engine() as engine:
+                results = engine.analyse(fen, depth, multipv, movetime, timeout)
+                reached = engine.last_depth
+        else:
+            # Pooling disabled: one throwaway process still beats one per line
+            stockfish_path = _find_stockfish()
+            if not stockfish_path:
+                short_log(f'❌ Stockfish not found at: {STOCKFISH_PATH}')
+                return []
+            engine = UciProcess(stockfish_path, get_engine_profile().uci_options())
+            try:
+                engine.start()
+                results = engine.analyse(fen, depth, multipv, movetime, timeout)
+                reached = engine.last_depth
+            finally:
+                engine.close()
+    except UciError as e:
+        short_log(f"⚠️ Stockfish analysis failed: {str(e)[:200]}")
+        return []
+    
+    if results and results[0].move:
+        get_analysis_cache().put(fen, min(depth, reached), results[0].move)
+    return results
+
+
+def analyse_both_sides(fen: str, depth: int = 12, movetime: int = 3000,
+                       nodes: Optional[int] = None) -> List[SideAnswer]:
+    """
+    Search the white-to-move and black-to-move readings of ``fen`` concurrently,
+    each on its own pooled engine. Returns one SideAnswer per reading, most
+    plausible first; an illegal reading (side not to move in check) gets
+    plausibility 0 and is not searched.
+    With fewer pooled engines than readings the searches queue up, so each
+    gets an equal share of ``movetime`` / ``nodes`` to stay within the budget.
+    """
+    try:
+        variants = side_variants(fen)
+    except ValueError as e:
+        short_log(f"❌ FEN validation failed: {e}")
+        return []
+    
+    answers = []
+    for turn, variant_fen, guessed in variants:
+        score, reason = plausibility(variant_fen, guessed)
+        answers.append(SideAnswer(turn, variant_fen, score, reason))
+    
+    searched = [a for a in answers if a.plausibility > 0]
+    pool = get_engine_pool()
+    if searched and (pool is None or pool.size < len(searched)):
+        movetime = max(1, movetime // len(searched)) if movetime else movetime
+        nodes = max(1, nodes // len(searched)) if nodes else nodes
+    
+    def search(answer: SideAnswer) -> None:
+        for update in iter_analysis(answer.fen, depth, movetime, nodes):
+            answer.analysis = update
+    
+    threads = [threading.Thread(target=search, args=(a,), daemon=True) for a in searched]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sorted(answers, key=lambda a: -a.plausibility)
+
+
+async def _get_async_engine() -> Optional[AsyncUciEngine]:
+    """Return the engine bound to the running event loop, starting it if needed."""
+    global _async_engine, _async_loop, _async_start_lock
+    loop = asyncio.get_running_loop()
+    if _async_engine is not None and _async_loop is loop and _async_engine.is_alive():
+        return _async_engine
+    if _async_start_lock is None or _async_start_lock[0] is not loop:
+        _async_start_lock = (loop, asyncio.Lock())
+    # Concurrent first calls must share one engine, or neither can stop the other's search
+    async with _async_start_lock[1]:
+        if _async_engine is not None and _async_loop is loop and _async_engine.is_alive():
+            return _async_engine
+        stockfish_path = _find_stockfish()
+        if not stockfish_path:
+            return None
+        engine = AsyncUciEngine(stockfish_path, get_engine_profile().uci_options())
         try:
-            if stdout_handle and not stdout_handle.closed:
-                stdout_handle.close()
-        except:
-            pass
-        
+            await engine.start()
+        except UciError:
+            await engine.close()
+            raise
+        _async_engine, _async_loop = engine, loop
+        return engine
+
+
+def _close_async_engine(engine: AsyncUciEngine, loop) -> None:
+    """Close ``engine`` from outside its event loop: politely if the loop still runs elsewhere, else kill it."""
+    if loop is not None and loop.is_running():
         try:
-            if stderr_handle and not stderr_handle.closed:
-                stderr_handle.close()
-        except:
-            pass
-        
-        # Ensure process is terminated
-        if p:
+            in_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            in_loop = False
+        if not in_loop:
             try:
-                if p.poll() is None:
-                    # Process still running, terminate it
-                    p.terminate()
-                    try:
-                        p.wait(timeout=1)
-                        cleanup_success = True
-                    except subprocess.TimeoutExpired:
-                        # Force kill if terminate didn't work
-                        try:
-                            p.kill()
-                            p.wait(timeout=0.5)
-                            cleanup_success = True
-                        except:
-                            pass
-                else:
-                    cleanup_success = True
+                asyncio.run_coroutine_threadsafe(engine.close(), loop).result(timeout=2)
+                return
             except Exception:
-                # Ignore errors during cleanup
                 pass
+    engine.kill()
 
 
-def get_best_move_for_fen(fen: str, depth: int = 10) -> Optional[str]:
+async def get_best_move_for_fen_async(fen: str, depth: int = 10, movetime: int = 3000) -> Optional[str]:
+    """
+    Async form of get_best_move_for_fen. A search still running from an older
+    call is stopped (that caller gets its partial bestmove) and the same engine
+    process is reused for this one.
+    """
+    is_valid, error_msg = _validate_fen_strict(fen)
+    if not is_valid:
+        short_log(f"❌ FEN validation failed: {error_msg}")
+        return None
+    
+    ans = _book_move(fen)
+    if ans:
+        return ans
+    tb_result = _tablebase_move(fen)
+    if tb_result:
+        return tb_result.move
+    
+    cached = get_analysis_cache().get(fen, depth)
+    if cached:
+        return cached.best_move
+    
+    try:
+        engine = await _get_async_engine()
+        if engine is None:
+            short_log(f'❌ Stockfish not found at: {STOCKFISH_PATH}')
+            return None
+        best_move = await engine.search(fen, depth, movetime)
+        if best_move:
+            get_analysis_cache().put(fen, min(depth, engine.last_depth), best_move)
+        return best_move
+    except UciError as e:
+        short_log(f"⚠️ Async Stockfish failed: {str(e)[:200]}")
+        return None
+
+
+async def cancel_analysis_async() -> Optional[str]:
+    """Stop the running async search, returning its partial bestmove."""
+    if _async_engine is None:
+        return None
+    return await _async_engine.cancel()
+
+
+def get_best_move_for_fen(fen: str, depth: int = 10, movetime: int = DEFAULT_MOVETIME_MS) -> Optional[str]:
     """
     Return best move string like 'e2e4' or algebraic like 'Nf3'. 
     Returns None if not found or on error.
+    ``movetime`` caps each engine search (python-stockfish searches by depth only).
     """
     if not fen:
         short_log("❌ Empty FEN provided to Stockfish")
@@ -520,8 +680,32 @@ def get_best_move_for_fen(fen: str, depth: int = 10) -> Optional[str]:
         short_log(f"❌ FEN validation failed: {error_msg}")
         return None
     
-    # Try CLI method first (more reliable)
-    ans = _try_cli_stockfish(fen, depth)
+    _stop_pondering(fen)
+    # Book and tablebase positions need no search at all
+    ans = _book_move(fen)
+    if ans:
+        return ans
+    tb_result = _tablebase_move(fen)
+    if tb_result:
+        return tb_result.move
+    
+    cached = get_analysis_cache().get(fen, depth)
+    if cached:
+        short_log(f'⚡ Cached analysis (depth {cached.depth})')
+        return cached.best_move
+    
+    # Remote workers, when configured, keep the local CPU free
+    ans = _try_remote_stockfish(fen, depth, movetime)
+    if ans:
+        return ans
+    
+    # Warm pooled engine (no process start-up cost)
+    ans = _try_pooled_stockfish(fen, depth, movetime)
+    if ans:
+        return ans
+    
+    # Fresh CLI process (more reliable if the pool is unavailable)
+    ans = _try_cli_stockfish(fen, depth, movetime)
     if ans:
         return ans
     
@@ -530,17 +714,16 @@ def get_best_move_for_fen(fen: str, depth: int = 10) -> Optional[str]:
     if ans:
         return ans
     
-    # Last resort: check if file exists and show helpful message
+    # Last resort: explain what is missing
     found_path = _find_stockfish()
-    if not os.path.exists(STOCKFISH_PATH) and not found_path:
-        short_log(f'❌ Stockfish not found at: {STOCKFISH_PATH}')
+    if not found_path:
+        short_log(f'❌ Stockfish not found (STOCKFISH_PATH={STOCKFISH_PATH or "unset"})')
         short_log('💡 To fix this:')
-        short_log('   1. Download Stockfish from https://github.com/official-stockfish/Stockfish/releases/latest/download/stockfish-windows-x86-64-avx2.zip')
-        short_log('   2. Extract it to a folder (e.g., C:\\stockfish\\stockfish.exe)')
-        short_log('   3. Update STOCKFISH_PATH in src/utils/config.py with the correct path')
-    elif found_path and not os.path.exists(STOCKFISH_PATH):
-        short_log(f'💡 Found Stockfish at: {found_path}')
-        short_log('   Update STOCKFISH_PATH in src/utils/config.py to use this automatically')
+        short_log('   1. Download Stockfish from https://github.com/official-stockfish/Stockfish/releases/latest')
+        short_log('   2. Install it (e.g. apt install stockfish) or extract it into external/')
+        short_log('   3. Or set STOCKFISH_PATH in .env to the binary')
+    elif STOCKFISH_PATH and os.path.abspath(found_path) != os.path.abspath(STOCKFISH_PATH):
+        short_log(f'💡 STOCKFISH_PATH is unusable, found Stockfish at: {found_path}')
     else:
         short_log('⚠️ Stockfish CLI error occurred. Check error messages above.')
     
@@ -0,0 +1,162 @@
+"""Syzygy endgame tablebase probing.
+
+Positions with few enough pieces are answered from local Syzygy WDL/DTZ files
+(through ``chess.syzygy``) instead of a search: the move is perfect and the
+result (win/draw/loss) is known. Only DTZ tables tell a winning move that makes
+progress from one that shuffles, so without them the probe gives the result
+but no move (unless a single move keeps it) and the engine, given the same
+directories as SyzygyPath, picks among the moves that keep it. Table files are indexed by piece count when
+the directories are added, so a position whose material has no table is
+rejected with a set lookup, and only the files actually probed get opened
+(python-chess keeps at most ``max_open`` of them, least recently used closed
+first). Finished probes are kept in a small LRU keyed by Zobrist hash.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set
+
+import chess
+import chess.polyglot
+import chess.syzygy
+
+from src.ocr.fen_generator import parse_fen
+
+# WDL from the side to move's point of view, as python-chess reports it
+_WDL_TEXT = {2: 'win', 1: 'cursed win', 0: 'draw', -1: 'blessed loss', -2: 'loss'}
+
+
+class TablebaseResult:
+    """Perfect-play move for a position and its tablebase result (``move`` is None if WDL can't pick one)."""
+    __slots__ = ('move', 'wdl', 'dtz')
+
+    def __init__(self, move: Optional[str], wdl: int, dtz: Optional[int] = None):
+        self.move = move
+        self.wdl = wdl
+        self.dtz = dtz  # plies to the next capture/pawn move, None without DTZ tables
+
+    def result_text(self) -> str:
+        return _WDL_TEXT.get(self.wdl, '?')
+
+    def __repr__(self) -> str:
+        return f'TablebaseResult({self.move!r}, {self.result_text()}, dtz={self.dtz})'
+
+
+class EndgameTablebase:
+    """Syzygy tables from one or more directories, probed for positions of at most ``max_pieces``."""
+
+    def __init__(self, directories: Iterable[str], max_pieces: int = 6, max_open: int = 64,
+                 cache_size: int = 1024):
+        self.max_pieces = max_pieces
+        self.cache_size = max(1, cache_size)
+        self.hits = 0
+        self._tables = chess.syzygy.Tablebase(max_fds=max(1, max_open))
+        self._wdl_names: Dict[int, Set[str]] = {}  # piece count -> table names with a WDL file
+        self._dtz_names: Set[str] = set()
+        self._results: 'OrderedDict[int, TablebaseResult]' = OrderedDict()
+        self._lock = threading.Lock()
+        for directory in directories:
+            self.add_directory(directory)
+
+    @property
+    def largest(self) -> int:
+        """Most pieces covered by any table found (0 if none)."""
+        return max(self._wdl_names, default=0)
+
+    def add_directory(self, directory: str) -> int:
+        """Index the table files in ``directory`` (opened lazily on first probe). Returns files found."""
+        found = 0
+        for filename in os.listdir(directory):
+            name, ext = os.path.splitext(filename)
+            if ext not in ('.rtbw', '.rtbz') or not chess.syzygy.is_tablename(name):
+                continue
+            if not self._tables.add_file(os.path.join(directory, filename)):
+                continue
+            found += 1
+            if ext == '.rtbw':
+                self._wdl_names.setdefault(len(name) - 1, set()).add(name)
+            else:
+                self._dtz_names.add(name)
+        return found
+
+    def covers(self, board: chess.Board) -> bool:
+        """Cheap pre-check: few enough pieces, no castling rights and a WDL table for this material."""
+        pieces = chess.popcount(board.occupied)
+        if pieces > self.max_pieces or board.castling_rights:
+            return False
+        names = self._wdl_names.get(pieces)
+        if not names:
+            return False
+        return chess.syzygy.calc_key(board) in names or chess.syzygy.calc_key(board, mirror=True) in names
+
+    def probe(self, fen: str) -> Optional[TablebaseResult]:
+        """Best move and result for ``fen``, or None if it is not covered by the local tables.
+
+        Without a DTZ table for the position the result's ``move`` is None
+        unless a single legal move keeps the best result.
+        """
+        try:
+            board = parse_fen(fen).to_board()
+        except ValueError:
+            return None
+        if not self.covers(board):
+            return None
+        key = chess.polyglot.zobrist_hash(board)
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return result
+            try:
+                result = self._best_move(board)
+            except KeyError:
+                # MissingTableError: a capture leads to material we have no table for
+                return None
+            except (OSError, ValueError):
+                # Unreadable or truncated table file: let the engine answer instead
+                return None
+            self._results[key] = result
+            if len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        return result
+
+    def _best_move(self, board: chess.Board) -> TablebaseResult:
+        wdl = self._tables.probe_wdl(board)
+        use_dtz = chess.syzygy.calc_key(board) in self._dtz_names or \
+            chess.syzygy.calc_key(board, mirror=True) in self._dtz_names
+        best_move, best_rank, best_dtz = None, None, None
+        tied = 0  # moves sharing the best rank
+        for move in board.legal_moves:
+            board.push(move)
+            try:
+                if board.is_checkmate():
+                    return TablebaseResult(move.uci(), 2, 1)
+                # Scores after the move are from the opponent's side: negate them
+                move_wdl = -self._tables.probe_wdl(board)
+                move_dtz = -self._tables.probe_dtz(board) if use_dtz else None
+            finally:
+                board.pop()
+            # Keep the best result; win fast (small |dtz|), lose slowly (large |dtz|),
+            # and reset the 50-move counter when winning if we can
+            zeroing = board.is_zeroing(move)
+            if move_dtz is None:
+                distance = 0
+            elif move_wdl > 0:
+                distance = -abs(move_dtz) + (1000 if zeroing else 0)
+            else:
+                distance = abs(move_dtz)
+            rank = (move_wdl, distance)
+            if best_rank is None or rank > best_rank:
+                best_move, best_rank, best_dtz, tied = move, rank, move_dtz, 1
+            elif rank == best_rank:
+                tied += 1
+        if not use_dtz and tied > 1:
+            # WDL alone ranks every winning move the same, including ones that
+            # never make progress: leave the choice to the engine
+            return TablebaseResult(None, wdl)
+        dtz = self._tables.probe_dtz(board) if use_dtz else best_dtz
+        return TablebaseResult(best_move.uci() if best_move else None, wdl, dtz)
+
+    def close(self) -> None:
+        self._tables.close()
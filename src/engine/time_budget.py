@@ -0,0 +1,105 @@
+"""Latency-driven search limits.
+
+Instead of a fixed ``go depth 12 movetime 3000``, the scheduler is given an
+end-to-end latency target (e.g. 400 ms at p95, counted from the hotkey press)
+and picks movetime/nodes for each request from what is left after capture and
+OCR, the engine's measured nps on this host and the observed I/O overhead.
+"""
+import threading
+from collections import deque
+from typing import Iterable, Optional
+
+# Fallback used when no latency target is configured (the historical fixed limits)
+DEFAULT_DEPTH = 12
+DEFAULT_MOVETIME_MS = 3000
+# Never give the engine less than this, even when the budget is already spent
+MIN_MOVETIME_MS = 30
+# Position used to measure nps at start-up (a busy middlegame)
+CALIBRATION_FEN = 'r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8'
+
+
+class SearchLimits:
+    """Limits for one ``go`` command; ``None`` means unlimited."""
+    __slots__ = ('depth', 'movetime', 'nodes')
+
+    def __init__(self, depth: Optional[int] = None, movetime: Optional[int] = None,
+                 nodes: Optional[int] = None):
+        self.depth = depth
+        self.movetime = movetime
+        self.nodes = nodes
+
+    def go_command(self) -> str:
+        parts = ['go']
+        if self.depth:
+            parts += ['depth', str(self.depth)]
+        if self.movetime:
+            parts += ['movetime', str(self.movetime)]
+        if self.nodes:
+            parts += ['nodes', str(self.nodes)]
+        if len(parts) == 1:
+            parts.append('infinite')
+        return ' '.join(parts)
+
+    def timeout(self) -> float:
+        """Seconds to wait for ``bestmove`` before sending ``stop``."""
+        return (self.movetime or DEFAULT_MOVETIME_MS) / 1000 + 3
+
+    def __repr__(self) -> str:
+        return f'SearchLimits(depth={self.depth}, movetime={self.movetime}, nodes={self.nodes})'
+
+
+def percentile(values: Iterable[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (``q`` in 0..1); None for no data."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class SearchScheduler:
+    """Turns a latency target into per-request search limits.
+
+    ``record`` is fed after every search with the final nps and the gap between
+    the wall-clock search time and the movetime given, so the limits track the
+    real host instead of a guess.
+    """
+
+    def __init__(self, target_ms: Optional[float] = None, quantile: float = 0.95,
+                 max_depth: int = 30, window: int = 64):
+        self.target_ms = target_ms
+        self.quantile = quantile
+        self.max_depth = max_depth
+        self._nps: deque = deque(maxlen=window)
+        self._overhead_ms: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    @property
+    def nps(self) -> Optional[float]:
+        """Median nps measured on this host, or None before the first search."""
+        with self._lock:
+            return percentile(self._nps, 0.5)
+
+    def overhead_ms(self) -> float:
+        """Time beyond movetime spent per search (pipe I/O, stop latency) at the target quantile."""
+        with self._lock:
+            overhead = percentile(self._overhead_ms, self.quantile)
+        return overhead if overhead is not None else 20.0
+
+    def record(self, nps: int, elapsed_ms: float, movetime_ms: Optional[int] = None) -> None:
+        """Add one search. Pass ``movetime_ms`` only when movetime is what ended it."""
+        with self._lock:
+            if nps > 0:
+                self._nps.append(nps)
+            if movetime_ms:
+                self._overhead_ms.append(max(0.0, elapsed_ms - movetime_ms))
+
+    def limits_for(self, spent_ms: float = 0.0, depth: Optional[int] = None) -> SearchLimits:
+        """Limits for a search that starts ``spent_ms`` after the request began."""
+        if not self.target_ms:
+            return SearchLimits(depth or DEFAULT_DEPTH, DEFAULT_MOVETIME_MS)
+        remaining = self.target_ms - spent_ms - self.overhead_ms()
+        movetime = int(min(DEFAULT_MOVETIME_MS, max(MIN_MOVETIME_MS, remaining)))
+        nps = self.nps
+        nodes = int(nps * movetime / 1000) if nps else None
+        return SearchLimits(depth or self.max_depth, movetime, nodes)
@@ -0,0 +1,291 @@
+"""Long-lived UCI engine process.
+
+Wraps one Stockfish subprocess that has already finished the ``uci`` handshake,
+so callers can send ``position``/``go`` without paying process start-up again.
+"""
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from src.engine.analysis import AnalysisResult, parse_info_line
+from src.engine.time_budget import SearchLimits
+from src.engine.uci_reader import UciReader
+from src.utils.helpers import short_log
+
+
+class UciError(RuntimeError):
+    """Raised when the engine process dies or stops answering."""
+
+
+class UciTimeout(UciError):
+    """Raised when the engine is alive but did not answer in time."""
+
+
+class UciProcess:
+    """A single Stockfish process kept open between searches."""
+
+    def __init__(self, path: str, options: Optional[Dict[str, object]] = None):
+        self.path = path
+        self.options = dict(options or {})
+        self.name: Optional[str] = None
+        self.last_used = 0.0
+        self.last_depth = 0
+        self.last_bestmove: Optional[str] = None
+        self.last_ponder: Optional[str] = None  # reply the engine expects to bestmove
+        self.last_info: Optional[AnalysisResult] = None
+        self._multipv = 1
+        self._wdl_enabled = False
+        self.last_line_at = 0.0  # arrival time of the last line read
+        self._proc: Optional[subprocess.Popen] = None
+        self._reader: Optional[UciReader] = None
+        # 'stop' may come from another thread (pondering) while a search writes
+        self._write_lock = threading.Lock()
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self, timeout: float = 5.0) -> None:
+        """Spawn the process, run the ``uci`` handshake and wait for ``readyok``."""
+        kwargs = {}
+        if sys.platform == 'win32' and hasattr(subprocess, 'CREATE_NO_WINDOW'):
+            # Windows-specific: avoid popping up a console window
+            kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+        try:
+            self._proc = subprocess.Popen(
+                [self.path],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,  # Line buffered
+                **kwargs
+            )
+        except OSError as e:
+            raise UciError(f'could not start engine at {self.path}: {e}')
+
+        self._reader = UciReader(self._proc.stdout)
+        self._reader.start()
+
+        deadline = time.monotonic() + timeout
+        self.send('uci')
+        while True:
+            line = self.wait_for(('id name', 'uciok'), deadline - time.monotonic())
+            if line.startswith('id name'):
+                self.name = line[len('id name'):].strip()
+            else:
+                break
+
+        for option, value in self.options.items():
+            self.send(f'setoption name {option} value {value}')
+        self._multipv = int(self.options.get('MultiPV', 1))
+        if not self.is_ready(deadline - time.monotonic()):
+            raise UciError("engine did not answer 'readyok' after handshake")
+        self.last_used = time.monotonic()
+
+    def is_alive(self) -> bool:
+        # EOF on stdout counts as dead even before the OS has reaped the process
+        if self._reader is not None and self._reader.eof_at is not None:
+            return False
+        return self._proc is not None and self._proc.poll() is None
+
+    def is_ready(self, timeout: float = 2.0) -> bool:
+        """Health check: send ``isready`` and wait for ``readyok``."""
+        try:
+            self.send('isready')
+            self.wait_for('readyok', timeout)
+            return True
+        except UciError:
+            return False
+
+    def sync(self, timeout: float = 1.0) -> bool:
+        """Bring an engine back to a known idle state after an interrupted search."""
+        if not self.is_alive():
+            return False
+        try:
+            self.send('stop')
+        except UciError:
+            return False
+        if not self.is_ready(timeout):
+            return False
+        self._drain()
+        return True
+
+    def stop(self) -> None:
+        """Ask a running search to finish now; its ``bestmove`` still arrives."""
+        self.send('stop')
+
+    def close(self, timeout: float = 1.0) -> None:
+        """Send ``quit`` and make sure the process is gone."""
+        p = self._proc
+        if p is None:
+            return
+        self._proc = None
+        reader, self._reader = self._reader, None
+        try:
+            with self._write_lock:
+                if p.poll() is None and p.stdin and not p.stdin.closed:
+                    p.stdin.write('quit\n')
+                    p.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            pass
+        try:
+            p.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                p.kill()
+                p.wait(timeout=0.5)
+            except Exception:
+                pass
+        if reader is not None:
+            reader.close()
+        for handle in (p.stdin, p.stdout, p.stderr):
+            try:
+                if handle and not handle.closed:
+                    handle.close()
+            except Exception:
+                pass
+
+    # -- I/O ---------------------------------------------------------------
+
+    def send(self, command: str) -> None:
+        if not self.is_alive():
+            raise UciError(f'engine is not running ({self._exit_reason()})')
+        try:
+            with self._write_lock:
+                self._proc.stdin.write(command + '\n')
+                self._proc.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            raise UciError(f"error sending '{command}': {e}")
+
+    def read_line(self, timeout: float) -> Optional[str]:
+        """Return the next output line, or None if nothing arrived within ``timeout``."""
+        if self._reader is None:
+            raise UciError('engine is not running (closed)')
+        try:
+            line = self._reader.get(timeout)
+        except EOFError:
+            raise UciError(f'engine exited ({self._exit_reason()})')
+        if line is None:
+            return None
+        self.last_line_at = line.timestamp
+        return line.text
+
+    def wait_for(self, prefix, timeout: float) -> str:
+        """Read lines until one starts with ``prefix`` (a str or tuple of str)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise UciTimeout(f"timed out waiting for '{prefix}'")
+            line = self.read_line(remaining)
+            if line is not None and line.startswith(prefix):
+                return line
+
+    def _drain(self) -> None:
+        if self._reader is not None:
+            self._reader.drain()
+
+    def _exit_reason(self) -> str:
+        p = self._proc
+        if p is None:
+            return 'closed'
+        try:
+            # Output hit EOF, so the process is on its way out
+            code = p.wait(timeout=0.5)
+        except subprocess.TimeoutExpired:
+            return 'still running'
+        error_output = ''
+        try:
+            if p.stderr:
+                error_output = p.stderr.read(200).strip()
+        except Exception:
+            pass
+        return f'exit code {code}' + (f': {error_output}' if error_output else '')
+
+    # -- search ------------------------------------------------------------
+
+    def iter_search(self, fen: str, depth: int, movetime: int = 3000,
+                    timeout: float = 6.0, multipv: int = 1,
+                    nodes: Optional[int] = None) -> Iterator[AnalysisResult]:
+        """Run ``go depth/movetime[/nodes]`` on ``fen`` and yield an update per completed depth.
+
+        With ``multipv`` > 1 every PV line is yielded (check ``update.multipv``).
+        The last principal-line update is kept in ``last_info`` and the final
+        ``bestmove`` (None for '(none)') in ``last_bestmove``. If the engine
+        overruns ``timeout`` it is told to ``stop`` and the partial bestmove is
+        used; UciError is raised only if it does not answer at all.
+        Closing the generator early stops the search and leaves the engine idle.
+        """
+        self._drain()
+        self.last_depth = 0
+        self.last_bestmove = None
+        self.last_ponder = None
+        self.last_info = None
+        self._set_multipv(multipv)
+        self.send(f'position fen {fen}')
+        self.send(SearchLimits(depth, movetime, nodes).go_command())
+        deadline = time.monotonic() + timeout
+        finished = False
+        try:
+            while True:
+                try:
+                    line = self.wait_for(('info', 'bestmove'), deadline - time.monotonic())
+                except UciTimeout:
+                    short_log('⚠️ Stockfish search overran its timeout, sending stop')
+                    self.send('stop')
+                    line = self.wait_for('bestmove', 1.0)
+                if line.startswith('bestmove'):
+                    finished = True
+                    self._set_bestmove(line)
+                    return
+                update = parse_info_line(line)
+                # Fail-high/low lines are not a completed iteration
+                if update is None or update.bound or update.multipv > multipv:
+                    continue
+                if update.multipv == 1:
+                    self.last_depth = max(self.last_depth, update.depth)
+                    self.last_info = update
+                yield update
+        finally:
+            self.last_used = time.monotonic()
+            if not finished and self.is_alive():
+                try:
+                    self.send('stop')
+                    self._set_bestmove(self.wait_for('bestmove', 1.0))
+                except UciError:
+                    pass
+
+    def search(self, fen: str, depth: int, movetime: int = 3000, timeout: float = 6.0,
+               nodes: Optional[int] = None) -> Optional[str]:
+        """Blocking form of ``iter_search``: return the bestmove, or None for '(none)'.
+
+        The deepest completed iteration is left in ``last_depth``.
+        """
+        for _ in self.iter_search(fen, depth, movetime, timeout, nodes=nodes):
+            pass
+        return self.last_bestmove
+
+    def analyse(self, fen: str, depth: int, multipv: int = 1, movetime: int = 3000,
+                timeout: float = 6.0, nodes: Optional[int] = None) -> List[AnalysisResult]:
+        """Search once with ``MultiPV`` and return the latest result for each line, best first."""
+        if not self._wdl_enabled:
+            self.send('setoption name UCI_ShowWDL value true')
+            self._wdl_enabled = True
+        lines: Dict[int, AnalysisResult] = {}
+        for update in self.iter_search(fen, depth, movetime, timeout, multipv=multipv, nodes=nodes):
+            lines[update.multipv] = update
+        return [lines[k] for k in sorted(lines)]
+
+    def _set_bestmove(self, line: str) -> None:
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] != '(none)':
+            self.last_bestmove = parts[1]
+        if len(parts) >= 4 and parts[2] == 'ponder':
+            self.last_ponder = parts[3]
+
+    def _set_multipv(self, multipv: int) -> None:
+        multipv = max(1, int(multipv))
+        if multipv != self._multipv:
+            self.send(f'setoption name MultiPV value {multipv}')
+            self._multipv = multipv
@@ -0,0 +1,117 @@
+"""Dedicated reader thread for an engine's stdout.
+
+Lines are read in large chunks as soon as the pipe is readable (``selectors``
+on POSIX), stamped with their arrival time and handed over through a queue.
+End-of-file means the process died and is reported to the consumer at once.
+There is no sleep-based polling anywhere: the consumer blocks on the queue and
+the reader blocks in ``select``.
+
+Windows pipes cannot be used with ``selectors``, so there the thread falls back
+to blocking ``readline`` calls, which keep the same no-polling behaviour.
+"""
+import os
+import queue
+import selectors
+import sys
+import threading
+import time
+from typing import NamedTuple, Optional
+
+_CHUNK = 65536
+
+
+class UciLine(NamedTuple):
+    timestamp: float  # time.monotonic() when the line arrived
+    text: str
+
+
+class UciReader:
+    """Reads lines from ``stream`` on a daemon thread into a queue of ``UciLine``."""
+
+    def __init__(self, stream):
+        self.eof_at: Optional[float] = None
+        self._stream = stream
+        self._lines: queue.Queue = queue.Queue()
+        self._wake_r = self._wake_w = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        if sys.platform != 'win32':
+            # Self-pipe so close() can interrupt select() without a timeout loop
+            self._wake_r, self._wake_w = os.pipe()
+        self._thread.start()
+
+    def get(self, timeout: float) -> Optional[UciLine]:
+        """Next line, or None if nothing arrived within ``timeout``. Raises EOFError once the stream ended."""
+        try:
+            line = self._lines.get(timeout=max(0.0, timeout))
+        except queue.Empty:
+            return None
+        if line is None:
+            # Keep the EOF marker so later reads fail fast too
+            self._lines.put(None)
+            raise EOFError('engine output closed')
+        return line
+
+    def drain(self) -> None:
+        """Discard lines already received."""
+        while True:
+            try:
+                line = self._lines.get_nowait()
+            except queue.Empty:
+                return
+            if line is None:
+                self._lines.put(None)
+                return
+
+    def close(self) -> None:
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b'x')
+            except OSError:
+                pass
+        self._thread.join(timeout=1.0)
+        for fd in (self._wake_r, self._wake_w):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._wake_r = self._wake_w = None
+
+    def _run(self) -> None:
+        try:
+            if self._wake_r is None:
+                self._run_blocking()
+            else:
+                self._run_selector()
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.eof_at = time.monotonic()
+            self._lines.put(None)
+
+    def _run_selector(self) -> None:
+        fd = self._stream.fileno()
+        pending = b''
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            selector.register(self._wake_r, selectors.EVENT_READ)
+            while True:
+                for key, _ in selector.select():
+                    if key.fd == self._wake_r:
+                        return
+                chunk = os.read(fd, _CHUNK)
+                if not chunk:
+                    break
+                now = time.monotonic()
+                # One chunk usually carries many info lines: split them in one go
+                *complete, pending = (pending + chunk).split(b'\n')
+                for raw in complete:
+                    self._lines.put(UciLine(now, raw.decode('utf-8', 'replace').rstrip('\r')))
+        if pending:
+            self._lines.put(UciLine(time.monotonic(), pending.decode('utf-8', 'replace').rstrip('\r')))
+
+    def _run_blocking(self) -> None:
+        for raw in self._stream:
+            self._lines.put(UciLine(time.monotonic(), raw.rstrip('\r\n')))
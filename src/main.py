@@ -3,18 +3,28 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import threading
+import time
 from pynput import keyboard
 from src.desktop_capture import capture_fullscreen
-from src.region_selector import select_region, capture_region, has_saved_region
-from src.ocr.board_detection import detect_board_from_image
-from src.ocr.gemini_vision import extract_fen_with_retry
-from src.engine.stockfish_engine import get_best_move_for_fen
+from src.region_selector import select_region, capture_region, has_saved_region, load_region
+from src.ocr.board_detection import board_orientation, detect_board, detect_board_from_image
+from src.ocr.fen_generator import validate_fen
+from src.ocr.frame_cache import frame_hash, get_frame_cache
+from src.ocr.gemini_vision import extract_fen_with_retry, warm_up_gemini
+from src.ocr.incremental import get_recognizer
+from src.ocr.template_cache import TemplateCache, get_template_cache
+from src.engine.stockfish_engine import (
+    analyse_both_sides, get_best_move_for_fen, get_search_scheduler, iter_analysis, warm_up_engine
+)
+from src.utils.config import ANALYSE_BOTH_SIDES, PIECE_MIN_CONFIDENCE
 from src.utils.helpers import short_log
 
 HOTKEY = '<ctrl>+q'
+PREVIEW_DEPTH = 8  # First depth worth showing while the search keeps refining
 
 def process_capture():
     """Processes the capture in a separate thread to avoid blocking the hotkey listener"""
+    started = time.monotonic()
     try:
         short_log('=' * 60)
         
@@ -36,10 +46,65 @@ def process_capture():
         img = capture_region()
         short_log(f'✅ Capture completed: {img.shape}')
         
-        # 2. Try to extract FEN with Gemini Vision (improved retry logic)
-        fen = extract_fen_with_retry(image_array=img, max_retries=2)  # 2 retries with exponential backoff
+        # 2. Recognize locally first (same frame as before, the move played since
+        #    the last capture, templates learned for this region, then the piece
+        #    classifier); Gemini only when none is sure
+        reading = None
+        turn_uncertain = False
+        source = None  # which recognizer produced the FEN; None = a guess not worth caching
+        flipped = None  # Black at the bottom of the capture, None = not known
+        frames = get_frame_cache()
+        frame_key = frame_hash(img) if frames is not None else None
+        cached = frames.get(frame_key) if frames is not None else None
+        fen = cached.fen if cached is not None else None
+        if fen:
+            source = 'frame'
+            turn_uncertain = cached.turn_uncertain
+            short_log('⚡ Board unchanged since an earlier capture, reusing its FEN')
+        recognizer = get_recognizer()
+        if not fen:
+            inferred = recognizer.update(img)
+            if inferred is not None:
+                fen, turn_uncertain = inferred
+                source = 'incremental'
+        templates = get_template_cache()
+        template_key = TemplateCache.key_for(load_region(), img.shape)
+        matched = templates.match(template_key, img) if templates is not None and not fen else None
+        if matched is not None:
+            short_log(f'📚 Read from learned templates (min score {matched.min_confidence:.2f})')
+            fen = matched.fen
+            source = 'templates'
+            flipped = matched.flipped
+            turn_uncertain = True
+        elif not fen:
+            reading = detect_board(img)
+        if reading is not None and reading.is_confident(PIECE_MIN_CONFIDENCE):
+            # The classifier can't see whose turn it is: answer for both sides
+            fen = reading.fen
+            source = 'classifier'
+            flipped = reading.flipped
+            turn_uncertain = True
+        elif reading is not None and reading.flipped is None:
+            short_log('🧩 Unsure which way round the board is, asking Gemini')
+        elif reading is not None:
+            short_log(f'🧩 Unsure about {", ".join(reading.uncertain_squares()[:8])}, asking Gemini')
+        
+        # Try to extract FEN with Gemini Vision (improved retry logic)
+        if not fen:
+            fen = extract_fen_with_retry(image_array=img, max_retries=2)  # 2 retries with exponential backoff
+            source = 'gemini' if fen else None
+            if fen and templates is not None and validate_fen(fen):
+                # A confirmed reading labels this capture: learn its squares for next time
+                flipped = board_orientation(img, fen)
+                learned = templates.learn(template_key, img, fen, flipped)
+                if learned:
+                    short_log(f'📚 Learned {learned} piece template(s) for this board')
         
-        # 3. If Gemini fails, use traditional detection method
+        # 3. If Gemini fails, use the best local reading or the traditional detection method
+        if (not fen or '/' not in fen) and reading is not None:
+            short_log('⚠️ Gemini could not extract FEN, using the local reading')
+            fen = reading.fen
+            source = None
         if not fen or '/' not in fen:
             short_log('⚠️ Gemini could not extract FEN, using traditional detection method...')
             import tempfile
@@ -49,6 +114,7 @@ def process_capture():
                 image_path = tmp.name
             short_log(f'📁 Image saved temporarily at: {image_path}')
             fen = detect_board_from_image(image_path)
+            source = None
             try:
                 os.unlink(image_path)
             except:
@@ -68,11 +134,43 @@ def process_capture():
             short_log(f'❌ FEN is invalid: {error_msg}')
             short_log('=' * 60)
             return
+        if frames is not None and source not in (None, 'frame'):
+            # Fallback guesses (unsure local reading, traditional detection) would stick to this frame
+            frames.put(frame_key, fen, turn_uncertain)
+        if source not in (None, 'incremental'):
+            # A trusted reading becomes the baseline for the next capture
+            # (an inferred one already is); it needs to know which way round the board is
+            if flipped is None:
+                flipped = board_orientation(img, fen)
+            recognizer.remember(img, fen, flipped, turn_uncertain)
         
         # 5. Get best move with Stockfish
         short_log('🧠 Analyzing position with Stockfish...')
         try:
-            move = get_best_move_for_fen(fen, depth=12)  # Slightly reduced depth for faster response
+            # Stream the search: show an early suggestion and refine it as depth grows
+            move = None
+            shown = None
+            # Engine gets whatever is left of the latency budget after capture and OCR
+            spent_ms = (time.monotonic() - started) * 1000
+            limits = get_search_scheduler().limits_for(spent_ms)
+            short_log(f'⏱️ Capture + OCR took {spent_ms:.0f} ms, engine budget {limits.movetime} ms')
+            if ANALYSE_BOTH_SIDES or turn_uncertain:
+                # Side to move is a guess: answer for both, most plausible first
+                for answer in analyse_both_sides(fen, limits.depth, limits.movetime, limits.nodes):
+                    score = answer.analysis.score_text() if answer.analysis else '-'
+                    short_log(f'🔀 {"White" if answer.turn == "w" else "Black"} to move: '
+                              f'{answer.move or "-"} ({score}), plausibility {answer.plausibility:.2f} ({answer.reason})')
+                    move = move or answer.move
+            else:
+                for update in iter_analysis(fen, limits.depth, limits.movetime, limits.nodes):
+                    move = update.move
+                    if update.depth >= PREVIEW_DEPTH and move != shown:
+                        short_log(f'💡 Depth {update.depth}: {move} ({update.score_text()})')
+                        shown = move
+            
+            if not move:
+                # Pool unavailable: fall back to the blocking call (spawns its own engine)
+                move = get_best_move_for_fen(fen, limits.depth, limits.movetime)
             
             if move:
                 short_log(f'✨ Best move suggested: {move}')
@@ -101,6 +199,10 @@ def main():
     short_log('🚀 ChessAI started')
     short_log(f'⌨️ Listening for shortcut {HOTKEY}. Press ESC to exit.')
     
+    # Start Stockfish and resolve the Gemini model in the background so the first capture doesn't pay for it
+    threading.Thread(target=warm_up_engine, daemon=True).start()
+    threading.Thread(target=warm_up_gemini, daemon=True).start()
+    
     if not has_saved_region():
         short_log('ℹ️ First time: Press Ctrl+Q to select the board area')
     
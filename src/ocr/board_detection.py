@@ -1,35 +1,402 @@
 """
-OCR/board detection stub.
-In a full implementation this module would use OpenCV to detect the board, segment squares
-and use CNN to identify pieces.
-run detection on-device with a lightweight model or call a backend.
+On-device board recognition.
 
-This stub attempts to import OpenCV and falls back to a mock FEN.
+The captured region is cut into its 64 squares with a single reshape and all
+squares are classified in one batched call by a small CPU model, so a frame
+takes a few milliseconds and needs no network:
+
+- ``.onnx`` models run through OpenCV DNN (input N x 1 x S x S, output N x 13)
+- ``.npz`` models are a one-hidden-layer perceptron evaluated with NumPy
+
+Classes are ``CLASSES`` (empty square, then PNBRQK pnbrqk). Squares are
+classified in image order; which way round the board is drawn is judged from
+where each side's king and pawns sit, and a reading whose orientation is
+unclear is never trusted. The side to move can't be seen, so a reading
+guesses the side at the bottom and callers should treat the turn as uncertain.
+
+No model ships with the repository: until one is trained and PIECE_MODEL_PATH
+points to it, nothing is recognized on-device (every capture goes to Gemini)
+and ``detect_board_from_image`` returns None. A NumPy model
+is trained from labelled captures of the boards you use:
+
+    python -m src.ocr.board_detection train labels.jsonl -o external/piece_classifier.npz
+
+where each line is {"image": "capture.png", "fen": "<FEN of that capture>"}
+(captures with White at the bottom).
 """
+import argparse
+import json
 import os
+import sys
+import threading
+import time
+from typing import List, Optional, Tuple
 
-MOCK_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+import numpy as np
 
+from src.utils.config import PIECE_MODEL_PATH, PIECE_MIN_CONFIDENCE
+from src.utils.helpers import short_log
 
-def detect_board_from_image(image_path: str) -> str:
-    """Try to detect a board and return a FEN string.
-    Returns None or mock FEN if detection isn't possible.
-    """
+CLASSES = '.PNBRQKpnbrqk'
+SQUARE_SIZE = 32  # pixels per square fed to the model
+# Squares this flat (pixel std, 0..1 scale) hold no piece
+FLAT_STD = 0.02
+# The top-left square is light either way round; shade per square in image order (0 light, 1 dark)
+SHADES = np.array([(i // 8 + i % 8) % 2 for i in range(64)], dtype=np.int8)
+# Brightness gap (0..1) between White's and Black's piece centres needed to call an orientation
+ORIENTATION_MARGIN = 0.1
+
+_classifier = None
+_classifier_loaded = False
+_classifier_lock = threading.Lock()
+
+
+def _to_gray(image: np.ndarray) -> np.ndarray:
+    if image.ndim == 2:
+        return image
+    # BGR(A) from OpenCV / mss; luma weights applied to the first three channels
+    return image[..., :3] @ np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+def _resize(image: np.ndarray, side: int) -> np.ndarray:
     try:
         import cv2
-    except Exception as e:
-    # Not available – return mock FEN.
-        print('OpenCV not available, returning mock FEN:', e)
-        return MOCK_FEN
+        return cv2.resize(image, (side, side), interpolation=cv2.INTER_AREA)
+    except ImportError:
+        # Nearest neighbour is enough for the classifier's 32 px squares
+        rows = (np.arange(side) * image.shape[0] / side).astype(np.intp)
+        cols = (np.arange(side) * image.shape[1] / side).astype(np.intp)
+        return image[rows[:, None], cols]
+
+
+def split_squares(image: np.ndarray, size: int = SQUARE_SIZE) -> np.ndarray:
+    """Board image -> (64, size, size) float32 in 0..1, a8 first and h1 last (FEN order)."""
+    # Shrink the uint8 capture first: converting every full-resolution pixel to float is the slow part
+    gray = _to_gray(_resize(np.asarray(image), 8 * size)).astype(np.float32)
+    squares = gray.reshape(8, size, 8, size).transpose(0, 2, 1, 3).reshape(64, size, size)
+    return squares / 255.0
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class PieceClassifier:
+    """Classifies a (64, S, S) batch of squares into ``CLASSES`` with per-square confidence."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = SQUARE_SIZE
+        self._net = None
+        self._weights = None
+        if path.endswith('.onnx'):
+            import cv2
+            self._net = cv2.dnn.readNetFromONNX(path)
+            self._net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self._net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        else:
+            with np.load(path) as data:
+                self._weights = [data[k].astype(np.float32) for k in ('w1', 'b1', 'w2', 'b2')]
+                self.size = int(data['size']) if 'size' in data else SQUARE_SIZE
+
+    def classify(self, squares: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (class index per square, probability of that class) for the whole batch."""
+        if self._net is not None:
+            self._net.setInput(squares[:, None, :, :].astype(np.float32))
+            probs = self._net.forward().reshape(len(squares), -1)
+            if not np.allclose(probs.sum(axis=1), 1, atol=1e-3):
+                probs = _softmax(probs)
+        else:
+            probs = _mlp_forward(self._weights, squares.reshape(len(squares), -1))
+        labels = probs.argmax(axis=1)
+        return labels, probs[np.arange(len(labels)), labels]
+
+
+def _mlp_forward(weights: List[np.ndarray], x: np.ndarray) -> np.ndarray:
+    w1, b1, w2, b2 = weights
+    hidden = np.maximum(0, (x - 0.5) @ w1 + b1)
+    return _softmax(hidden @ w2 + b2)
+
+
+class BoardReading:
+    """Recognized position with the model's confidence for every square (FEN order)."""
+
+    def __init__(self, placement: str, confidence: np.ndarray, turn: str = 'w', elapsed_ms: float = 0.0,
+                 flipped: Optional[bool] = False):
+        self.placement = placement
+        self.confidence = confidence
+        self.turn = turn
+        self.elapsed_ms = elapsed_ms
+        self.flipped = flipped  # Black at the bottom of the image; None if that couldn't be told
+
+    @property
+    def fen(self) -> str:
+        return f'{self.placement} {self.turn} {_castling(self.placement)} - 0 1'
+
+    @property
+    def min_confidence(self) -> float:
+        return float(self.confidence.min())
+
+    def is_confident(self, threshold: float = PIECE_MIN_CONFIDENCE) -> bool:
+        """Every square at least ``threshold`` sure and the orientation known."""
+        return self.flipped is not None and self.min_confidence >= threshold
+
+    def uncertain_squares(self, threshold: float = PIECE_MIN_CONFIDENCE) -> List[str]:
+        return [f"{'abcdefgh'[i % 8]}{8 - i // 8}" for i in np.flatnonzero(self.confidence < threshold)]
+
+    def __repr__(self) -> str:
+        return f'BoardReading({self.fen!r}, min_confidence={self.min_confidence:.2f})'
+
+
+def labels_to_placement(labels) -> str:
+    """64 class indices in FEN order -> FEN piece placement."""
+    rows = []
+    for r in range(8):
+        row, empty = '', 0
+        for label in labels[r * 8:(r + 1) * 8]:
+            if label == 0:
+                empty += 1
+                continue
+            if empty:
+                row += str(empty)
+                empty = 0
+            row += CLASSES[label]
+        rows.append(row + (str(empty) if empty else ''))
+    return '/'.join(rows)
+
+
+def placement_to_labels(placement: str) -> np.ndarray:
+    """FEN piece placement -> 64 class indices in FEN order."""
+    labels = []
+    for char in placement.split()[0].replace('/', ''):
+        labels.extend([0] * int(char) if char.isdigit() else [CLASSES.index(char)])
+    if len(labels) != 64:
+        raise ValueError(f'placement has {len(labels)} squares, must be 64')
+    return np.array(labels, dtype=np.intp)
+
+
+def _castling(placement: str) -> str:
+    """Castling rights implied by kings and rooks on their home squares."""
+    rows = placement.split('/')
+
+    def expand(row):
+        return ''.join('.' * int(c) if c.isdigit() else c for c in row)
 
-    # Minimal example: this is only a placeholder. Real detection is more involved.
+    first, last = expand(rows[7]), expand(rows[0])
+    rights = ''
+    if first[4] == 'K':
+        rights += ('K' if first[7] == 'R' else '') + ('Q' if first[0] == 'R' else '')
+    if last[4] == 'k':
+        rights += ('k' if last[7] == 'r' else '') + ('q' if last[0] == 'r' else '')
+    return rights or '-'
+
+
+def layout_orientation(labels) -> Optional[bool]:
+    """Whether a board read in image order (top-left square first) has Black at the bottom.
+
+    The side at the bottom keeps its king and pawns lower in the image than
+    the other side's. None when the king and pawns disagree or a side has no pawns.
+    """
+    labels = np.asarray(labels)
+    rows = np.arange(64) // 8
+
+    def mean_row(piece: str) -> Optional[float]:
+        where = rows[labels == CLASSES.index(piece)]
+        return float(where.mean()) if len(where) else None
+
+    white_king, black_king, white_pawns, black_pawns = (mean_row(c) for c in 'KkPp')
+    if None in (white_king, black_king, white_pawns, black_pawns):
+        return None
+    if white_king == black_king or white_pawns == black_pawns:
+        return None
+    white_low = white_king > black_king
+    if white_low != (white_pawns > black_pawns):
+        return None
+    return not white_low
+
+
+def board_orientation(image: np.ndarray, placement: str) -> Optional[bool]:
+    """Whether ``image`` shows ``placement`` with Black at the bottom, or None if it can't be told.
+
+    A FEN names squares, not where they are drawn. Both ways round are compared
+    with the image: which squares hold a piece, then whether White's pieces
+    have lighter centres than Black's on the same square shade.
+    """
+    labels = placement_to_labels(placement)
+    squares = split_squares(image, 16)
+    occupied = squares.reshape(64, -1).std(axis=1) >= FLAT_STD
+    centres = squares[:, 4:12, 4:12].mean(axis=(1, 2))
+    mismatches, contrast = [], []
+    for order in (labels, labels[::-1]):
+        mismatches.append(int((occupied != (order != 0)).sum()))
+        gap = 0.0
+        for shade in (0, 1):
+            white = centres[(SHADES == shade) & (order >= 1) & (order <= 6)]
+            black = centres[(SHADES == shade) & (order >= 7)]
+            if len(white) and len(black):
+                gap += float(white.mean() - black.mean())
+        contrast.append(gap)
+    if abs(mismatches[0] - mismatches[1]) >= 2:
+        return mismatches[1] < mismatches[0]
+    if abs(contrast[0] - contrast[1]) >= ORIENTATION_MARGIN:
+        return contrast[1] > contrast[0]
+    return None
+
+
+def get_classifier() -> Optional[PieceClassifier]:
+    """Return the piece classifier (PIECE_MODEL_PATH), or None if there is no usable model."""
+    global _classifier, _classifier_loaded
+    with _classifier_lock:
+        if not _classifier_loaded:
+            _classifier_loaded = True
+            if PIECE_MODEL_PATH and os.path.isfile(PIECE_MODEL_PATH):
+                try:
+                    _classifier = PieceClassifier(PIECE_MODEL_PATH)
+                    short_log(f'🧩 Piece classifier loaded: {os.path.basename(PIECE_MODEL_PATH)}')
+                except (OSError, ValueError, KeyError, ImportError) as e:
+                    short_log(f'⚠️ Could not load piece classifier {PIECE_MODEL_PATH}: {e}')
+        return _classifier
+
+
+def recognize_board(image: np.ndarray, turn: Optional[str] = None,
+                    flipped: Optional[bool] = None) -> Optional[BoardReading]:
+    """Classify every square of a board image. ``flipped`` means Black is at the bottom.
+
+    Orientation is detected from the reading when not given (``reading.flipped``
+    is None if it can't be); ``turn`` defaults to the side at the bottom.
+    Returns None when no model is available.
+    """
+    classifier = get_classifier()
+    if classifier is None:
+        return None
+    started = time.perf_counter()
+    labels, confidence = classifier.classify(split_squares(image, classifier.size))
+    if flipped is None:
+        flipped = layout_orientation(labels)
+    if flipped:
+        labels, confidence = labels[::-1], confidence[::-1]
+    elapsed = (time.perf_counter() - started) * 1000
+    return BoardReading(labels_to_placement(labels), confidence, turn or ('b' if flipped else 'w'),
+                        elapsed, flipped)
+
+
+def detect_board(image: np.ndarray) -> Optional[BoardReading]:
+    """Recognize a captured board array, or None without a model."""
     try:
+        reading = recognize_board(image)
+    except (ValueError, MemoryError) as ex:
+        short_log(f'⚠️ Local board recognition failed: {ex}')
+        return None
+    if reading is not None:
+        side = {None: 'orientation unclear', False: 'White at the bottom', True: 'Black at the bottom'}
+        short_log(f'🧩 Local recognition: {reading.placement} in {reading.elapsed_ms:.1f} ms '
+                  f'(min confidence {reading.min_confidence:.2f}, {side[reading.flipped]})')
+    return reading
+
+
+def detect_board_from_image(image_path: str) -> Optional[str]:
+    """Try to detect a board and return a FEN string.
+    Returns None unless a trained model reads the image confidently: a made-up
+    position would be analysed as if it were the captured board.
+    """
+    if get_classifier() is None:
+        short_log('No piece classifier available (PIECE_MODEL_PATH)')
+        return None
+    try:
+        import cv2
         img = cv2.imread(image_path)
-        if img is None:
-            print('Could not read image, returning mock FEN')
-            return MOCK_FEN
-        # For now return mock; place detection pipeline here later.
-        return MOCK_FEN
-    except Exception as ex:
-        print('Error during detection, returning mock FEN:', ex)
-        return MOCK_FEN
+    except ImportError as e:
+        short_log(f'OpenCV not available: {e}')
+        return None
+    if img is None:
+        short_log('Could not read image')
+        return None
+    reading = detect_board(img)
+    if reading is None or not reading.is_confident():
+        return None
+    return reading.fen
+
+
+# -- training ------------------------------------------------------------------
+
+
+def load_samples(labels_path: str, size: int = SQUARE_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """Squares and class labels from a JSONL file of {"image", "fen"} records."""
+    import cv2
+    base = os.path.dirname(os.path.abspath(labels_path))
+    xs, ys = [], []
+    with open(labels_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            path = record['image'] if os.path.isabs(record['image']) else os.path.join(base, record['image'])
+            img = cv2.imread(path)
+            if img is None:
+                short_log(f'⚠️ Skipping unreadable image {path}')
+                continue
+            xs.append(split_squares(img, size).reshape(64, -1))
+            ys.append(placement_to_labels(record['fen']))
+    if not xs:
+        raise ValueError(f'no usable samples in {labels_path}')
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+def train(x: np.ndarray, y: np.ndarray, hidden: int = 128, epochs: int = 30, lr: float = 0.1,
+          batch: int = 256, seed: int = 0, size: int = SQUARE_SIZE) -> dict:
+    """Fit the NumPy perceptron with minibatch SGD; returns the arrays to save with np.savez."""
+    rng = np.random.default_rng(seed)
+    n, d = x.shape
+    k = len(CLASSES)
+    w1 = (rng.standard_normal((d, hidden)) * np.sqrt(2 / d)).astype(np.float32)
+    b1 = np.zeros(hidden, np.float32)
+    w2 = (rng.standard_normal((hidden, k)) * np.sqrt(2 / hidden)).astype(np.float32)
+    b2 = np.zeros(k, np.float32)
+    onehot = np.eye(k, dtype=np.float32)[y]
+    for epoch in range(epochs):
+        order = rng.permutation(n)
+        for start in range(0, n, batch):
+            idx = order[start:start + batch]
+            xb = x[idx] - 0.5
+            h = np.maximum(0, xb @ w1 + b1)
+            grad = (_softmax(h @ w2 + b2) - onehot[idx]) / len(idx)
+            gh = (grad @ w2.T) * (h > 0)
+            w2 -= lr * h.T @ grad
+            b2 -= lr * grad.sum(axis=0)
+            w1 -= lr * xb.T @ gh
+            b1 -= lr * gh.sum(axis=0)
+        if epoch == epochs - 1 or epoch % 10 == 0:
+            accuracy = (_mlp_forward([w1, b1, w2, b2], x).argmax(axis=1) == y).mean()
+            short_log(f'epoch {epoch + 1}/{epochs}: accuracy {accuracy:.3f}')
+    return {'w1': w1, 'b1': b1, 'w2': w2, 'b2': b2, 'size': np.array(size)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Local piece classifier.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    t = sub.add_parser('train', help='train a NumPy model from labelled captures')
+    t.add_argument('labels', help='JSONL with one {"image": path, "fen": FEN} per line')
+    t.add_argument('--output', '-o', default=PIECE_MODEL_PATH or 'piece_classifier.npz')
+    t.add_argument('--epochs', type=int, default=30)
+    t.add_argument('--hidden', type=int, default=128)
+    r = sub.add_parser('detect', help='recognize one board image')
+    r.add_argument('image')
+    args = parser.parse_args(argv)
+
+    if args.command == 'train':
+        x, y = load_samples(args.labels)
+        short_log(f'{len(x) // 64} boards, {len(x)} squares')
+        np.savez(args.output, **train(x, y, args.hidden, args.epochs))
+        short_log(f'💾 Saved {args.output}')
+        return 0
+
+    fen = detect_board_from_image(args.image)
+    if not fen:
+        return 1
+    print(fen)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,133 +1,229 @@
 """Small helper to generate/validate FENs.
-This is intentionally tiny — relies on `python-chess` when available.
+
+``parse_fen`` reads a FEN in one pass into a compact 64-byte board (a1 = 0,
+h8 = 63) plus the state fields, checking structure and legality as it goes
+(piece characters, square counts, kings, pawns on the back ranks, impossible
+piece counts, side not to move in check). Results are memoized by FEN string,
+so OCR, validation and the engine layer all share one parsed object per
+capture. python-chess is only needed for ``ParsedFen.to_board``.
 """
-from typing import Optional
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
 
 try:
     import chess
 except Exception:
     chess = None
 
+# Board encoding: 0 empty, 1-6 white P N B R Q K, 9-14 black (BLACK bit set)
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+BLACK = 8
+PIECE_CODES = {c: i + 1 for i, c in enumerate('PNBRQK')}
+PIECE_CODES.update({c: i + 1 | BLACK for i, c in enumerate('pnbrqk')})
+PIECE_CHARS = {code: c for c, code in PIECE_CODES.items()}
+
+_KNIGHT_STEPS = ((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2))
+_KING_STEPS = ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))
+_ROOK_DIRS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+_BISHOP_DIRS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+# White's rights first, then Black's (Shredder-FEN file letters allowed)
+_CASTLING = re.compile(r'(?:[KQA-H]{1,2}[kqa-h]{0,2}|[kqa-h]{1,2})\Z')
+
+
+class ParsedFen:
+    """One parsed FEN. ``error`` is None when the position is usable."""
+
+    __slots__ = ('fen', 'board', 'turn', 'castling', 'ep_square', 'halfmove', 'fullmove',
+                 'kings', 'error', 'opponent_in_check', '_chess_board')
+
+    def __init__(self, fen: str):
+        self.fen = fen
+        self.board = bytes(64)
+        self.turn = 'w'
+        self.castling = '-'
+        self.ep_square: Optional[int] = None
+        self.halfmove = 0
+        self.fullmove = 1
+        self.kings = (None, None)  # (white, black) king squares
+        self.error: Optional[str] = None
+        self.opponent_in_check = False
+        self._chess_board = None
+
+    @property
+    def valid(self) -> bool:
+        return self.error is None
+
+    @property
+    def legal(self) -> bool:
+        """Valid and the side not to move is not in check (an engine can search it)."""
+        return self.error is None and not self.opponent_in_check
+
+    def piece_at(self, square: int) -> Optional[str]:
+        return PIECE_CHARS.get(self.board[square])
+
+    def to_board(self):
+        """A fresh ``chess.Board`` for this position (built once, then copied). Needs python-chess."""
+        if self.error:
+            raise ValueError(self.error)
+        if self._chess_board is None:
+            self._chess_board = chess.Board(self.fen)
+        return self._chess_board.copy(stack=False)
+
+    def __repr__(self) -> str:
+        return f'ParsedFen({self.fen!r}, error={self.error!r})'
+
+
+def square_name(square: int) -> str:
+    return 'abcdefgh'[square % 8] + str(square // 8 + 1)
+
+
+@lru_cache(maxsize=4096)
+def parse_fen(fen: str) -> ParsedFen:
+    """Parse and check ``fen`` (memoized). Never raises: problems are reported in ``.error``."""
+    parsed = ParsedFen(fen)
+    parsed.error = _parse(parsed, fen) if isinstance(fen, str) else 'FEN is empty or not a string'
+    return parsed
+
+
+def _parse(parsed: ParsedFen, fen: str) -> Optional[str]:
+    """Fill ``parsed`` from ``fen``; return the first problem found, or None."""
+    parts = fen.split()
+    if not parts:
+        return 'FEN is empty after stripping'
+    if len(parts) < 4:
+        return f'FEN must have at least 4 parts, got {len(parts)}'
+    if len(parts) > 6:
+        return f'FEN must have at most 6 parts, got {len(parts)}'
+
+    # Placement: one pass over the characters, counting as we go
+    board = bytearray(64)
+    counts = [0] * 16
+    kings = [None, None]
+    rank, file = 7, 0
+    previous = ''
+    for char in parts[0]:
+        if char == '/':
+            if file != 8:
+                return f'Row {rank + 1} has {file} squares, must be 8'
+            rank -= 1
+            file = 0
+            if rank < 0:
+                return f'FEN must have 8 rows, got {parts[0].count("/") + 1}'
+        elif '1' <= char <= '8':
+            # '44' for '8' is a classic OCR slip; python-chess refuses it too
+            if '1' <= previous <= '8':
+                return f'Row {rank + 1} has two consecutive digits'
+            file += ord(char) - 48
+        elif char in PIECE_CODES:
+            if file >= 8:
+                file += 1
+                continue
+            code = PIECE_CODES[char]
+            square = rank * 8 + file
+            board[square] = code
+            counts[code] += 1
+            if code & 7 == KING:
+                kings[code >> 3] = square
+            elif code & 7 == PAWN and rank in (0, 7):
+                return f'Pawn on the back rank ({square_name(square)})'
+            file += 1
+        else:
+            return f"Row {rank + 1} contains invalid character: '{char}'"
+        previous = char
+    if rank != 0:
+        return f'FEN must have 8 rows, got {8 - rank}'
+    if file != 8:
+        return f'Row 1 has {file} squares, must be 8'
+
+    for colour, name, offset in ((0, 'white', 0), (1, 'black', BLACK)):
+        king_count = counts[KING | offset]
+        if king_count != 1:
+            return f'Must have exactly 1 {name} king, found {king_count}'
+        pawns = counts[PAWN | offset]
+        if pawns > 8:
+            return f'Too many {name} pawns ({pawns})'
+        # Every piece beyond the starting set must be a promoted pawn
+        promoted = (max(0, counts[QUEEN | offset] - 1) + max(0, counts[ROOK | offset] - 2)
+                    + max(0, counts[BISHOP | offset] - 2) + max(0, counts[KNIGHT | offset] - 2))
+        if pawns + promoted > 8:
+            return f'Impossible {name} material: {pawns} pawns with {promoted} promoted pieces'
+    parsed.board = bytes(board)
+    parsed.kings = (kings[0], kings[1])
+
+    # State fields
+    turn = parts[1]
+    if turn not in ('w', 'b'):
+        return f"Side to move must be 'w' or 'b', got '{turn}'"
+    parsed.turn = turn
+    castling = parts[2]
+    if castling != '-' and (len(set(castling)) != len(castling) or not _CASTLING.match(castling)):
+        return f"Invalid castling field: '{castling}'"
+    parsed.castling = castling
+    ep = parts[3]
+    if ep != '-':
+        if len(ep) != 2 or ep[0] not in 'abcdefgh' or ep[1] not in '36':
+            return f"Invalid en passant square: '{ep}'"
+        parsed.ep_square = (ord(ep[1]) - 49) * 8 + ord(ep[0]) - 97
+    for index, field, minimum in ((4, 'halfmove', 0), (5, 'fullmove', 0)):
+        if len(parts) > index:
+            if not parts[index].isdecimal() or int(parts[index]) < minimum:
+                return f"Invalid {field} clock: '{parts[index]}'"
+            setattr(parsed, field, int(parts[index]))
+    # Fullmove 0 is tolerated for compatibility but means 1, as in python-chess
+    parsed.fullmove = max(1, parsed.fullmove)
+
+    # The side that just moved must not have left its king in check
+    waiting = 1 if turn == 'w' else 0
+    parsed.opponent_in_check = is_attacked(parsed.board, kings[waiting], by_black=waiting == 0)
+    return None
+
+
+def is_attacked(board: bytes, square: int, by_black: bool) -> bool:
+    """Whether ``square`` is attacked by a piece of the given colour on the 64-byte ``board``."""
+    side = BLACK if by_black else 0
+    rank, file = divmod(square, 8)
+
+    def piece(r, f):
+        return board[r * 8 + f] if 0 <= r < 8 and 0 <= f < 8 else None
+
+    # Pawns attack towards the opponent, so look back against their direction
+    pawn_rank = rank + 1 if by_black else rank - 1
+    if piece(pawn_rank, file - 1) == PAWN | side or piece(pawn_rank, file + 1) == PAWN | side:
+        return True
+    if any(piece(rank + dr, file + df) == KNIGHT | side for dr, df in _KNIGHT_STEPS):
+        return True
+    if any(piece(rank + dr, file + df) == KING | side for dr, df in _KING_STEPS):
+        return True
+    for dirs, slider in ((_ROOK_DIRS, ROOK), (_BISHOP_DIRS, BISHOP)):
+        for dr, df in dirs:
+            r, f = rank + dr, file + df
+            while 0 <= r < 8 and 0 <= f < 8:
+                code = board[r * 8 + f]
+                if code:
+                    if code in (slider | side, QUEEN | side):
+                        return True
+                    break
+                r, f = r + dr, f + df
+    return False
+
 
 def validate_fen(fen: str) -> bool:
     """
     Validates FEN string. Returns True if valid, False otherwise.
-    Uses python-chess if available for strict validation.
     """
     if not fen or not isinstance(fen, str):
         return False
-    
-    fen = fen.strip()
-    if not fen:
-        return False
-    
-    # Basic structure check: must have at least 4 parts
-    parts = fen.split()
-    if len(parts) < 4:
-        return False
-    
-    # Use python-chess for strict validation if available
-    if chess:
-        try:
-            board = chess.Board(fen)
-            # Additional checks
-            # Check that position part has 8 rows
-            position = parts[0]
-            rows = position.split('/')
-            if len(rows) != 8:
-                return False
-            
-            # Check each row has exactly 8 squares
-            for row in rows:
-                square_count = 0
-                for char in row:
-                    if char.isdigit():
-                        square_count += int(char)
-                    elif char in 'rnbqkpRNBQKP':
-                        square_count += 1
-                    else:
-                        return False
-                if square_count != 8:
-                    return False
-            
-            # Check for exactly one king of each color
-            white_kings = position.count('K')
-            black_kings = position.count('k')
-            if white_kings != 1 or black_kings != 1:
-                return False
-            
-            return True
-        except (ValueError, AttributeError, TypeError):
-            return False
-    
-    # Fallback: basic sanity check without python-chess
-    # Check that first part has 8 rows separated by /
-    position = parts[0]
-    if '/' not in position:
-        return False
-    
-    rows = position.split('/')
-    if len(rows) != 8:
-        return False
-    
-    # Basic character validation
-    valid_chars = set('rnbqkpRNBQKP12345678/')
-    for row in rows:
-        for char in row:
-            if char not in valid_chars:
-                return False
-    
-    return True
-
-
-def validate_fen_with_error(fen: str):
+    return parse_fen(fen.strip()).valid
+
+
+def validate_fen_with_error(fen: str) -> Tuple[bool, Optional[str]]:
     """
     Validates FEN string and returns (is_valid, error_message).
     More detailed than validate_fen().
     """
     if not fen or not isinstance(fen, str):
         return False, "FEN is empty or not a string"
-    
-    fen = fen.strip()
-    if not fen:
-        return False, "FEN is empty after stripping"
-    
-    parts = fen.split()
-    if len(parts) < 4:
-        return False, f"FEN must have at least 4 parts, got {len(parts)}"
-    
-    position = parts[0]
-    rows = position.split('/')
-    if len(rows) != 8:
-        return False, f"FEN must have 8 rows, got {len(rows)}"
-    
-    # Validate each row
-    for i, row in enumerate(rows):
-        square_count = 0
-        for char in row:
-            if char.isdigit():
-                square_count += int(char)
-            elif char in 'rnbqkpRNBQKP':
-                square_count += 1
-            else:
-                return False, f"Row {8-i} contains invalid character: '{char}'"
-        
-        if square_count != 8:
-            return False, f"Row {8-i} has {square_count} squares, must be 8"
-    
-    # Check kings
-    white_kings = position.count('K')
-    black_kings = position.count('k')
-    if white_kings != 1:
-        return False, f"Must have exactly 1 white king, found {white_kings}"
-    if black_kings != 1:
-        return False, f"Must have exactly 1 black king, found {black_kings}"
-    
-    # Use python-chess for final validation
-    if chess:
-        try:
-            chess.Board(fen)
-        except ValueError as e:
-            return False, f"python-chess validation failed: {str(e)}"
-    
-    return True, None
+    parsed = parse_fen(fen.strip())
+    return parsed.valid, parsed.error
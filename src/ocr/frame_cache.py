@@ -0,0 +1,170 @@
+"""Perceptual-hash cache from captured board images to recognized FENs.
+
+Pressing the hotkey again on an unchanged board sends the same pixels to
+recognition. Each capture is reduced to an 8x8 grid of means per square
+(the board resized to 64x64) and every cell becomes one bit: brighter than
+its square's average or not. Highlights and other flat colour changes leave
+these 4096 bits alone, while a moved piece flips dozens of them.
+
+Lookups try the exact hash first, then the nearest stored hash within
+``tolerance`` differing bits (XOR + popcount over all entries at once).
+Each FEN is stored with whether its side to move was guessed, so a repeated
+capture is analysed the same way as the first. Entries are kept in an LRU,
+with an optional SQLite file that survives restarts.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from src.ocr.board_detection import split_squares
+from src.utils.config import FRAME_CACHE_DB, FRAME_CACHE_SIZE, FRAME_CACHE_TOLERANCE
+
+HASH_BYTES = 64 * 64 // 8
+# A cell must be this much brighter (0..1) than its square's mean to set its bit,
+# so tiny noise on an empty square does not flip bits
+BIT_MARGIN = 0.01
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint16)
+
+_cache: Optional['FrameCache'] = None
+_cache_lock = threading.Lock()
+
+
+def frame_hash(image: np.ndarray) -> bytes:
+    """4096-bit perceptual hash of a board image (512 bytes)."""
+    cells = split_squares(image, 8).reshape(64, 64)
+    bits = cells > cells.mean(axis=1, keepdims=True) + BIT_MARGIN
+    return np.packbits(bits).tobytes()
+
+
+def hamming(a: bytes, b: bytes) -> int:
+    return int(_POPCOUNT[np.bitwise_xor(np.frombuffer(a, np.uint8), np.frombuffer(b, np.uint8))].sum())
+
+
+class FrameEntry:
+    __slots__ = ('fen', 'turn_uncertain')
+
+    def __init__(self, fen: str, turn_uncertain: bool = False):
+        self.fen = fen
+        self.turn_uncertain = turn_uncertain
+
+    def __repr__(self) -> str:
+        return f'FrameEntry({self.fen!r}, turn_uncertain={self.turn_uncertain})'
+
+
+class FrameCache:
+    """Thread-safe LRU of frame hash -> ``FrameEntry`` with tolerant lookup and optional SQLite persistence."""
+
+    def __init__(self, max_entries: int = 256, tolerance: int = 8, db_path: Optional[str] = None):
+        self.max_entries = max(1, int(max_entries))
+        self.tolerance = max(0, int(tolerance))
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[bytes, FrameEntry]' = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None  # stacked hashes for the tolerant search
+        self._keys = []
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS frames ('
+                ' hash BLOB PRIMARY KEY, fen TEXT NOT NULL, updated REAL NOT NULL,'
+                ' turn_uncertain INTEGER NOT NULL DEFAULT 1)'
+            )
+            columns = {row[1] for row in self._db.execute('PRAGMA table_info(frames)')}
+            if 'turn_uncertain' not in columns:
+                # Files from before the flag: their side to move may have been a guess
+                self._db.execute('ALTER TABLE frames ADD COLUMN turn_uncertain INTEGER NOT NULL DEFAULT 1')
+            self._db.commit()
+            rows = self._db.execute(
+                'SELECT hash, fen, turn_uncertain FROM frames ORDER BY updated DESC LIMIT ?',
+                (self.max_entries,)
+            ).fetchall()
+            for key, fen, turn_uncertain in reversed(rows):
+                self._entries[bytes(key)] = FrameEntry(fen, bool(turn_uncertain))
+            # Rows beyond the LRU (e.g. from a larger FRAME_CACHE_SIZE) would never be read again
+            self._db.execute(
+                'DELETE FROM frames WHERE hash NOT IN'
+                ' (SELECT hash FROM frames ORDER BY updated DESC LIMIT ?)', (self.max_entries,)
+            )
+            self._db.commit()
+
+    def get(self, key: bytes) -> Optional[FrameEntry]:
+        """Entry stored for ``key`` or for the closest hash within the tolerance, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            elif self.tolerance and self._entries:
+                entry = self._nearest(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    def put(self, key: bytes, fen: str, turn_uncertain: bool = False) -> None:
+        """Remember ``fen`` for this frame; ``turn_uncertain`` if its side to move was guessed."""
+        if not fen:
+            return
+        with self._lock:
+            self._entries[key] = FrameEntry(fen, turn_uncertain)
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+            self._matrix = None
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT INTO frames (hash, fen, updated, turn_uncertain) VALUES (?, ?, ?, ?)'
+                    ' ON CONFLICT(hash) DO UPDATE SET fen = excluded.fen, updated = excluded.updated,'
+                    ' turn_uncertain = excluded.turn_uncertain',
+                    (key, fen, time.time(), int(turn_uncertain))
+                )
+                # The table mirrors the LRU, so it can't grow without bound
+                self._db.executemany('DELETE FROM frames WHERE hash = ?', [(k,) for k in evicted])
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Drop the in-memory tier (the SQLite file is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _nearest(self, key: bytes) -> Optional[FrameEntry]:
+        if self._matrix is None:
+            self._keys = list(self._entries)
+            self._matrix = np.frombuffer(b''.join(self._keys), np.uint8).reshape(len(self._keys), HASH_BYTES)
+        distances = _POPCOUNT[np.bitwise_xor(self._matrix, np.frombuffer(key, np.uint8))].sum(axis=1)
+        best = int(distances.argmin())
+        if distances[best] > self.tolerance:
+            return None
+        nearest = self._keys[best]
+        self._entries.move_to_end(nearest)
+        return self._entries[nearest]
+
+
+def get_frame_cache() -> Optional[FrameCache]:
+    """Return the process-wide frame cache, or None if FRAME_CACHE_SIZE is 0."""
+    global _cache
+    if FRAME_CACHE_SIZE <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = FrameCache(FRAME_CACHE_SIZE, FRAME_CACHE_TOLERANCE, FRAME_CACHE_DB or None)
+        return _cache
@@ -2,6 +2,7 @@
 Module to use Google Gemini Vision API to extract FEN from chess board images.
 """
 import re
+import threading
 import time
 import google.generativeai as genai
 from PIL import Image, ImageEnhance
@@ -10,7 +11,7 @@ import cv2
 from typing import Optional
 from src.utils.config import GEMINI_API_KEY
 from src.utils.helpers import short_log
-from src.ocr.fen_generator import validate_fen
+from src.ocr.fen_generator import parse_fen, validate_fen
 
 
 def _try_fix_fen(fen: str) -> Optional[str]:
@@ -103,13 +104,113 @@ def _try_fix_fen(fen: str) -> Optional[str]:
         return None
 
 
+# Models compatible with current API (Gemini 2.x), in order of preference
+MODEL_NAMES = [
+    'models/gemini-2.5-flash',           # Fast and efficient
+    'models/gemini-2.0-flash',           # Fast alternative
+    'models/gemini-2.5-pro',             # More powerful
+    'models/gemini-flash-latest',        # Latest flash
+    'models/gemini-2.0-flash-exp',       # Experimental
+    'models/gemini-pro-latest',          # Latest pro
+]
+
+# One client per process: configured once, model resolved once and shared by
+# every capture thread until it actually fails
+_model = None
+_model_name: Optional[str] = None
+_configured = False
+_failed_models = set()
+_model_lock = threading.Lock()
+
+
+def _is_model_error(error: Exception) -> bool:
+    """Errors that mean this model can't be used (as opposed to quota, auth or network trouble)."""
+    msg = str(error).lower()
+    return '404' in msg or 'not found' in msg or 'not supported' in msg or 'deprecated' in msg
+
+
+def get_gemini_model(verify: bool = False):
+    """
+    Returns (model_name, GenerativeModel) for the first usable model, or (None, None).
+    Thread-safe; the result is cached until ``drop_gemini_model`` is called.
+    With ``verify`` each candidate is looked up on the API first (a network call,
+    meant for the startup warm-up); otherwise the name is trusted until it errors.
+    """
+    global _model, _model_name, _configured
+    with _model_lock:
+        if _model is not None:
+            return _model_name, _model
+        if not GEMINI_API_KEY:
+            return None, None
+        if not _configured:
+            genai.configure(api_key=GEMINI_API_KEY)
+            _configured = True
+        candidates = [name for name in MODEL_NAMES if name not in _failed_models]
+        if not candidates:
+            # Every known name failed: ask the API what it offers (network listing)
+            candidates = [name for name in list_available_models() if name not in _failed_models]
+        last_error = None
+        for model_name in candidates:
+            try:
+                if verify:
+                    genai.get_model(model_name)
+                _model = genai.GenerativeModel(model_name)
+                _model_name = model_name
+                short_log(f"✅ Using model: {model_name}")
+                return _model_name, _model
+            except Exception as e:
+                last_error = str(e)
+                if _is_model_error(e):
+                    _failed_models.add(model_name)
+                elif verify:
+                    # Network or auth trouble: don't blame the model, resolve again on first use
+                    break
+        short_log(f"❌ Error: Could not find a compatible Gemini model")
+        short_log(f"   Last error: {last_error}")
+        return None, None
+
+
+def drop_gemini_model(model_name: str) -> None:
+    """Forget a model that errored so the next call resolves another one."""
+    global _model, _model_name
+    with _model_lock:
+        _failed_models.add(model_name)
+        if _model_name == model_name:
+            _model = _model_name = None
+
+
+def warm_up_gemini() -> None:
+    """Resolve the Gemini model ahead of the first capture (run in a background thread)."""
+    if GEMINI_API_KEY:
+        get_gemini_model(verify=True)
+
+
+def _generate_content(contents):
+    """``generate_content`` on the cached model, switching models only when the model itself fails."""
+    for _ in range(len(MODEL_NAMES) + 1):
+        model_name, model = get_gemini_model()
+        if model is None:
+            return None
+        try:
+            return model.generate_content(contents)
+        except Exception as e:
+            if not _is_model_error(e):
+                raise
+            short_log(f"⚠️ Model {model_name} failed ({str(e)[:100]}), switching model")
+            drop_gemini_model(model_name)
+    return None
+
+
 def list_available_models() -> list:
     """
     Lists all available models in the Gemini API.
     Useful for debugging.
     """
+    global _configured
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
+        if not _configured:
+            genai.configure(api_key=GEMINI_API_KEY)
+            _configured = True
         models = genai.list_models()
         available = []
         for model in models:
@@ -137,40 +238,6 @@ def extract_fen_from_image(image_path: str = None, image_array: np.ndarray = Non
         return None
     
     try:
-        # Configure Gemini
-        genai.configure(api_key=GEMINI_API_KEY)
-        
-        # Use models compatible with current API (Gemini 2.x)
-        # Try different models in order of preference
-        model_names = [
-            'models/gemini-2.5-flash',           # Fast and efficient
-            'models/gemini-2.0-flash',           # Fast alternative
-            'models/gemini-2.5-pro',             # More powerful
-            'models/gemini-flash-latest',        # Latest flash
-            'models/gemini-2.0-flash-exp',       # Experimental
-            'models/gemini-pro-latest',          # Latest pro
-        ]
-        
-        model = None
-        last_error = None
-        for model_name in model_names:
-            try:
-                model = genai.GenerativeModel(model_name)
-                short_log(f"✅ Using model: {model_name}")
-                break
-            except Exception as e:
-                last_error = str(e)
-                continue
-        
-        if model is None:
-            short_log(f"❌ Error: Could not find a compatible Gemini model")
-            short_log(f"   Last error: {last_error}")
-            # Try to list available models
-            available = list_available_models()
-            if available:
-                short_log(f"   Available models: {', '.join(available[:3])}")
-            return None
-        
         # Load and preprocess image
         if image_array is not None:
             # Convert numpy array to PIL Image
@@ -250,8 +317,10 @@ rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1
 
 IMPORTANT: Respond with ONLY the FEN string, no explanations, no markdown, no code blocks, just the raw FEN string."""
         
-        # Send to Gemini
-        response = model.generate_content([prompt, img])
+        # Send to Gemini (model resolved once per process, see get_gemini_model)
+        response = _generate_content([prompt, img])
+        if response is None:
+            return None
         
         # Extract FEN from response
         # Try to extract FEN from response (might have extra text)
@@ -287,103 +356,12 @@ IMPORTANT: Respond with ONLY the FEN string, no explanations, no markdown, no co
                 short_log(f"✅ FEN validated after cleaning: {fen_cleaned}")
                 return fen_cleaned
             
-            # If python-chess is available, try to get more specific error info
-            try:
-                import chess
-                try:
-                    chess.Board(fen_cleaned)
-                except ValueError as e:
-                    short_log(f"   Validation error: {str(e)}")
-            except:
-                pass
-            
-            # Last resort: validate FEN format manually and try to fix common errors
-            parts = fen_cleaned.split()
-            if '/' in fen_cleaned and len(parts) >= 6:
-                position_part = parts[0]
-                rows = position_part.split('/')
-                
-                if len(rows) == 8:
-                    # Check each row has exactly 8 squares
-                    valid_rows = True
-                    row_errors = []
-                    
-                    for i, row in enumerate(rows):
-                        square_count = 0
-                        for char in row:
-                            if char.isdigit():
-                                square_count += int(char)
-                            elif char in 'rnbqkpRNBQKP':
-                                square_count += 1
-                            else:
-                                valid_rows = False
-                                row_errors.append(f"Row {8-i}: invalid character '{char}'")
-                                break
-                        
-                        if square_count != 8:
-                            valid_rows = False
-                            row_errors.append(f"Row {8-i}: has {square_count} squares (need 8): '{row}'")
-                    
-                    # Check for correct number of kings
-                    white_kings = position_part.count('K')
-                    black_kings = position_part.count('k')
-                    
-                    if white_kings != 1:
-                        valid_rows = False
-                        row_errors.append(f"Has {white_kings} white king(s), need exactly 1")
-                    if black_kings != 1:
-                        valid_rows = False
-                        row_errors.append(f"Has {black_kings} black king(s), need exactly 1")
-                    
-                    # Check for invalid piece positions (kings in wrong positions)
-                    # Kings should be on e1 (white) and e8 (black) in starting position, but can be anywhere in game
-                    # However, check for obvious errors like multiple kings of same color
-                    if white_kings > 1 or black_kings > 1:
-                        valid_rows = False
-                        row_errors.append(f"Multiple kings of same color detected")
-                    
-                    # Check for invalid piece characters
-                    valid_pieces = set('rnbqkpRNBQKP12345678')
-                    for i, row in enumerate(rows):
-                        invalid_chars = [c for c in row if c not in valid_pieces]
-                        if invalid_chars:
-                            valid_rows = False
-                            row_errors.append(f"Row {8-i}: invalid characters {set(invalid_chars)}")
-                            break
-                    
-                    if valid_rows:
-                        short_log(f"⚠️ FEN format validated manually (python-chess rejected it). Returning: {fen_cleaned}")
-                        return fen_cleaned
-                    else:
-                        short_log(f"❌ FEN validation failed:")
-                        for error in row_errors[:3]:  # Show first 3 errors
-                            short_log(f"   - {error}")
-                        
-                        # Try to auto-fix common issues
-                        fen_fixed = _try_fix_fen(fen_cleaned)
-                        if fen_fixed:
-                            # Validate the fixed FEN
-                            if validate_fen(fen_fixed):
-                                short_log(f"🔧 Auto-fixed FEN and validated: {fen_fixed}")
-                                return fen_fixed
-                            else:
-                                # Try manual validation
-                                fixed_parts = fen_fixed.split()
-                                if len(fixed_parts) >= 6:
-                                    fixed_pos = fixed_parts[0]
-                                    fixed_rows_check = fixed_pos.split('/')
-                                    if len(fixed_rows_check) == 8:
-                                        all_valid = True
-                                        for r in fixed_rows_check:
-                                            count = sum(int(c) if c.isdigit() else 1 for c in r if c.isdigit() or c in 'rnbqkpRNBQKP')
-                                            if count != 8:
-                                                all_valid = False
-                                                break
-                                        if all_valid and fixed_pos.count('K') == 1 and fixed_pos.count('k') == 1:
-                                            short_log(f"🔧 Auto-fixed FEN (manual validation): {fen_fixed}")
-                                            return fen_fixed
-                else:
-                    short_log(f"❌ FEN has {len(rows)} rows instead of 8.")
+            # Explain what is wrong, then try to fix common OCR mistakes
+            short_log(f"   Validation error: {parse_fen(fen_cleaned).error}")
+            fen_fixed = _try_fix_fen(fen_cleaned)
+            if fen_fixed and validate_fen(fen_fixed):
+                short_log(f"🔧 Auto-fixed FEN and validated: {fen_fixed}")
+                return fen_fixed
             
             return None  # Don't return invalid FEN
             
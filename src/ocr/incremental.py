@@ -0,0 +1,240 @@
+"""Incremental recognition: infer the move played since the last capture.
+
+Between two captures usually only 2-4 squares change. The recognizer keeps
+the previous frame's per-square signatures (8x8 cell means) and finds the
+changed squares with one vectorized comparison. Squares compare by shape
+(normalized correlation), so move highlights appearing or disappearing do not
+count as changes. It then looks for the legal move from the last known
+position, or a move and its reply, whose changed squares are exactly those.
+The new FEN comes from python-chess with no OCR call. When nothing matches,
+``update`` returns None and the caller runs full recognition, then calls
+``remember`` with the result and the board's orientation; without a known
+orientation there is no baseline, since image squares can't be mapped to
+chess squares. A baseline whose side to move was guessed stays a guess while
+the board is unchanged; once a move is seen, the mover tells whose turn it is.
+"""
+import threading
+from typing import List, Optional, Set, Tuple
+
+import chess
+import numpy as np
+
+from src.ocr.board_detection import FLAT_STD, split_squares
+from src.ocr.fen_generator import parse_fen
+from src.utils.helpers import short_log
+
+# A square whose shape correlates below this with its previous self has changed
+MIN_CORRELATION = 0.9
+# FEN order (a8 first) -> python-chess square (a1 = 0); on a flipped board image
+# index i shows _CHESS_SQUARE[63 - i]
+_CHESS_SQUARE = np.array([chess.square(i % 8, 7 - i // 8) for i in range(64)])
+_FEN_INDEX = {int(sq): i for i, sq in enumerate(_CHESS_SQUARE)}
+
+_recognizer: Optional['IncrementalRecognizer'] = None
+_recognizer_lock = threading.Lock()
+
+
+def square_signatures(image: np.ndarray) -> np.ndarray:
+    """(64, 64) float32: each square of the board reduced to 8x8 cell means, image order."""
+    return split_squares(image, 8).reshape(64, 64)
+
+
+def _image_index(square: int, flipped: bool) -> int:
+    index = _FEN_INDEX[square]
+    return 63 - index if flipped else index
+
+
+def changed_squares(previous: np.ndarray, current: np.ndarray, flipped: bool = False) -> Set[int]:
+    """python-chess squares whose contents differ between two signature arrays.
+
+    ``flipped`` means Black is at the bottom of the image.
+    """
+    a = previous - previous.mean(axis=1, keepdims=True)
+    b = current - current.mean(axis=1, keepdims=True)
+    flat_a = a.std(axis=1) < FLAT_STD
+    flat_b = b.std(axis=1) < FLAT_STD
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    correlation = (a * b).sum(axis=1) / np.maximum(norms, 1e-9)
+    changed = np.where(flat_a & flat_b, False, (flat_a != flat_b) | (correlation < MIN_CORRELATION))
+    squares = _CHESS_SQUARE[::-1] if flipped else _CHESS_SQUARE
+    return set(squares[changed].tolist())
+
+
+def _diff(before: chess.Board, after: chess.Board) -> Set[int]:
+    old, new = before.piece_map(), after.piece_map()
+    return {sq for sq in old.keys() | new.keys() if old.get(sq) != new.get(sq)}
+
+
+def _footprint(board: chess.Board, move: chess.Move) -> Set[int]:
+    """Squares ``move`` changes, without playing it."""
+    squares = {move.from_square, move.to_square}
+    if board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        kingside = board.is_kingside_castling(move)
+        squares = {move.from_square, chess.square(6 if kingside else 2, rank),
+                   move.to_square if board.piece_type_at(move.to_square) == chess.ROOK
+                   else chess.square(7 if kingside else 0, rank),
+                   chess.square(5 if kingside else 3, rank)}
+    elif board.is_en_passant(move):
+        squares.add(move.to_square + (-8 if board.turn == chess.WHITE else 8))
+    return squares
+
+
+def find_moves(board: chess.Board, changed: Set[int], max_plies: int = 2) -> List[List[chess.Move]]:
+    """Every shortest sequence of legal moves (up to ``max_plies``) changing exactly ``changed``.
+
+    More than one sequence fits only when they differ in a promotion piece,
+    or when the squares are genuinely ambiguous.
+    """
+    start = board.copy(stack=False)
+    for plies in range(1, max_plies + 1):
+        found = []
+        for move in list(board.legal_moves):
+            first = _footprint(board, move)
+            if plies == 1:
+                if first == changed:
+                    found.append([move])
+                continue
+            if move.from_square not in changed:
+                continue
+            board.push(move)
+            for reply in board.legal_moves:
+                if reply.from_square not in changed or not first | _footprint(board, reply) >= changed:
+                    continue
+                after = board.copy(stack=False)
+                after.push(reply)
+                if _diff(start, after) == changed:
+                    found.append([move, reply])
+            board.pop()
+        if found:
+            return found
+    return []
+
+
+def _shape_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    a = a - a.mean()
+    b = b - b.mean()
+    return float(a @ b / max(np.linalg.norm(a) * np.linalg.norm(b), 1e-9))
+
+
+def pick_sequence(candidates: List[List[chess.Move]], board: chess.Board, before: np.ndarray,
+                  after: np.ndarray, flipped: bool = False) -> Optional[List[chess.Move]]:
+    """Choose among sequences that differ only in promotion pieces by how the promoted square looks.
+
+    The new piece is compared with pieces of each candidate type already on the
+    board in the previous frame; without a close match, a queen wins.
+    Returns None if the candidates differ in more than the promotion.
+    """
+    if len(candidates) == 1:
+        return candidates[0]
+    plain = {tuple((m.from_square, m.to_square) for m in c) for c in candidates}
+    if len(plain) != 1:
+        return None
+    best, best_score = None, -2.0
+    for sequence in candidates:
+        score = 0.0
+        replay = board.copy(stack=False)
+        for move in sequence:
+            if move.promotion:
+                piece = chess.Piece(move.promotion, replay.turn)
+                target = after[_image_index(move.to_square, flipped)]
+                similarity = max((_shape_similarity(target, before[_image_index(sq, flipped)])
+                                  for sq in board.pieces(piece.piece_type, piece.color)), default=0.0)
+                # No convincing look-alike on the board: fall back to preferring a queen
+                score += (similarity if similarity >= MIN_CORRELATION
+                          else 0.1 if move.promotion == chess.QUEEN else 0.0)
+            replay.push(move)
+        if score > best_score:
+            best, best_score = sequence, score
+    return best
+
+
+class IncrementalRecognizer:
+    """Tracks the last recognized position and infers the next one from changed squares."""
+
+    def __init__(self, max_plies: int = 2):
+        self.max_plies = max_plies
+        self.hits = 0
+        self.misses = 0
+        self._board: Optional[chess.Board] = None
+        self._signatures: Optional[np.ndarray] = None
+        self._flipped = False
+        self._turn_uncertain = False
+        self._lock = threading.Lock()
+
+    def remember(self, image: np.ndarray, fen: str, flipped: Optional[bool],
+                 turn_uncertain: bool = False) -> None:
+        """Make ``image`` / ``fen`` the baseline for the next capture.
+
+        ``flipped`` is the board's orientation in ``image`` (True = Black at the
+        bottom); None, like an invalid FEN, clears the baseline.
+        ``turn_uncertain`` marks a FEN whose side to move was guessed.
+        """
+        parsed = parse_fen(fen)
+        with self._lock:
+            if not parsed.valid or flipped is None:
+                self._board = self._signatures = None
+                return
+            self._board = parsed.to_board()
+            self._signatures = square_signatures(image)
+            self._flipped = flipped
+            self._turn_uncertain = turn_uncertain
+
+    def update(self, image: np.ndarray) -> Optional[Tuple[str, bool]]:
+        """(FEN, turn_uncertain) of ``image`` inferred from the baseline, or None if full recognition is needed."""
+        with self._lock:
+            if self._board is None:
+                return None
+            signatures = square_signatures(image)
+            changed = changed_squares(self._signatures, signatures, self._flipped)
+            if not changed:
+                self.hits += 1
+                self._signatures = signatures
+                return self._board.fen(), self._turn_uncertain
+            if len(changed) > 6:
+                self.misses += 1
+                return None
+            board = self._board
+            candidates = find_moves(board, changed, self.max_plies)
+            if not candidates:
+                # The baseline's side to move may have been misread: try the other
+                # side, but only trust an unambiguous answer
+                other = board.copy(stack=False)
+                other.turn = not board.turn
+                other.ep_square = None
+                if other.is_valid():
+                    candidates = find_moves(other, changed, self.max_plies)
+                    if len(candidates) == 1:
+                        short_log(f'♻️ Baseline had the wrong side to move, '
+                                  f'{"White" if other.turn == chess.WHITE else "Black"} moved')
+                        board = other
+                    else:
+                        candidates = []
+            moves = (pick_sequence(candidates, board, self._signatures, signatures, self._flipped)
+                     if candidates else None)
+            if moves is None:
+                self.misses += 1
+                return None
+            board = board.copy(stack=False)
+            sans = []
+            for move in moves:
+                sans.append(board.san(move))
+                board.push(move)
+            short_log(f'♻️ Inferred {" ".join(sans)} from {len(changed)} changed squares')
+            self._board = board.copy(stack=False)
+            self._signatures = signatures
+            self._turn_uncertain = False
+            self.hits += 1
+            return board.fen(), False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._board = self._signatures = None
+
+
+def get_recognizer() -> IncrementalRecognizer:
+    global _recognizer
+    with _recognizer_lock:
+        if _recognizer is None:
+            _recognizer = IncrementalRecognizer()
+        return _recognizer
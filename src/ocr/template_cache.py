@@ -0,0 +1,196 @@
+"""Self-calibrating piece templates learned from confirmed FENs.
+
+When Gemini returns a FEN that passes validation, that FEN labels the 64
+squares of the same capture. The squares are stored as exemplars per
+(piece, square shade), keyed by capture region and board size, so later
+captures of that region are read locally by normalized cross-correlation:
+one (64 x D) @ (D x T) product scores every square against every exemplar.
+
+Squares are labelled and read in image order, so the orientation of each
+learned capture (White or Black at the bottom) is stored with the set. A
+capture is only read locally when its own layout (where each side's king and
+pawns sit) agrees with that orientation; the side to move can't be seen, so a
+reading guesses the side at the bottom.
+
+Exemplars are kept newest-first up to a limit per (piece, shade). When the
+site's piece set or board theme changes, match scores drop, Gemini is asked
+again and the new exemplars replace the old ones.
+"""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from src.ocr.board_detection import (
+    FLAT_STD, SHADES, BoardReading, labels_to_placement, layout_orientation, placement_to_labels,
+    split_squares
+)
+from src.utils.config import TEMPLATE_CACHE_DIR, TEMPLATE_MIN_SCORE
+from src.utils.helpers import short_log
+
+_cache: Optional['TemplateCache'] = None
+_cache_lock = threading.Lock()
+
+
+def _normalize(squares: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(N, D) pixels -> zero-mean unit-norm rows, plus which rows are flat (no piece, NCC undefined)."""
+    centred = squares - squares.mean(axis=1, keepdims=True)
+    std = centred.std(axis=1)
+    norms = np.linalg.norm(centred, axis=1, keepdims=True)
+    return centred / np.maximum(norms, 1e-6), std < FLAT_STD
+
+
+class _Templates:
+    __slots__ = ('vectors', 'labels', 'shades', 'flipped')
+
+    def __init__(self, dim: int):
+        self.vectors = np.zeros((0, dim), np.float32)
+        self.labels = np.zeros(0, np.int8)
+        self.shades = np.zeros(0, np.int8)
+        self.flipped: Optional[bool] = None  # orientation of the last learned capture
+
+
+class TemplateCache:
+    """Per-region piece exemplars on disk, matched with vectorized NCC."""
+
+    def __init__(self, directory: str, size: int = 32, max_per_class: int = 6,
+                 min_score: float = TEMPLATE_MIN_SCORE):
+        self.directory = directory
+        self.size = size
+        self.max_per_class = max_per_class
+        self.min_score = min_score
+        self.hits = 0
+        self.misses = 0
+        self._sets: Dict[str, _Templates] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(region: Optional[dict], shape) -> str:
+        """Cache key for a capture region (as saved by region_selector) and image size."""
+        region = region or {}
+        where = '_'.join(str(region.get(k, 0)) for k in ('left', 'top', 'width', 'height'))
+        return f'{where}_{shape[1]}x{shape[0]}'
+
+    def learn(self, key: str, image: np.ndarray, fen: str, flipped: Optional[bool]) -> int:
+        """Store the squares of ``image`` labelled by ``fen``; returns how many exemplars were new.
+
+        ``flipped`` means Black is at the bottom of ``image``; with None
+        (orientation unknown) nothing is learned.
+        """
+        if flipped is None:
+            return 0
+        labels = placement_to_labels(fen)
+        if flipped:
+            labels = labels[::-1]
+        vectors, flat = _normalize(split_squares(image, self.size).reshape(64, -1))
+        with self._lock:
+            templates = self._load(key)
+            turned = templates.flipped != flipped
+            templates.flipped = flipped
+            added = 0
+            for i in np.flatnonzero(~flat):
+                label, shade = labels[i], SHADES[i]
+                same = (templates.labels == label) & (templates.shades == shade)
+                if same.any() and (templates.vectors[same] @ vectors[i]).max() > 0.98:
+                    # Already have an exemplar this close
+                    continue
+                templates.vectors = np.vstack([vectors[i][None], templates.vectors])
+                templates.labels = np.concatenate([[label], templates.labels]).astype(np.int8)
+                templates.shades = np.concatenate([[shade], templates.shades]).astype(np.int8)
+                added += 1
+            if added:
+                self._trim(templates)
+            if added or turned:
+                self._save(key, templates)
+        return added
+
+    def match(self, key: str, image: np.ndarray) -> Optional[BoardReading]:
+        """Read ``image`` from the learned exemplars.
+
+        None if nothing is learned, a square is unsure, or the capture's
+        orientation is unclear or differs from the learned one.
+        """
+        with self._lock:
+            # learn() replaces these arrays; take all four from the same moment
+            templates = self._load(key)
+            exemplars, exemplar_labels, exemplar_shades, learned_flipped = (
+                templates.vectors, templates.labels, templates.shades, templates.flipped)
+        if not len(exemplar_labels) or learned_flipped is None:
+            return None
+        vectors, flat = _normalize(split_squares(image, self.size).reshape(64, -1))
+        scores = vectors @ exemplars.T
+        # Only compare against exemplars cut from the same square shade
+        scores[SHADES[:, None] != exemplar_shades[None, :]] = -1
+        best = scores.argmax(axis=1)
+        labels = exemplar_labels[best].astype(np.intp)
+        confidence = scores[np.arange(64), best]
+        labels[flat] = 0
+        confidence[flat] = 1.0
+        if confidence.min() < self.min_score or layout_orientation(labels) != learned_flipped:
+            self.misses += 1
+            return None
+        if learned_flipped:
+            labels, confidence = labels[::-1], confidence[::-1]
+        self.hits += 1
+        return BoardReading(labels_to_placement(labels), confidence.astype(np.float32),
+                            'b' if learned_flipped else 'w', flipped=learned_flipped)
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._sets.pop(key, None)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _trim(self, templates: _Templates) -> None:
+        # Newest first: keep the first max_per_class of every (label, shade)
+        keep = np.zeros(len(templates.labels), bool)
+        seen: Dict[Tuple[int, int], int] = {}
+        for i, pair in enumerate(zip(templates.labels.tolist(), templates.shades.tolist())):
+            seen[pair] = seen.get(pair, 0) + 1
+            keep[i] = seen[pair] <= self.max_per_class
+        templates.vectors = templates.vectors[keep]
+        templates.labels = templates.labels[keep]
+        templates.shades = templates.shades[keep]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}_{self.size}.npz')
+
+    def _load(self, key: str) -> _Templates:
+        templates = self._sets.get(key)
+        if templates is not None:
+            return templates
+        templates = _Templates(self.size * self.size)
+        try:
+            with np.load(self._path(key)) as data:
+                templates.vectors = data['vectors'].astype(np.float32)
+                templates.labels = data['labels'].astype(np.int8)
+                templates.shades = data['shades'].astype(np.int8)
+                if 'flipped' in data:
+                    templates.flipped = bool(data['flipped'])
+        except (OSError, KeyError, ValueError):
+            pass
+        self._sets[key] = templates
+        return templates
+
+    def _save(self, key: str, templates: _Templates) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            np.savez_compressed(self._path(key), vectors=templates.vectors.astype(np.float16),
+                                labels=templates.labels, shades=templates.shades,
+                                flipped=np.array(bool(templates.flipped)))
+        except OSError as e:
+            short_log(f'⚠️ Could not save piece templates: {e}')
+
+
+def get_template_cache() -> Optional[TemplateCache]:
+    """Return the process-wide template cache, or None if TEMPLATE_CACHE_DIR is empty."""
+    global _cache
+    if not TEMPLATE_CACHE_DIR:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = TemplateCache(TEMPLATE_CACHE_DIR)
+        return _cache
@@ -12,6 +12,70 @@ STOCKFISH_DOWNLOAD_URL = os.getenv(
 	'STOCKFISH_DOWNLOAD_URL',
 	'https://github.com/official-stockfish/Stockfish/releases/latest/download/stockfish-windows-x86-64-avx2.zip'
 )
+# Number of warm Stockfish processes kept alive between hotkey presses.
+# Set to 0 to fall back to spawning a fresh process for every analysis.
+ENGINE_POOL_SIZE = int(os.getenv('ENGINE_POOL_SIZE', '1'))
+# Analysis cache: positions kept in memory, and an optional SQLite file that
+# survives restarts (leave empty to keep the cache in memory only).
+ANALYSIS_CACHE_SIZE = int(os.getenv('ANALYSIS_CACHE_SIZE', '4096'))
+ANALYSIS_CACHE_DB = os.getenv('ANALYSIS_CACHE_DB', '')
+# End-to-end latency target for a hotkey press, in ms (capture + OCR + engine).
+# 0 keeps the fixed depth 12 / 3 s limits; otherwise the engine gets what is left.
+ANALYSIS_LATENCY_TARGET_MS = float(os.getenv('ANALYSIS_LATENCY_TARGET_MS', '0'))
+# Deepest search allowed when running against a latency target
+ANALYSIS_MAX_DEPTH = int(os.getenv('ANALYSIS_MAX_DEPTH', '30'))
+# Engine options, applied once per engine process. Threads/Hash default to
+# 'auto': cores and available RAM split across the engines of a pool.
+ENGINE_THREADS = os.getenv('ENGINE_THREADS', 'auto')
+ENGINE_HASH_MB = os.getenv('ENGINE_HASH_MB', 'auto')
+ENGINE_MULTIPV = int(os.getenv('ENGINE_MULTIPV', '3'))  # candidate lines for analyse_fen
+ENGINE_MOVE_OVERHEAD_MS = int(os.getenv('ENGINE_MOVE_OVERHEAD_MS', '10'))
+ENGINE_EVAL_FILE = os.getenv('ENGINE_EVAL_FILE', '')  # custom NNUE network, empty = built-in
+# How pooled engines are driven: 'uci' (built-in), 'chess' (python-chess
+# SimpleEngine), 'python-stockfish' or 'fake' (in-process stand-in, no binary)
+ENGINE_BACKEND = os.getenv('ENGINE_BACKEND', 'uci')
+# Keep searching the expected next position (our move + the engine's predicted
+# reply) in the background between hotkey presses
+ENGINE_PONDER = os.getenv('ENGINE_PONDER', '').lower() in ('1', 'true', 'yes')
+# Search both side-to-move readings of every capture at once (OCR can't see
+# whose turn it is); needs ENGINE_POOL_SIZE >= 2 to run them in parallel.
+ANALYSE_BOTH_SIDES = os.getenv('ANALYSE_BOTH_SIDES', '').lower() in ('1', 'true', 'yes')
+# Polyglot opening book (.bin) probed before any engine search; empty = disabled.
+# OPENING_BOOK_MIN_WEIGHT skips rarely played book moves.
+OPENING_BOOK_PATH = os.getenv('OPENING_BOOK_PATH', '')
+OPENING_BOOK_MIN_WEIGHT = int(os.getenv('OPENING_BOOK_MIN_WEIGHT', '1'))
+# Syzygy tablebase directories (os.pathsep separated); positions with at most
+# SYZYGY_MAX_PIECES pieces are answered from them without a search when DTZ
+# tables are present (WDL only: the engine searches the moves keeping the
+# result, as it gets the same directories as SyzygyPath). Empty = disabled.
+SYZYGY_PATH = os.getenv('SYZYGY_PATH', '')
+SYZYGY_MAX_PIECES = int(os.getenv('SYZYGY_MAX_PIECES', '6'))
+SYZYGY_MAX_OPEN = int(os.getenv('SYZYGY_MAX_OPEN', '64'))  # table files kept open at once
+# Where the resolved engine binary (path, version, build, mtime) is remembered
+# between runs; delete it or change STOCKFISH_PATH to force a new search.
+ENGINE_MANIFEST_PATH = os.getenv('ENGINE_MANIFEST_PATH', os.path.join(ROOT, 'external', 'engine_manifest.json'))
+# Local piece classifier (.npz NumPy model or .onnx for OpenCV DNN); when its
+# least confident square is at least PIECE_MIN_CONFIDENCE the capture is
+# recognized on-device and Gemini is skipped. No model ships with the repo:
+# train one with `python -m src.ocr.board_detection train` first.
+PIECE_MODEL_PATH = os.getenv('PIECE_MODEL_PATH', os.path.join(ROOT, 'external', 'piece_classifier.npz'))
+PIECE_MIN_CONFIDENCE = float(os.getenv('PIECE_MIN_CONFIDENCE', '0.8'))
+# Piece templates learned from validated Gemini readings, per capture region;
+# empty = disabled. A capture is read from them when every square scores at
+# least TEMPLATE_MIN_SCORE (normalized cross-correlation).
+TEMPLATE_CACHE_DIR = os.getenv('TEMPLATE_CACHE_DIR', os.path.join(ROOT, 'external', 'templates'))
+TEMPLATE_MIN_SCORE = float(os.getenv('TEMPLATE_MIN_SCORE', '0.85'))
+# Recognized FENs remembered by a perceptual hash of the capture, so re-pressing
+# the hotkey on an unchanged board skips recognition. Tolerance is in differing
+# bits out of 4096; FRAME_CACHE_SIZE=0 disables, FRAME_CACHE_DB persists it.
+FRAME_CACHE_SIZE = int(os.getenv('FRAME_CACHE_SIZE', '256'))
+FRAME_CACHE_TOLERANCE = int(os.getenv('FRAME_CACHE_TOLERANCE', '8'))
+FRAME_CACHE_DB = os.getenv('FRAME_CACHE_DB', '')
+# Remote analysis workers (python -m src.engine.distributed worker), as
+# comma separated host:port; when set, searches go to the least loaded worker
+# first and fall back to local engines if none answers in time.
+ANALYSIS_WORKERS = [w.strip() for w in os.getenv('ANALYSIS_WORKERS', '').split(',') if w.strip()]
+ANALYSIS_WORKER_TIMEOUT = float(os.getenv('ANALYSIS_WORKER_TIMEOUT', '10'))  # seconds per remote search
 TESSERACT_CMD = 'tesseract'  # override on systems where tesseract is in a custom location
 
 # Google Gemini API Key
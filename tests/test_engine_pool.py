@@ -0,0 +1,149 @@
+"""EnginePool / UciProcess failure handling, driven by the scriptable fake engine.
+
+Each test points the pool at ``fake_uci_engine.py`` and injects failures through
+its FAKE_UCI_* variables (inherited by the engine processes), so crash, hang,
+respawn and cleanup paths run without a Stockfish binary.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from src.engine.engine_pool import EnginePool
+from src.engine.uci_process import UciError
+
+FAKE_ENGINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'src', 'engine', 'fake_uci_engine.py')
+FEN = 'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3'
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason='runs the fake engine through its shebang')
+
+
+@pytest.fixture
+def fake_engine(monkeypatch, tmp_path):
+    """Configure the fake engine; returns a reader for its shared failure counters."""
+    counter_file = tmp_path / 'counters.json'
+    monkeypatch.setenv('FAKE_UCI_COUNTER_FILE', str(counter_file))
+    monkeypatch.setenv('FAKE_UCI_DEPTH_MS', '2')
+    monkeypatch.setenv('FAKE_UCI_MAX_DEPTH', '8')
+    monkeypatch.delenv('FAKE_UCI_FAIL', raising=False)
+
+    def counts():
+        return json.loads(counter_file.read_text() or '{}') if counter_file.exists() else {}
+    return counts
+
+
+def _search(pool: EnginePool, timeout: float = 3.0):
+    with pool.engine() as engine:
+        return engine, engine.search(FEN, depth=6, movetime=200, timeout=timeout)
+
+
+def test_search_answers_with_a_legal_looking_move(fake_engine):
+    pool = EnginePool(FAKE_ENGINE, size=1)
+    try:
+        engine, move = _search(pool)
+        assert move and len(move) in (4, 5)
+        assert engine.last_depth >= 1
+    finally:
+        pool.close()
+
+
+def test_crashed_search_is_replaced_on_next_checkout(fake_engine, monkeypatch):
+    monkeypatch.setenv('FAKE_UCI_FAIL', 'crash-search@1')
+    pool = EnginePool(FAKE_ENGINE, size=1)
+    try:
+        with pytest.raises(UciError):
+            _search(pool)
+        assert pool._slots.qsize() == 1
+        engine, move = _search(pool)
+        assert move
+        assert engine.is_alive()
+        assert fake_engine()['crash-search'] == 2
+    finally:
+        pool.close()
+
+
+def test_dead_idle_engine_is_respawned(fake_engine):
+    pool = EnginePool(FAKE_ENGINE, size=1)
+    try:
+        first, _ = _search(pool)
+        first._proc.kill()
+        first._proc.wait(timeout=2)
+        second, move = _search(pool)
+        assert second is not first
+        assert move
+        assert pool.respawns == 1
+    finally:
+        pool.close()
+
+
+def test_hung_search_times_out_and_is_killed(fake_engine, monkeypatch):
+    monkeypatch.setenv('FAKE_UCI_FAIL', 'hang-search@1')
+    pool = EnginePool(FAKE_ENGINE, size=1)
+    try:
+        popen = None
+        started = time.monotonic()
+        with pytest.raises(UciError):
+            with pool.engine() as engine:
+                popen = engine._proc
+                engine.search(FEN, depth=6, movetime=100, timeout=0.5)
+        # timeout, then 1 s for a bestmove after 'stop', then the resync and kill
+        assert time.monotonic() - started < 6
+        assert popen.poll() is not None
+        assert pool._slots.qsize() == 1
+        engine, move = _search(pool)
+        assert move
+        assert engine._proc is not popen
+    finally:
+        pool.close()
+
+
+def test_failed_start_returns_the_slot(fake_engine, monkeypatch):
+    monkeypatch.setenv('FAKE_UCI_FAIL', 'crash-handshake@1')
+    pool = EnginePool(FAKE_ENGINE, size=1)
+    try:
+        with pytest.raises(UciError):
+            _search(pool)
+        assert pool._slots.qsize() == 1
+        assert _search(pool)[1]
+    finally:
+        pool.close()
+
+
+def test_slots_return_under_concurrent_failures(fake_engine, monkeypatch):
+    monkeypatch.setenv('FAKE_UCI_FAIL', 'crash-search@2')
+    pool = EnginePool(FAKE_ENGINE, size=2)
+    outcomes = []
+
+    def run():
+        try:
+            outcomes.append(_search(pool)[1])
+        except UciError:
+            outcomes.append(None)
+
+    try:
+        threads = [threading.Thread(target=run) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=20)
+        assert len(outcomes) == 6
+        assert outcomes.count(None) == 1
+        assert pool._slots.qsize() == 2
+    finally:
+        pool.close()
+
+
+def test_close_quits_every_engine(fake_engine):
+    pool = EnginePool(FAKE_ENGINE, size=2)
+    pool.warm_up()
+    popens = [engine._proc for engine in pool._all]
+    assert len(popens) == 2
+    pool.close()
+    assert all(p.poll() is not None for p in popens)
+    with pytest.raises(UciError):
+        with pool.engine():
+            pass
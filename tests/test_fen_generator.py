@@ -0,0 +1,111 @@
+"""Differential tests: ``parse_fen`` against python-chess's own FEN parser.
+
+parse_fen may be stricter than ``chess.Board`` (it also checks legality), but
+never looser: whatever it accepts, python-chess must read to the same position.
+"""
+import random
+
+import chess
+import pytest
+
+from src.ocr.fen_generator import parse_fen, validate_fen_with_error
+
+START = chess.STARTING_FEN
+
+
+def _check(fen: str) -> None:
+    parsed = parse_fen(fen)
+    try:
+        board = chess.Board(fen)
+    except ValueError:
+        assert not parsed.valid, f'parse_fen accepted {fen!r}, python-chess rejects it'
+        return
+    if not parsed.valid:
+        return
+    for square in chess.SQUARES:
+        piece = board.piece_at(square)
+        assert parsed.piece_at(square) == (piece.symbol() if piece else None), (fen, square)
+    assert parsed.turn == ('w' if board.turn == chess.WHITE else 'b')
+    assert parsed.ep_square == board.ep_square
+    assert parsed.halfmove == board.halfmove_clock
+    assert parsed.fullmove == board.fullmove_number
+    assert parsed.opponent_in_check == board.was_into_check()
+    assert parsed.to_board().fen() == board.fen()
+
+
+def _game_positions(games: int, seed: int = 0):
+    rng = random.Random(seed)
+    for _ in range(games):
+        board = chess.Board()
+        for _ in range(rng.randrange(1, 120)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+            yield board.fen()
+
+
+def test_positions_from_random_games():
+    for fen in _game_positions(40):
+        parsed = parse_fen(fen)
+        assert parsed.valid, (fen, parsed.error)
+        _check(fen)
+
+
+@pytest.mark.parametrize('fen', [
+    '44/8/8/8/8/8/8/K6k w - - 0 1',
+    '8/8/8/8/8/8/8/K15k w - - 0 1',
+    '8/8/8/8/8/8/8/K6k1 w - - 0 1',
+    '8/8/8/8/8/8/8/K5k w - - 0 1',
+    '8/8/8/8/8/8/8/K0k6 w - - 0 1',
+    '8/8/8/8/8/8/8/K9k w - - 0 1',
+    '8/8/8/8/8/8/K6k w - - 0 1',
+    '8/8/8/8/8/8/8/8/K6k w - - 0 1',
+    '8/8/8/8/8/8/8/K6k/ w - - 0 1',
+    '8/8/8/8/8/8/8/K~6k w - - 0 1',
+    '8/8/8/8/8/8/8/X6k w - - 0 1',
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR',
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1',
+])
+def test_malformed_placements(fen):
+    assert not parse_fen(fen).valid
+    _check(fen)
+
+
+@pytest.mark.parametrize('castling', ['-', 'KQkq', 'Kk', 'q', 'kK', 'KQK', 'KQkqK', 'X', 'HAha', 'AH', '--'])
+def test_castling_field(castling):
+    _check(f'r3k2r/8/8/8/8/8/8/R3K2R w {castling} - 0 1')
+
+
+@pytest.mark.parametrize('ep', ['-', 'e3', 'e6', 'd6', 'e4', 'i3', 'e', 'e33', '33'])
+def test_en_passant_field(ep):
+    _check(f'rnbqkbnr/ppp1pppp/8/3pP3/8/8/PPPP1PPP/RNBQKBNR w KQkq {ep} 0 3')
+
+
+@pytest.mark.parametrize('clocks', ['0 1', '12 40', '0 0', '-1 1', '0 -1', 'x 1', '0 y', '+1 1',
+                                    '1.5 1', '² 1', '0', '0 1 extra'])
+def test_clock_fields(clocks):
+    _check(f'8/8/8/8/8/8/8/K6k w - - {clocks}')
+
+
+def test_mutated_fens():
+    rng = random.Random(1)
+    alphabet = 'pnbrqkPNBRQK0123456789/ -~wbx'
+    sources = [START] + list(_game_positions(20, seed=2))
+    for _ in range(5000):
+        fen = list(rng.choice(sources))
+        i = rng.randrange(len(fen))
+        action = rng.random()
+        if action < 0.4:
+            fen[i] = rng.choice(alphabet)
+        elif action < 0.7:
+            del fen[i]
+        else:
+            fen.insert(i, rng.choice(alphabet))
+        _check(''.join(fen))
+
+
+def test_validate_fen_with_error_reports_consecutive_digits():
+    ok, error = validate_fen_with_error('44/8/8/8/8/8/8/K6k w - - 0 1')
+    assert not ok
+    assert 'consecutive digits' in error